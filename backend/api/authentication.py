@@ -0,0 +1,86 @@
+"""Аутентификация по токену с кэшированием пользователя.
+
+Поля пользователя, нужные API (CACHED_FIELDS, без хэша пароля),
+хранятся в общем кэше (CACHE_BACKEND) TIMEOUT секунд;
+при нескольких воркерах кэш должен быть общим, иначе отзыв токена в
+одном процессе не виден остальным. Каждый запрос получает собственный
+экземпляр User, собранный из закэшированных полей; остальные поля
+отложены и читаются из базы при обращении.
+
+Выход, удаление токена и любое изменение пользователя (api.signals)
+ставят на ключ токена отметку STALE: пока она действует, пользователь
+читается из базы и не кэшируется заново, поэтому запрос, прочитавший
+пользователя до изменения, не вернёт в кэш устаревшие данные.
+"""
+import hashlib
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.translation import gettext_lazy as _
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+
+
+STALE = 'stale'
+CACHED_FIELDS = (
+    'id', 'username', 'email', 'first_name', 'last_name', 'avatar',
+    'is_active', 'is_staff', 'is_superuser',
+)
+
+
+def _cache_key(key):
+    return 'auth-token:' + hashlib.sha256(key.encode()).hexdigest()
+
+
+def get_cached_user(key):
+    fields = cache.get(_cache_key(key))
+    if not isinstance(fields, dict):
+        return None
+    model = get_user_model()
+    # from_db ждёт значения в порядке полей модели.
+    names = [
+        field.attname for field in model._meta.concrete_fields
+        if field.attname in fields
+    ]
+    return model.from_db(
+        DEFAULT_DB_ALIAS, names, [fields[name] for name in names]
+    )
+
+
+def cache_user(key, user):
+    """Кэширует поля пользователя, если на токене нет отметки STALE."""
+    fields = [user._meta.get_field(name) for name in CACHED_FIELDS]
+    cache.add(
+        _cache_key(key),
+        {
+            field.attname: field.get_prep_value(field.value_from_object(user))
+            for field in fields
+        },
+        settings.TOKEN_AUTH_CACHE['TIMEOUT'],
+    )
+
+
+def forget_tokens(*keys):
+    """Сбрасывает пользователей токенов во всех процессах."""
+    cache.set_many(
+        {_cache_key(key): STALE for key in keys},
+        settings.TOKEN_AUTH_CACHE['TIMEOUT'],
+    )
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Запрос токена вместе с пользователем выполняется только при
+    промахе кэша."""
+
+    def authenticate_credentials(self, key):
+        user = get_cached_user(key)
+        if user is None:
+            user, token = super().authenticate_credentials(key)
+            cache_user(key, user)
+            return user, token
+        if not user.is_active:
+            raise AuthenticationFailed(_('User inactive or deleted.'))
+        return user, Token(key=key, user=user)
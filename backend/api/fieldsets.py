@@ -0,0 +1,60 @@
+"""Выборочные поля ответа: ?fields= и ?expand=.
+
+Без fields сериализатор отдаёт полное представление, как раньше.
+fields=a,b оставляет только перечисленные поля, причём связи выводятся
+кратко (идентификаторами); связи из expand выводятся вложенными
+объектами и попадают в ответ, даже если не перечислены в fields.
+Вьюсеты по тем же параметрам убирают из запроса лишние столбцы и
+предзагрузки.
+"""
+FIELDS_PARAM = 'fields'
+EXPAND_PARAM = 'expand'
+
+
+def _names(request, param):
+    return {
+        name.strip()
+        for name in request.query_params.get(param, '').split(',')
+        if name.strip()
+    }
+
+
+def selection(request):
+    """Пара (поля, раскрываемые связи); поля None — полный ответ."""
+    if request is None or FIELDS_PARAM not in request.query_params:
+        return None, set()
+    expand = _names(request, EXPAND_PARAM)
+    return _names(request, FIELDS_PARAM) | expand, expand
+
+
+class Selection:
+    """Что из полей и связей нужно выводить для текущего запроса."""
+
+    def __init__(self, request):
+        self.fields, self.expand = selection(request)
+
+    def wanted(self, name):
+        return self.fields is None or name in self.fields
+
+    def nested(self, name):
+        return self.fields is None or name in self.expand
+
+
+class SparseFieldsMixin:
+    """Отбрасывает невостребованные поля сериализатора.
+
+    compact_fields: {имя связи: функция, создающая краткое поле}.
+    """
+
+    compact_fields = {}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        requested = Selection(self.context.get('request'))
+        if requested.fields is None:
+            return
+        for name in list(self.fields):
+            if not requested.wanted(name):
+                self.fields.pop(name)
+            elif name in self.compact_fields and not requested.nested(name):
+                self.fields[name] = self.compact_fields[name]()
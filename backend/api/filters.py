@@ -1,11 +1,14 @@
+from django.db.models import Exists, F, OuterRef
 from django_filters.rest_framework import (
     BooleanFilter,
+    ChoiceFilter,
     FilterSet,
-    ModelMultipleChoiceFilter
+    MultipleChoiceFilter
 )
 from rest_framework.filters import SearchFilter
 
-from recipes.models import Recipe, Tag
+from recipes.models import Favorite, Recipe, ShoppingList
+from recipes.tags import tag_choices, tag_ids
 
 
 class IngredientFilter(SearchFilter):
@@ -17,36 +20,66 @@ class IngredientFilter(SearchFilter):
 class RecipeFilter(FilterSet):
     """Фильтраци для рецептов."""
 
-    tags = ModelMultipleChoiceFilter(
-        queryset=Tag.objects.all(),
-        field_name='tags__slug',
-        to_field_name='slug',
+    tags = MultipleChoiceFilter(
+        choices=tag_choices,
+        method='filter_tags',
     )
     is_favorited = BooleanFilter(method='filter_favorited')
     is_in_shopping_cart = BooleanFilter(
         method='filter_shopping_cart'
     )
+    ordering = ChoiceFilter(
+        choices=(
+            ('popular', 'Популярные'),
+            ('trending', 'Набирающие популярность'),
+            ('newest', 'Новые'),
+        ),
+        method='filter_ordering',
+    )
 
     class Meta:
         model = Recipe
-        fields = ('tags', 'author', 'is_favorited', 'is_in_shopping_cart')
-
-    def filter_favorited(self, recipes, name, value):
-        user = (
-            self.request.user
-            if self.request.user.is_authenticated
-            else None
+        fields = (
+            'tags',
+            'author',
+            'is_favorited',
+            'is_in_shopping_cart',
+            'ordering',
         )
-        if value and user:
-            return recipes.filter(favorites__user_id=user.id)
+
+    def filter_tags(self, recipes, name, value):
+        """Рецепты хотя бы с одним из тегов: EXISTS вместо JOIN, поэтому
+        не нужен DISTINCT."""
+        if not value:
+            return recipes
+        ids = tag_ids()
+        return recipes.filter(Exists(
+            Recipe.tags.through.objects.filter(
+                recipe_id=OuterRef('pk'),
+                tag_id__in=[ids[slug] for slug in value if slug in ids],
+            )
+        ))
+
+    def filter_user_relation(self, recipes, model, value):
+        """Рецепты из избранного или списка покупок текущего
+        пользователя: id IN (подзапрос по индексу user, recipe)."""
+        if value and self.request.user.is_authenticated:
+            return recipes.filter(id__in=model.objects.filter(
+                user_id=self.request.user.id
+            ).values('recipe_id'))
         return recipes
 
+    def filter_favorited(self, recipes, name, value):
+        return self.filter_user_relation(recipes, Favorite, value)
+
     def filter_shopping_cart(self, recipes, name, value):
-        user = (
-            self.request.user
-            if self.request.user.is_authenticated
-            else None
+        return self.filter_user_relation(recipes, ShoppingList, value)
+
+    def filter_ordering(self, recipes, name, value):
+        """Сортировка по предрассчитанной популярности (RecipeScore)."""
+        if value == 'newest':
+            return recipes.order_by('-id')
+        field = 'popularity' if value == 'popular' else 'trending'
+        return recipes.order_by(
+            F(f'score__{field}').desc(nulls_last=True), '-id'
         )
-        if value and user:
-            return recipes.filter(shopping_carts__user_id=user.id)
-        return recipes
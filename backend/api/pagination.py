@@ -0,0 +1,20 @@
+from rest_framework import pagination
+
+from recipes.estimates import EstimatedCountPaginator, estimated_count
+
+
+class PageNumberPagination(pagination.PageNumberPagination):
+    """Постраничная пагинация с приблизительным count для больших
+    выборок."""
+
+    django_paginator_class = EstimatedCountPaginator
+
+
+class LimitOffsetPagination(pagination.LimitOffsetPagination):
+    """Пагинация limit/offset с приблизительным count для больших
+    выборок."""
+
+    def get_count(self, queryset):
+        if not hasattr(queryset, 'query'):
+            return len(queryset)
+        return estimated_count(queryset)
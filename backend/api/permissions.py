@@ -8,3 +8,10 @@ class IsAuthorOrReadOnly(permissions.BasePermission):
         if request.method in permissions.SAFE_METHODS:
             return True
         return obj.author == request.user
+
+
+class IsAuthorOrStaff(permissions.BasePermission):
+    message = 'История изменений доступна только автору или администратору'
+
+    def has_object_permission(self, request, view, obj):
+        return request.user.is_staff or obj.author == request.user
@@ -1,18 +1,22 @@
 from collections import Counter
 
 from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Manager
 from djoser.serializers import UserSerializer as DjoserUserSerializer
 from drf_extra_fields.fields import Base64ImageField
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 
+from api.fieldsets import SparseFieldsMixin
+from api.services import profiles, user_state
+from recipes import revisions
 from recipes.constants import INGREDIENT_AMOUNT_MIN, MIN_TIME_COOKING
 from recipes.models import (
-    Favorite,
     Ingredients,
     Recipe,
     RecipeIngredient,
-    ShoppingList,
+    RecipeRevision,
     Tag,
 )
 
@@ -39,9 +43,7 @@ class IngredientsSerializer(serializers.ModelSerializer):
 class RecipeIngredientsWriteSerializer(serializers.ModelSerializer):
     """Сериализатор для записи количества."""
 
-    id = serializers.PrimaryKeyRelatedField(
-        queryset=Ingredients.objects.all()
-    )
+    id = serializers.IntegerField()
     amount = serializers.IntegerField(min_value=INGREDIENT_AMOUNT_MIN)
 
     class Meta:
@@ -64,6 +66,28 @@ class RecipeIngredientReadSerializer(serializers.ModelSerializer):
         read_only_fields = fields
 
 
+class RecipeIngredientShortSerializer(serializers.ModelSerializer):
+    """Краткая запись ингредиента рецепта: id ингредиента и количество."""
+
+    id = serializers.ReadOnlyField(source='ingredient_id')
+
+    class Meta:
+        model = RecipeIngredient
+        fields = ('id', 'amount')
+        read_only_fields = fields
+
+
+class UserListSerializer(serializers.ListSerializer):
+    """Подписки на всех пользователей страницы — одним запросом."""
+
+    def to_representation(self, data):
+        users = list(data.all() if isinstance(data, Manager) else data)
+        profiles.load_subscriptions(
+            self.context.get('request'), [user.id for user in users]
+        )
+        return super().to_representation(users)
+
+
 class UserSerializer(DjoserUserSerializer):
     """Сериализатор для пользователя."""
 
@@ -71,12 +95,39 @@ class UserSerializer(DjoserUserSerializer):
 
     class Meta(DjoserUserSerializer.Meta):
         fields = DjoserUserSerializer.Meta.fields + ('is_subscribed', 'avatar')
+        list_serializer_class = UserListSerializer
 
     def get_is_subscribed(self, user):
-        request = self.context.get('request')
-        if not request or not request.user.is_authenticated:
-            return False
-        return request.user.followers.filter(author=user).exists()
+        return profiles.is_subscribed(self.context.get('request'), user.id)
+
+
+class PublicProfileSerializer(DjoserUserSerializer):
+    """Профиль без признака подписки; хранится в кэше, поэтому
+    сериализуется без запроса и с относительным адресом аватара."""
+
+    class Meta(DjoserUserSerializer.Meta):
+        fields = DjoserUserSerializer.Meta.fields + ('avatar',)
+
+
+def serialize_profile(user):
+    return PublicProfileSerializer(user).data
+
+
+def author_representation(request, author_id):
+    """То же, что UserSerializer, но из карты профилей запроса."""
+    profile = profiles.load_profiles(
+        request, [author_id], serialize_profile
+    )[author_id]
+    avatar = profile['avatar']
+    return {
+        **{name: value for name, value in profile.items()
+           if name != 'avatar'},
+        'is_subscribed': profiles.is_subscribed(request, author_id),
+        'avatar': (
+            request.build_absolute_uri(avatar) if avatar and request
+            else avatar
+        ),
+    }
 
 
 class AvatarSerializer(serializers.ModelSerializer):
@@ -98,28 +149,58 @@ class ShortRecipeSerializer(serializers.ModelSerializer):
         read_only_fields = fields
 
 
-class FollowUserSerializer(UserSerializer):
+class FollowUserSerializer(SparseFieldsMixin, UserSerializer):
     """Сериализатор для отображения данных пользователя при подписке."""
 
     recipes = serializers.SerializerMethodField()
     recipes_count = serializers.IntegerField(source='recipes.count')
 
-    class Meta:
+    compact_fields = {
+        'recipes': lambda: serializers.SerializerMethodField(
+            method_name='get_recipe_ids'
+        ),
+    }
+
+    class Meta(UserSerializer.Meta):
         model = User
         fields = UserSerializer.Meta.fields + ('recipes', 'recipes_count')
 
-    def get_recipes(self, author):
+    def limited_recipes(self, author):
         recipes = author.recipes.all()
         if 'recipes_limit' in self.context.get('request').GET:
             limit = int(self.context['request'].GET['recipes_limit'])
             recipes = recipes[:limit]
-        return ShortRecipeSerializer(recipes, many=True).data
+        return recipes
+
+    def get_recipes(self, author):
+        return ShortRecipeSerializer(
+            self.limited_recipes(author), many=True
+        ).data
+
+    def get_recipe_ids(self, author):
+        return [recipe.id for recipe in self.limited_recipes(author)]
+
 
+class RecipeListSerializer(serializers.ListSerializer):
+    """Профили всех авторов страницы и подписки на них загружаются
+    заранее, каждый автор сериализуется один раз."""
 
-class RecipeReadSerializer(serializers.ModelSerializer):
+    def to_representation(self, data):
+        recipes = list(data.all() if isinstance(data, Manager) else data)
+        if isinstance(
+            self.child.fields.get('author'), serializers.SerializerMethodField
+        ):
+            request = self.context.get('request')
+            author_ids = {recipe.author_id for recipe in recipes}
+            profiles.load_profiles(request, author_ids, serialize_profile)
+            profiles.load_subscriptions(request, author_ids)
+        return super().to_representation(recipes)
+
+
+class RecipeReadSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Сериализатор для вывода рецептов."""
 
-    author = UserSerializer(read_only=True)
+    author = serializers.SerializerMethodField()
     ingredients = RecipeIngredientReadSerializer(
         many=True,
         source='recipe_ingredients'
@@ -128,6 +209,16 @@ class RecipeReadSerializer(serializers.ModelSerializer):
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
 
+    compact_fields = {
+        'author': lambda: serializers.PrimaryKeyRelatedField(read_only=True),
+        'ingredients': lambda: RecipeIngredientShortSerializer(
+            many=True, source='recipe_ingredients'
+        ),
+        'tags': lambda: serializers.PrimaryKeyRelatedField(
+            many=True, read_only=True
+        ),
+    }
+
     class Meta:
         model = Recipe
         fields = (
@@ -142,22 +233,37 @@ class RecipeReadSerializer(serializers.ModelSerializer):
             'tags',
             'cooking_time',
         )
+        list_serializer_class = RecipeListSerializer
 
-    def check_user_status(self, obj, model):
-        user = self.context.get('request')
-        return (
-            user.user.is_authenticated
-            and model.objects.filter(
-                recipe=obj,
-                user=user.user
-            ).exists()
+    def get_author(self, recipe):
+        return author_representation(
+            self.context.get('request'), recipe.author_id
         )
 
     def get_is_favorited(self, obj):
-        return self.check_user_status(obj, Favorite)
+        return obj.id in user_state.for_request(
+            self.context['request']
+        ).favorites
 
     def get_is_in_shopping_cart(self, obj):
-        return self.check_user_status(obj, ShoppingList)
+        return obj.id in user_state.for_request(
+            self.context['request']
+        ).shopping_cart
+
+
+class RecipeRevisionSerializer(serializers.ModelSerializer):
+    """Сериализатор для списка версий рецепта."""
+
+    changed = serializers.SerializerMethodField()
+
+    class Meta:
+        model = RecipeRevision
+        fields = ('number', 'created', 'editor', 'snapshot', 'changed')
+        read_only_fields = fields
+
+    def get_changed(self, revision):
+        """Изменённые поля; у полного снимка не перечисляются."""
+        return [] if revision.snapshot else sorted(revision.data)
 
 
 class RecipeWriteSerializer(serializers.ModelSerializer):
@@ -167,10 +273,7 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
         many=True,
         allow_empty=False
     )
-    tags = serializers.PrimaryKeyRelatedField(
-        queryset=Tag.objects.all(),
-        many=True
-    )
+    tags = serializers.ListField(child=serializers.IntegerField())
     image = Base64ImageField()
     cooking_time = serializers.IntegerField(
         min_value=MIN_TIME_COOKING,
@@ -214,7 +317,7 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
 
     def validate_tags(self, value):
         return self._validate_no_duplicates(
-            value, 'тег', id_extractor=lambda tag: tag.id
+            value, 'тег'
         )
 
     def validate_ingredients(self, value):
@@ -224,32 +327,88 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
             id_extractor=lambda ingredient: ingredient['id']
         )
 
+    def validate(self, data):
+        """Проверяет существование всех ингредиентов и тегов: по одному
+        запросу на модель, в ошибке перечислены все отсутствующие id."""
+        ids = {
+            'ingredients': [
+                item['id'] for item in data.get('ingredients', ())
+            ],
+            'tags': data.get('tags', ()),
+        }
+        errors = {
+            field: 'Обязательное поле.' for field in ids if field not in data
+        }
+        for field, model in (('ingredients', Ingredients), ('tags', Tag)):
+            if field in errors:
+                continue
+            found = set(model.objects.filter(
+                id__in=ids[field]
+            ).values_list('id', flat=True))
+            missing = [item_id for item_id in ids[field]
+                       if item_id not in found]
+            if missing:
+                errors[field] = (
+                    f'{model._meta.verbose_name_plural} не найдены: '
+                    f'{missing}'
+                )
+        if errors:
+            raise ValidationError(errors)
+        return data
+
     @staticmethod
-    def create_recipe_ingredients_bulk(instance, ingredients_data):
+    def save_relations(recipe, tags, ingredients):
+        """Теги и ингредиенты рецепта: по одному INSERT на таблицу."""
+        Recipe.tags.through.objects.bulk_create(
+            Recipe.tags.through(recipe_id=recipe.id, tag_id=tag_id)
+            for tag_id in tags
+        )
         RecipeIngredient.objects.bulk_create(
             RecipeIngredient(
-                recipe=instance,
-                ingredient=ingredient_data['id'],
-                amount=ingredient_data['amount']
+                recipe_id=recipe.id,
+                ingredient_id=ingredient['id'],
+                amount=ingredient['amount']
             )
-            for ingredient_data in ingredients_data
+            for ingredient in ingredients
+        )
+
+    def record_revision(self, recipe, previous, tags, ingredients):
+        revisions.record(
+            recipe.id,
+            previous,
+            revisions.build_state(
+                recipe.name,
+                recipe.text,
+                recipe.cooking_time,
+                tags,
+                [(item['id'], item['amount']) for item in ingredients],
+            ),
+            editor=self.context['request'].user,
         )
 
+    @transaction.atomic
     def create(self, validated_data):
-        ingredients_data = validated_data.pop('ingredients')
-        tags_data = validated_data.pop('tags')
+        ingredients = validated_data.pop('ingredients')
+        tags = validated_data.pop('tags')
         recipe = super().create(validated_data)
-        recipe.tags.set(tags_data)
-        self.create_recipe_ingredients_bulk(recipe, ingredients_data)
+        self.save_relations(recipe, tags, ingredients)
+        self.record_revision(recipe, None, tags, ingredients)
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
-        ingredients_data = validated_data.pop('ingredients')
-        tags_data = validated_data.pop('tags')
-        instance.tags.set(tags_data)
-        instance.ingredients.clear()
-        self.create_recipe_ingredients_bulk(instance, ingredients_data)
-        return super().update(instance, validated_data)
+        ingredients = validated_data.pop('ingredients')
+        tags = validated_data.pop('tags')
+        previous = revisions.current_state(instance.id, lock=True)
+        Recipe.tags.through.objects.filter(recipe_id=instance.id).delete()
+        instance.recipe_ingredients.all().delete()
+        self.save_relations(instance, tags, ingredients)
+        instance = super().update(instance, validated_data)
+        self.record_revision(instance, previous, tags, ingredients)
+        return instance
 
     def to_representation(self, instance):
+        instance = Recipe.objects.prefetch_related(
+            'tags', 'recipe_ingredients__ingredient'
+        ).get(pk=instance.pk)
         return RecipeReadSerializer(instance, context=self.context).data
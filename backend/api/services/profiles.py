@@ -0,0 +1,96 @@
+"""Публичные профили пользователей для вложенных авторов.
+
+Профиль (всё, кроме is_subscribed) ищется по уровням: карта профилей
+текущего запроса, затем общий кэш (PROFILE_CACHE_TIMEOUT секунд, 0 —
+не использовать), затем один запрос in_bulk на все недостающие id.
+Признак подписки для всех авторов страницы читается одним запросом к
+Follow.
+
+При сохранении пользователя (api.signals) профиль в общем кэше
+заменяется отметкой STALE на STALE_TIMEOUT секунд: пока она действует,
+профиль читается из базы и не кэшируется. Профили кладутся в кэш через
+cache.add, поэтому запрос, прочитавший пользователя до изменения, не
+вернёт в кэш устаревший профиль.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+from recipes.models import Follow, User
+
+
+STALE = 'stale'
+STALE_TIMEOUT = 30
+
+
+def _key(user_id):
+    return f'profile:{user_id}'
+
+
+class RequestProfiles:
+    """Профили и подписки, уже известные в рамках запроса."""
+
+    def __init__(self):
+        self.profiles = {}
+        self.subscribed = {}
+
+
+def _state(request):
+    if request is None:
+        return RequestProfiles()
+    state = getattr(request, '_profiles', None)
+    if state is None:
+        state = request._profiles = RequestProfiles()
+    return state
+
+
+def load_subscriptions(request, author_ids):
+    """Одним запросом узнаёт подписки на ещё не проверенных авторов."""
+    if request is None or not request.user.is_authenticated:
+        return
+    state = _state(request)
+    unknown = set(author_ids) - state.subscribed.keys()
+    if not unknown:
+        return
+    followed = set(Follow.objects.filter(
+        user_id=request.user.id, author_id__in=unknown
+    ).order_by().values_list('author_id', flat=True))
+    state.subscribed.update(
+        (author_id, author_id in followed) for author_id in unknown
+    )
+
+
+def is_subscribed(request, author_id):
+    if request is None or not request.user.is_authenticated:
+        return False
+    load_subscriptions(request, [author_id])
+    return _state(request).subscribed[author_id]
+
+
+def load_profiles(request, user_ids, serialize):
+    """Заполняет карту профилей запроса; serialize(user) -> dict."""
+    state = _state(request)
+    missing = set(user_ids) - state.profiles.keys()
+    timeout = settings.PROFILE_CACHE_TIMEOUT
+    cached = {}
+    if missing and timeout:
+        cached = cache.get_many(map(_key, missing))
+        for key, profile in cached.items():
+            if profile != STALE:
+                state.profiles[profile['id']] = profile
+        missing -= state.profiles.keys()
+    if missing:
+        loaded = {
+            user_id: serialize(user)
+            for user_id, user in User.objects.in_bulk(missing).items()
+        }
+        state.profiles.update(loaded)
+        if timeout:
+            for user_id, profile in loaded.items():
+                if _key(user_id) not in cached:
+                    cache.add(_key(user_id), profile, timeout)
+    return state.profiles
+
+
+def forget(user_id):
+    """Сбрасывает профиль в общем кэше во всех процессах."""
+    cache.set(_key(user_id), STALE, STALE_TIMEOUT)
@@ -0,0 +1,90 @@
+"""Id рецептов в избранном и списке покупок пользователя.
+
+Наборы хранятся в общем кэше как отсортированные массивы int64 (8 байт
+на рецепт), читаются одним обращением к кэшу на запрос и превращаются в
+frozenset, так что флаги is_favorited и is_in_shopping_cart проверяются
+без запросов к базе.
+
+Добавление и удаление не правят закэшированный массив (параллельные
+изменения теряли бы друг друга), а после фиксации транзакции ставят на
+набор отметку STALE на STALE_TIMEOUT секунд (см. api.signals). Пока она
+действует, набор читается из базы и не кэшируется: load() кладёт набор
+через cache.add, поэтому запрос, прочитавший базу до изменения, не
+вернёт в кэш устаревший снимок.
+"""
+from array import array
+from dataclasses import dataclass
+
+from django.core.cache import cache
+
+from recipes.models import Favorite, ShoppingList
+
+
+CACHE_TIMEOUT = 5 * 60
+STALE_TIMEOUT = 30
+# Массив id всегда кратен 8 байтам, поэтому отметку с ним не спутать.
+STALE = b'stale'
+KINDS = {
+    'favorites': Favorite,
+    'shopping_cart': ShoppingList,
+}
+
+
+@dataclass(frozen=True)
+class UserState:
+    favorites: frozenset = frozenset()
+    shopping_cart: frozenset = frozenset()
+
+
+def kind_of(model):
+    return next(kind for kind, source in KINDS.items() if source is model)
+
+
+def _key(user_id, kind):
+    return f'user-state:{kind}:{user_id}'
+
+
+def _unpack(data):
+    ids = array('q')
+    ids.frombytes(data)
+    return ids
+
+
+def load(user_id):
+    """Словарь {вид: отсортированный массив id} для пользователя."""
+    keys = {kind: _key(user_id, kind) for kind in KINDS}
+    cached = cache.get_many(keys.values())
+    result = {}
+    missing = {}
+    for kind, key in keys.items():
+        data = cached.get(key)
+        if data is not None and data != STALE:
+            result[kind] = _unpack(data)
+            continue
+        result[kind] = array('q', KINDS[kind].objects.filter(
+            user_id=user_id
+        ).order_by('recipe_id').values_list('recipe_id', flat=True))
+        if data is None:
+            missing[key] = result[kind].tobytes()
+    for key, data in missing.items():
+        cache.add(key, data, CACHE_TIMEOUT)
+    return result
+
+
+def for_request(request):
+    """Наборы текущего пользователя, загружаемые один раз за запрос."""
+    state = getattr(request, '_user_state', None)
+    if state is None:
+        state = UserState()
+        if request.user.is_authenticated:
+            state = UserState(**{
+                kind: frozenset(ids)
+                for kind, ids in load(request.user.id).items()
+            })
+        request._user_state = state
+    return state
+
+
+def forget(user_id, kind):
+    """Сбрасывает закэшированный набор во всех процессах."""
+    cache.set(_key(user_id, kind), STALE, STALE_TIMEOUT)
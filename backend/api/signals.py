@@ -0,0 +1,39 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from api.authentication import forget_tokens
+from api.services import profiles, user_state
+from recipes.models import Favorite, ShoppingList
+
+
+User = get_user_model()
+
+
+@receiver(post_delete, sender=Token)
+def forget_deleted_token(sender, instance, **kwargs):
+    """Выход из системы через djoser удаляет токен."""
+    forget_tokens(instance.key)
+
+
+@receiver(post_save, sender=User)
+def forget_user_tokens(sender, instance, created, **kwargs):
+    """Смена пароля, деактивация и любые другие изменения пользователя."""
+    if not created:
+        profiles.forget(instance.id)
+        forget_tokens(*Token.objects.filter(
+            user=instance
+        ).values_list('key', flat=True))
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingList)
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingList)
+def forget_user_state(sender, instance, **kwargs):
+    kind = user_state.kind_of(sender)
+    transaction.on_commit(
+        lambda: user_state.forget(instance.user_id, kind)
+    )
@@ -0,0 +1,75 @@
+import pickle
+
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+
+from api.authentication import (
+    CachedTokenAuthentication,
+    _cache_key,
+    cache_user,
+    forget_tokens,
+    get_cached_user,
+)
+from recipes.tests.utils import create_user
+
+
+class CachedTokenAuthenticationTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = create_user()
+        self.key = Token.objects.create(user=self.user).key
+        self.auth = CachedTokenAuthentication()
+
+    def authenticate(self):
+        return self.auth.authenticate_credentials(self.key)[0]
+
+    def test_cached_lookup_skips_database(self):
+        self.authenticate()
+        with self.assertNumQueries(0):
+            user = self.authenticate()
+        self.assertEqual(user.pk, self.user.pk)
+        self.assertTrue(user.is_active)
+
+    def test_password_hash_is_not_cached(self):
+        self.authenticate()
+        fields = cache.get(_cache_key(self.key))
+        self.assertNotIn('password', fields)
+        self.assertNotIn(self.user.password.encode(), pickle.dumps(fields))
+        self.assertTrue(self.authenticate().check_password('password'))
+
+    def test_each_request_gets_own_instance(self):
+        self.authenticate()
+        first = self.authenticate()
+        first.first_name = 'Изменено'
+        second = self.authenticate()
+        self.assertIsNot(first, second)
+        self.assertEqual(second.first_name, 'Имя')
+
+    def test_deleted_token_is_rejected(self):
+        self.authenticate()
+        Token.objects.get(key=self.key).delete()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_cached_inactive_user_is_rejected(self):
+        self.user.is_active = False
+        cache_user(self.key, self.user)
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_deactivated_user_is_rejected(self):
+        self.authenticate()
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_stale_read_is_not_cached_after_forget(self):
+        user = Token.objects.select_related('user').get(
+            key=self.key
+        ).user
+        forget_tokens(self.key)
+        cache_user(self.key, user)
+        self.assertIsNone(get_cached_user(self.key))
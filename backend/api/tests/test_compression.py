@@ -0,0 +1,38 @@
+import brotli
+from django.core.cache import cache
+from django.test import override_settings
+from rest_framework.test import APITestCase
+
+from recipes.tests.utils import create_recipe, create_user
+
+
+@override_settings(
+    RESPONSE_CACHE={'ENABLED': True, 'TIMEOUT': 300},
+    ALLOWED_HOSTS=['first.example', 'second.example'],
+)
+class CompressedCacheTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.recipe = create_recipe(create_user())
+
+    def get(self, path, host='first.example', encoding='gzip, br'):
+        return self.client.get(
+            path, HTTP_HOST=host, HTTP_ACCEPT_ENCODING=encoding
+        )
+
+    def test_serves_brotli(self):
+        plain = self.get('/api/recipes/', encoding='')
+        self.assertFalse(plain.has_header('Content-Encoding'))
+        for _ in range(2):
+            response = self.get('/api/recipes/')
+            self.assertEqual(response['Content-Encoding'], 'br')
+            self.assertEqual(
+                brotli.decompress(response.content), plain.content
+            )
+
+    def test_absolute_urls_follow_host(self):
+        path = f'/api/recipes/{self.recipe.id}/get-link/'
+        for host in ('first.example', 'second.example'):
+            response = self.get(path, host=host, encoding='')
+            self.assertEqual(response.status_code, 200)
+            self.assertIn(f'//{host}/', response.json()['short-link'])
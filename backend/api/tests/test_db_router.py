@@ -0,0 +1,57 @@
+from unittest import mock
+
+from django.core.cache import cache
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from foodgram import db_router
+from recipes.models import Follow, User
+from recipes.tests.utils import create_user
+
+
+class ReplicaRoutingTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        create_user()
+        self.reads = []
+        db_for_read = db_router.ReplicaRouter.db_for_read
+
+        def record(router, model, **hints):
+            alias = db_for_read(router, model, **hints)
+            self.reads.append((model, alias))
+            return alias
+
+        # Реплика — та же тестовая база, поэтому запросы к ней выполняются,
+        # а записываются только решения маршрутизатора.
+        for patcher in (
+            mock.patch.object(db_router, 'REPLICA', 'default'),
+            mock.patch.object(
+                db_router.ReplicaRouter, 'db_for_read', record
+            ),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_token_is_read_from_primary_right_after_login(self):
+        response = self.client.post(
+            '/api/auth/token/login/',
+            {'email': 'author@example.com', 'password': 'password'},
+        )
+        self.assertEqual(response.status_code, 200)
+        # Клиент без cookie: закрепление по адресу на запрос с токеном
+        # не распространяется.
+        self.client.cookies.clear()
+        self.reads.clear()
+        response = self.client.get(
+            '/api/users/me/',
+            HTTP_AUTHORIZATION=f'Token {response.json()["auth_token"]}',
+        )
+        self.assertEqual(response.status_code, 200)
+        auth_reads = [
+            alias for model, alias in self.reads if model in (Token, User)
+        ]
+        self.assertTrue(auth_reads)
+        self.assertEqual(set(auth_reads), {None})
+        self.assertIn(
+            (Follow, 'default'), self.reads, 'остальное читается с реплики'
+        )
@@ -0,0 +1,162 @@
+import asyncio
+import json
+from types import SimpleNamespace
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from foodgram import live
+from recipes import live as counts
+from recipes.models import Favorite
+from recipes.tests.utils import create_recipe, create_user
+
+
+LIVE_UPDATES = {
+    'BACKEND': 'local',
+    'POLL_INTERVAL': 0.01,
+    'HEARTBEAT': 15,
+    'MAX_CHANNELS': 3,
+}
+
+
+class Client:
+    """Соединение с потоком, которое разрывается по команде."""
+
+    def __init__(self, query_string):
+        self.scope = {
+            'type': 'http',
+            'method': 'GET',
+            'path': live.PATH,
+            'query_string': query_string,
+        }
+        self.messages = []
+        self.closed = asyncio.Event()
+
+    async def receive(self):
+        await self.closed.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(self, message):
+        self.messages.append(message)
+
+    def events(self):
+        return [
+            json.loads(body.split(b'data: ')[1])
+            for body in (
+                message.get('body', b'') for message in self.messages
+            )
+            if body.startswith(b'event: counts')
+        ]
+
+
+async def wait_for(condition):
+    for _ in range(500):
+        if condition():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError('Условие не выполнилось')
+
+
+def run_stream(query_string, scenario, application=live.stream):
+    client = Client(query_string)
+
+    async def main():
+        task = asyncio.ensure_future(
+            application(client.scope, client.receive, client.send)
+        )
+        await scenario(client)
+        client.closed.set()
+        await asyncio.wait_for(task, 1)
+
+    asyncio.run(main())
+    return client
+
+
+@override_settings(LIVE_UPDATES=LIVE_UPDATES)
+class LiveStreamTest(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_parse_channels(self):
+        self.assertEqual(
+            live.parse_channels(b'recipes=1,2,x&authors=3&other=4'),
+            {('recipes', 1), ('recipes', 2), ('authors', 3)},
+        )
+
+    def test_requires_channels(self):
+        async def scenario(client):
+            pass
+
+        for query_string in (b'', b'recipes=1,2,3,4'):
+            client = run_stream(query_string, scenario)
+            self.assertEqual(client.messages[0]['status'], 400)
+
+    def test_streams_latest_values(self):
+        async def scenario(client):
+            await wait_for(lambda: live.hub.channels)
+            live.hub.deliver({('recipes', 1): 5, ('authors', 9): 1})
+            live.hub.deliver({('recipes', 1): 6, ('authors', 3): 0})
+            await wait_for(client.events)
+
+        client = run_stream(b'recipes=1&authors=3', scenario)
+        self.assertEqual(client.messages[0]['status'], 200)
+        self.assertEqual(
+            client.events(), [{'recipes': {'1': 6}, 'authors': {'3': 0}}]
+        )
+        self.assertFalse(live.hub.channels)
+
+    @override_settings(LIVE_UPDATES={**LIVE_UPDATES, 'BACKEND': 'cache'})
+    def test_cache_backend_delivers_published_changes(self):
+        async def scenario(client):
+            await wait_for(lambda: live.hub.channels)
+            await asyncio.sleep(0.05)
+            live.publish({('recipes', 1): 1})
+            live.publish({('recipes', 2): 1})
+            await wait_for(client.events)
+
+        client = run_stream(b'recipes=1', scenario)
+        self.assertEqual(client.events(), [{'recipes': {'1': 1}}])
+
+
+class CheckBackendTest(SimpleTestCase):
+    @override_settings(LIVE_UPDATES=LIVE_UPDATES, EVENTS_EAGER=False)
+    def test_misconfigured_stream_is_unavailable(self):
+        with self.assertLogs('foodgram.live', 'WARNING'):
+            application = live.endpoint()
+
+        async def scenario(client):
+            pass
+
+        client = run_stream(b'recipes=1', scenario, application)
+        self.assertEqual(client.messages[0]['status'], 503)
+        with self.settings(EVENTS_EAGER=True):
+            self.assertIs(live.endpoint(), live.stream)
+
+    @override_settings(LIVE_UPDATES=LIVE_UPDATES, EVENTS_EAGER=False)
+    def test_local_backend_requires_eager_events(self):
+        with self.assertRaises(ImproperlyConfigured):
+            live.check_backend()
+        with self.settings(EVENTS_EAGER=True):
+            live.check_backend()
+
+    @override_settings(LIVE_UPDATES={**LIVE_UPDATES, 'BACKEND': 'cache'})
+    def test_cache_backend_requires_shared_cache(self):
+        with self.assertRaises(ImproperlyConfigured):
+            live.check_backend()
+
+
+class PublishedCountsTest(TestCase):
+    def test_publishes_current_favorites_count(self):
+        author = create_user()
+        recipe = create_recipe(author)
+        for name in ('first', 'second'):
+            Favorite.objects.create(user=create_user(name), recipe=recipe)
+        event = SimpleNamespace(
+            name='favorite.added', payload={'recipe': recipe.id}
+        )
+        with mock.patch.object(live, 'publish') as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                counts.favorite_count(event)
+        publish.assert_called_once_with({('recipes', recipe.id): 2})
@@ -0,0 +1,64 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.paginator import EmptyPage
+from django.test import TestCase
+from rest_framework.test import APITestCase
+
+from recipes.estimates import EstimatedCountPaginator
+from recipes.models import Recipe
+from recipes.tests.utils import create_recipe, create_user
+
+
+def estimate(count):
+    return mock.patch(
+        'recipes.estimates.estimated_count', return_value=count
+    )
+
+
+class EstimatedCountPaginatorTest(TestCase):
+    def setUp(self):
+        author = create_user()
+        for number in range(10):
+            create_recipe(author, f'Рецепт {number}')
+        self.paginator = EstimatedCountPaginator(
+            Recipe.objects.order_by('id'), 3
+        )
+
+    def test_underestimate_serves_real_pages(self):
+        with estimate(2):
+            page = self.paginator.page(2)
+            self.assertTrue(page.has_next())
+            last = self.paginator.page(4)
+        self.assertEqual(len(last), 1)
+        self.assertFalse(last.has_next())
+        self.assertEqual(self.paginator.count, 10)
+
+    def test_overestimate_ends_at_last_row(self):
+        with estimate(100):
+            page = self.paginator.page(4)
+            self.assertFalse(page.has_next())
+            with self.assertRaises(EmptyPage):
+                self.paginator.page(5)
+
+    def test_page_with_more_rows_keeps_larger_estimate(self):
+        with estimate(100):
+            page = self.paginator.page(1)
+        self.assertEqual(len(page), 3)
+        self.assertEqual(self.paginator.count, 100)
+
+
+class RecipePagesTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        author = create_user()
+        for number in range(7):
+            create_recipe(author, f'Рецепт {number}')
+
+    def test_page_beyond_stale_count(self):
+        with estimate(6):
+            response = self.client.get('/api/recipes/?page=2')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['count'], 7)
+        self.assertEqual(len(response.json()['results']), 1)
+        self.assertIsNone(response.json()['next'])
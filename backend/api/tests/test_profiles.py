@@ -0,0 +1,44 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from api.services import profiles
+from recipes.tests.utils import create_user
+
+
+def serialize(user):
+    return {'id': user.id, 'username': user.username}
+
+
+@override_settings(PROFILE_CACHE_TIMEOUT=60)
+class LoadProfilesTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = create_user()
+
+    def username(self, serialize=serialize):
+        return profiles.load_profiles(
+            None, [self.user.id], serialize
+        )[self.user.id]['username']
+
+    def rename(self, username):
+        self.user.username = username
+        self.user.save()
+
+    def test_cached_profile_skips_database(self):
+        self.username()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.username(), 'author')
+
+    def test_saved_user_is_read_again(self):
+        self.username()
+        self.rename('renamed')
+        self.assertEqual(self.username(), 'renamed')
+
+    def test_profile_read_before_change_is_not_cached(self):
+        def serialize_then_change(user):
+            profile = serialize(user)
+            self.rename('renamed')
+            return profile
+
+        self.assertEqual(self.username(serialize_then_change), 'author')
+        self.assertEqual(self.username(), 'renamed')
@@ -0,0 +1,29 @@
+from django.core.cache import cache
+from rest_framework.test import APITestCase
+
+from recipes.models import RecipeSimilarity
+from recipes.tests.utils import create_recipe, create_user
+
+
+class SimilarRecipesTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        author = create_user()
+        self.recipe = create_recipe(author)
+        self.similar = create_recipe(author, 'Похожий')
+        RecipeSimilarity.objects.create(
+            recipe=self.recipe, similar=self.similar, rank=1, score=0.5
+        )
+
+    def test_lists_similar_recipes(self):
+        response = self.client.get(f'/api/recipes/{self.recipe.id}/similar/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [recipe['id'] for recipe in response.json()], [self.similar.id]
+        )
+
+    def test_unknown_recipe_is_not_found(self):
+        response = self.client.get(
+            f'/api/recipes/{self.similar.id + 1}/similar/'
+        )
+        self.assertEqual(response.status_code, 404)
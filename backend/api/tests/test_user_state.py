@@ -0,0 +1,74 @@
+from array import array
+from datetime import timedelta
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+
+from api.services import user_state
+from recipes.archive import archive_shopping_lists
+from recipes.models import Favorite, ShoppingList
+from recipes.tests.utils import create_recipe, create_user
+
+
+class UserStateTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = create_user()
+        self.recipes = [
+            create_recipe(self.user, f'Рецепт {number}')
+            for number in range(3)
+        ]
+
+    def favorites(self):
+        return list(user_state.load(self.user.id)['favorites'])
+
+    def favorite(self, recipe):
+        with self.captureOnCommitCallbacks(execute=True):
+            Favorite.objects.create(user=self.user, recipe=recipe)
+
+    def test_cached_read_skips_database(self):
+        Favorite.objects.create(user=self.user, recipe=self.recipes[1])
+        self.favorites()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.favorites(), [self.recipes[1].id])
+
+    def test_changes_are_read_from_database(self):
+        self.favorites()
+        self.favorite(self.recipes[2])
+        self.favorite(self.recipes[0])
+        with self.captureOnCommitCallbacks(execute=True):
+            ShoppingList.objects.create(user=self.user, recipe=self.recipes[1])
+        state = user_state.load(self.user.id)
+        self.assertEqual(
+            list(state['favorites']),
+            [self.recipes[0].id, self.recipes[2].id],
+        )
+        self.assertEqual(list(state['shopping_cart']), [self.recipes[1].id])
+
+    def test_snapshot_read_before_change_is_not_cached(self):
+        def read_then_change(*args):
+            ids = array(*args)
+            if not Favorite.objects.exists():
+                self.favorite(self.recipes[0])
+            return ids
+
+        with mock.patch.object(user_state, 'array', read_then_change):
+            self.assertEqual(self.favorites(), [])
+        self.assertEqual(self.favorites(), [self.recipes[0].id])
+
+    def test_archived_rows_leave_shopping_cart(self):
+        ShoppingList.objects.create(
+            user=self.user, recipe=self.recipes[0],
+            created=timezone.now() - timedelta(days=10),
+        )
+        self.assertEqual(
+            list(user_state.load(self.user.id)['shopping_cart']),
+            [self.recipes[0].id],
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            archive_shopping_lists(days=1)
+        self.assertEqual(
+            list(user_state.load(self.user.id)['shopping_cart']), []
+        )
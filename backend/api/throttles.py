@@ -0,0 +1,27 @@
+from rest_framework.throttling import SimpleRateThrottle, UserRateThrottle
+
+
+class IPRateThrottle(SimpleRateThrottle):
+    """Ограничение по IP-адресу независимо от пользователя."""
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {
+            'scope': self.scope,
+            'ident': self.get_ident(request),
+        }
+
+
+class ShoppingCartUserThrottle(UserRateThrottle):
+    scope = 'shopping_cart'
+
+
+class ShoppingCartIPThrottle(IPRateThrottle):
+    scope = 'shopping_cart_ip'
+
+
+class IngredientsUserThrottle(UserRateThrottle):
+    scope = 'ingredients'
+
+
+class IngredientsIPThrottle(IPRateThrottle):
+    scope = 'ingredients_ip'
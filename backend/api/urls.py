@@ -4,6 +4,7 @@ from rest_framework import routers
 
 from api.views import (
     IngredientsViewSet,
+    ProfileView,
     RecipeViewSet,
     TagViewSet,
     UserViewSet,
@@ -21,4 +22,5 @@ app_name = 'api'
 urlpatterns = [
     path('', include(router.urls)),
     path('auth/', include('djoser.urls.authtoken')),
+    path('_debug/profile/', ProfileView.as_view(), name='debug-profile'),
 ]
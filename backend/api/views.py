@@ -1,4 +1,7 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Prefetch
 from django.http import FileResponse, Http404
 from django.shortcuts import get_object_or_404
 from django.urls import reverse
@@ -7,10 +10,12 @@ from djoser.views import UserViewSet as DjoserUserViewSet
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
 from rest_framework.exceptions import ValidationError
-from rest_framework.pagination import PageNumberPagination
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.views import APIView
 
+from foodgram import profiling
+from recipes import events, revisions, short_links
 from recipes.models import (
     Favorite,
     Follow,
@@ -20,21 +25,35 @@ from recipes.models import (
     Tag,
 )
 from api.services.shopping_list import generate_shopping_list_content
+from api.services import user_state
+from api.services.single_flight import single_flight
+from .fieldsets import Selection
 from .filters import IngredientFilter, RecipeFilter
-from .permissions import IsAuthorOrReadOnly
+from .pagination import PageNumberPagination
+from .permissions import IsAuthorOrReadOnly, IsAuthorOrStaff
 from .serializers import (
     AvatarSerializer,
     FollowUserSerializer,
     IngredientsSerializer,
     RecipeReadSerializer,
+    RecipeRevisionSerializer,
     RecipeWriteSerializer,
     ShortRecipeSerializer,
     TagSerializer,
 )
+from .throttles import (
+    IngredientsIPThrottle,
+    IngredientsUserThrottle,
+    ShoppingCartIPThrottle,
+    ShoppingCartUserThrottle,
+)
 
 
 User = get_user_model()
 
+# Столбцы рецепта, которые не читаются, если их нет в ?fields=.
+DEFERRABLE_RECIPE_FIELDS = ('name', 'image', 'text', 'cooking_time')
+
 
 class TagViewSet(viewsets.ReadOnlyModelViewSet):
     """Вьюсет для тегов."""
@@ -52,6 +71,16 @@ class IngredientsViewSet(viewsets.ReadOnlyModelViewSet):
     pagination_class = None
     filter_backends = (IngredientFilter,)
     search_fields = ('^name',)
+    throttle_classes = (IngredientsUserThrottle, IngredientsIPThrottle)
+
+    def list(self, request, *args, **kwargs):
+        """Одинаковые одновременные запросы вычисляются один раз."""
+        return Response(single_flight.do(
+            ('ingredients', request.get_full_path()),
+            lambda: self.get_serializer(
+                self.filter_queryset(self.get_queryset()), many=True
+            ).data,
+        ))
 
 
 class RecipeViewSet(viewsets.ModelViewSet):
@@ -69,24 +98,71 @@ class RecipeViewSet(viewsets.ModelViewSet):
             return RecipeReadSerializer
         return RecipeWriteSerializer
 
+    def get_queryset(self):
+        """Загружаем только поля и связи, которые попадут в ответ."""
+        recipes = super().get_queryset()
+        if self.action not in ('list', 'retrieve'):
+            return recipes
+        requested = Selection(self.request)
+        recipes = recipes.defer(*(
+            field for field in DEFERRABLE_RECIPE_FIELDS
+            if not requested.wanted(field)
+        ))
+        if requested.wanted('tags'):
+            recipes = recipes.prefetch_related('tags')
+        if requested.wanted('ingredients'):
+            recipes = recipes.prefetch_related(
+                'recipe_ingredients__ingredient'
+                if requested.nested('ingredients')
+                else 'recipe_ingredients'
+            )
+        return recipes
+
     def get_serializer_context(self):
         """Добавляем request в контекст сериализатора."""
         context = super().get_serializer_context()
         context['request'] = self.request
         return context
 
+    @transaction.atomic
     def perform_create(self, serializer):
-        serializer.save(author=self.request.user)
+        recipe = serializer.save(author=self.request.user)
+        events.publish(
+            'recipe.created',
+            {'recipe': recipe.id, 'author': recipe.author_id},
+            key=f'recipe.created:{recipe.id}',
+        )
+
+    @transaction.atomic
+    def perform_update(self, serializer):
+        recipe = serializer.save()
+        events.publish(
+            'recipe.updated',
+            {'recipe': recipe.id, 'author': recipe.author_id},
+        )
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        events.publish(
+            'recipe.deleted',
+            {'recipe': instance.id, 'author': instance.author_id},
+            key=f'recipe.deleted:{instance.id}',
+        )
+        instance.delete()
 
     @action(
         detail=False,
         methods=['get'],
         url_path='download_shopping_cart',
-        permission_classes=[IsAuthenticated]
+        permission_classes=[IsAuthenticated],
+        throttle_classes=[ShoppingCartUserThrottle, ShoppingCartIPThrottle],
     )
     def download_shopping_cart(self, request):
         return FileResponse(
-            generate_shopping_list_content(request.user),
+            single_flight.do(
+                ('shopping_cart', request.user.id),
+                lambda: generate_shopping_list_content(request.user),
+            ),
             content_type='text/plain',
             headers={
                 'Content-Disposition':
@@ -94,6 +170,74 @@ class RecipeViewSet(viewsets.ModelViewSet):
             }
         )
 
+    @action(detail=True, methods=['get'])
+    def similar(self, request, pk=None):
+        """Похожие рецепты из таблицы, которую заполняет
+        build_recipe_similarity."""
+        get_object_or_404(Recipe.objects.only('id'), id=pk)
+        recipes = Recipe.objects.filter(
+            similar_to__recipe_id=pk
+        ).order_by('similar_to__rank').only(*ShortRecipeSerializer.Meta.fields)
+        return Response(ShortRecipeSerializer(
+            recipes, many=True, context=self.get_serializer_context()
+        ).data)
+
+    @action(
+        detail=True,
+        methods=['get'],
+        url_path='revisions',
+        permission_classes=[IsAuthenticated, IsAuthorOrStaff],
+    )
+    def revision_list(self, request, pk=None):
+        """Версии рецепта, от первой к последней."""
+        recipe = self.get_object()
+        return Response(RecipeRevisionSerializer(
+            recipe.revisions.all(), many=True
+        ).data)
+
+    @action(
+        detail=True,
+        methods=['get'],
+        url_path=r'revisions/(?P<number>\d+)',
+        permission_classes=[IsAuthenticated, IsAuthorOrStaff],
+    )
+    def revision_detail(self, request, pk=None, number=None):
+        """Состояние рецепта в указанной версии."""
+        recipe = self.get_object()
+        state = revisions.reconstruct(recipe.id, int(number))
+        if state is None:
+            raise Http404(f'Версия {number} рецепта не найдена')
+        return Response({'number': int(number), **state})
+
+    @action(
+        detail=True,
+        methods=['get'],
+        url_path='revisions/diff',
+        permission_classes=[IsAuthenticated, IsAuthorOrStaff],
+    )
+    def revision_diff(self, request, pk=None):
+        """Различия двух версий: ?from=<номер>&to=<номер>."""
+        recipe = self.get_object()
+        numbers = {}
+        for param in ('from', 'to'):
+            value = request.query_params.get(param, '')
+            if not value.isdigit():
+                raise ValidationError(
+                    {param: 'Укажите номер версии.'}
+                )
+            numbers[param] = int(value)
+        states = {
+            param: revisions.reconstruct(recipe.id, number)
+            for param, number in numbers.items()
+        }
+        for param, state in states.items():
+            if state is None:
+                raise Http404(f'Версия {numbers[param]} рецепта не найдена')
+        return Response({
+            **numbers,
+            'changes': revisions.compare(states['from'], states['to']),
+        })
+
     @action(detail=True, methods=['get'], url_path='get-link')
     def get_link(self, request, pk=None):
         if not Recipe.objects.filter(id=pk).exists():
@@ -102,7 +246,7 @@ class RecipeViewSet(viewsets.ModelViewSet):
             {
                 'short-link': request.build_absolute_uri(
                     reverse('recipes:recipe-short-link',
-                            args=[pk])
+                            args=[short_links.get_or_create_code(pk)])
                 )
             }
         )
@@ -111,18 +255,33 @@ class RecipeViewSet(viewsets.ModelViewSet):
         """Общий метод для управления избранным и списком покупок."""
         user = request.user
         serializer_class = ShortRecipeSerializer
+        event = model_class._meta.model_name
 
         if request.method == 'DELETE':
-            get_object_or_404(model_class,
-                              user=user,
-                              recipe__id=pk).delete()
+            with transaction.atomic():
+                relation = get_object_or_404(model_class,
+                                             user=user,
+                                             recipe__id=pk)
+                events.publish(
+                    f'{event}.removed',
+                    {'user': user.id, 'recipe': relation.recipe_id},
+                    key=f'{event}.removed:{relation.id}',
+                )
+                relation.delete()
             return Response(status=status.HTTP_204_NO_CONTENT)
 
         recipe = get_object_or_404(Recipe, id=pk)
-        _, created = model_class.objects.get_or_create(
-            user=user,
-            recipe=recipe
-        )
+        with transaction.atomic():
+            relation, created = model_class.objects.get_or_create(
+                user=user,
+                recipe=recipe
+            )
+            if created:
+                events.publish(
+                    f'{event}.added',
+                    {'user': user.id, 'recipe': recipe.id},
+                    key=f'{event}.added:{relation.id}',
+                )
 
         if not created:
             model_name = model_class._meta.verbose_name.lower()
@@ -180,6 +339,20 @@ class UserViewSet(DjoserUserViewSet):
         """Получение текущего пользователя."""
         return super().me(request)
 
+    @action(
+        methods=['get'],
+        detail=False,
+        url_path='me/state',
+        permission_classes=[IsAuthenticated],
+    )
+    def state(self, request):
+        """Id рецептов в избранном и списке покупок текущего
+        пользователя."""
+        return Response({
+            kind: ids.tolist()
+            for kind, ids in user_state.load(request.user.id).items()
+        })
+
     @action(
         methods=['put', 'delete'],
         detail=False,
@@ -190,7 +363,10 @@ class UserViewSet(DjoserUserViewSet):
         """PUT: добавление аватара, DELETE: удаление аватара."""
         user = request.user
         if request.method == 'DELETE':
-            user.avatar.delete()
+            # Файл удаляется после фиксации, когда ссылка на него уже
+            # стёрта из базы.
+            with transaction.atomic():
+                user.avatar.delete()
             return Response(status=status.HTTP_204_NO_CONTENT)
         serializer = AvatarSerializer(
             instance=user,
@@ -209,12 +385,18 @@ class UserViewSet(DjoserUserViewSet):
     )
     def subscriptions(self, request):
         """Получение списка подписок с рецептами."""
+        requested = Selection(request)
+        authors = User.objects.filter(authors__user=request.user)
+        if requested.wanted('recipes') or requested.wanted('recipes_count'):
+            authors = authors.prefetch_related(Prefetch(
+                'recipes',
+                queryset=Recipe.objects.only(
+                    'author_id', *ShortRecipeSerializer.Meta.fields
+                ),
+            ))
         return self.get_paginated_response(
             FollowUserSerializer(
-                self.paginate_queryset(
-                    User.objects.filter(
-                        authors__user=request.user).prefetch_related('recipes')
-                ),
+                self.paginate_queryset(authors),
                 many=True,
                 context={'request': request}).data
         )
@@ -231,10 +413,17 @@ class UserViewSet(DjoserUserViewSet):
         author_id = id
 
         if request.method == 'DELETE':
-            get_object_or_404(
-                Follow,
-                user=user,
-                author_id=author_id).delete()
+            with transaction.atomic():
+                follow = get_object_or_404(
+                    Follow,
+                    user=user,
+                    author_id=author_id)
+                events.publish(
+                    'follow.removed',
+                    {'user': user.id, 'author': follow.author_id},
+                    key=f'follow.removed:{follow.id}',
+                )
+                follow.delete()
             return Response(status=status.HTTP_204_NO_CONTENT)
 
         author = get_object_or_404(User, id=author_id)
@@ -245,10 +434,17 @@ class UserViewSet(DjoserUserViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        _, created = Follow.objects.get_or_create(
-            user=user,
-            author=author,
-        )
+        with transaction.atomic():
+            follow, created = Follow.objects.get_or_create(
+                user=user,
+                author=author,
+            )
+            if created:
+                events.publish(
+                    'follow.added',
+                    {'user': user.id, 'author': author.id},
+                    key=f'follow.added:{follow.id}',
+                )
 
         if not created:
             return Response(
@@ -262,3 +458,24 @@ class UserViewSet(DjoserUserViewSet):
             ).data,
             status=status.HTTP_201_CREATED
         )
+
+
+class ProfileView(APIView):
+    """Сводка профилирования запросов по маршрутам для персонала."""
+
+    permission_classes = [IsAdminUser]
+    ordering_fields = (
+        'queries', 'max_queries', 'db_ms', 'serializer_ms', 'render_ms',
+        'total_ms', 'requests',
+    )
+
+    def get(self, request):
+        order_by = request.query_params.get('ordering', 'queries')
+        if order_by not in self.ordering_fields:
+            raise ValidationError(
+                {'ordering': f'Допустимые значения: {self.ordering_fields}'}
+            )
+        return Response({
+            'enabled': settings.API_PROFILING,
+            'routes': profiling.top_offenders(order_by),
+        })
@@ -0,0 +1,32 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+
+METRICS = ('p50_ms', 'p95_ms', 'p99_ms', 'cpu_ms', 'queries',
+           'peak_alloc_kb')
+
+
+class Command(BaseCommand):
+    help = 'Сравнение двух отчётов bench_run'
+
+    def add_arguments(self, parser):
+        parser.add_argument('before')
+        parser.add_argument('after')
+
+    def handle(self, *args, **options):
+        with open(options['before']) as f:
+            before = json.load(f)['scenarios']
+        with open(options['after']) as f:
+            after = json.load(f)['scenarios']
+        for name in sorted(before.keys() & after.keys()):
+            changes = []
+            for metric in METRICS:
+                old, new = before[name][metric], after[name][metric]
+                if old == new:
+                    continue
+                delta = (new - old) / old * 100 if old else float('inf')
+                changes.append(f'{metric} {old} -> {new} ({delta:+.0f}%)')
+            self.stdout.write(
+                f'{name}: {"; ".join(changes) or "без изменений"}'
+            )
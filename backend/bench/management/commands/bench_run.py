@@ -0,0 +1,74 @@
+import json
+import platform
+import subprocess
+import sys
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+
+from bench.management.commands.bench_seed import bench_users
+from bench.runner import (
+    SCENARIOS,
+    Runner,
+    dataset_summary,
+    throttling_disabled,
+)
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = 'Замер ключевых эндпоинтов API на сгенерированных данных'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=2)
+        parser.add_argument(
+            '--scenario',
+            action='append',
+            choices=sorted(SCENARIOS),
+            help='Сценарий для запуска; можно указать несколько раз',
+        )
+        parser.add_argument(
+            '--output',
+            default='-',
+            help='Файл для JSON-отчёта (по умолчанию stdout)',
+        )
+
+    def handle(self, *args, **options):
+        user = bench_users().order_by('id').first()
+        if user is None:
+            raise CommandError('Сначала выполните bench_seed')
+        runner = Runner(user, options['iterations'], options['warmup'])
+        scenarios = {}
+        with throttling_disabled():
+            for name in options['scenario'] or SCENARIOS:
+                scenarios[name] = runner.run(name)
+                self.stderr.write(
+                    f'{name}: p50={scenarios[name]["p50_ms"]} мс, '
+                    f'queries={scenarios[name]["queries"]}'
+                )
+        report = json.dumps(
+            {
+                'revision': git_revision(),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'dataset': dataset_summary(),
+                'scenarios': scenarios,
+            },
+            indent=2,
+            sort_keys=True,
+        )
+        if options['output'] == '-':
+            sys.stdout.write(report + '\n')
+        else:
+            with open(options['output'], 'w') as f:
+                f.write(report + '\n')
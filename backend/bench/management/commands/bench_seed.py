@@ -0,0 +1,213 @@
+import random
+import time
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from recipes.models import (
+    Favorite,
+    Follow,
+    Ingredients,
+    Recipe,
+    RecipeIngredient,
+    ShoppingList,
+    Tag,
+    User,
+)
+
+
+EMAIL_DOMAIN = 'bench.local'
+PASSWORD = 'bench-password'
+IMAGE = 'recipe/images/bench.png'
+BATCH_SIZE = 5000
+
+
+def zipf_weights(count, exponent=1.1):
+    """Накопленные веса: первые элементы встречаются заметно чаще."""
+    return list(accumulate(
+        1 / rank ** exponent for rank in range(1, count + 1)
+    ))
+
+
+def sample(rng, population, cum_weights, count):
+    """Выборка без повторов с учётом весов."""
+    count = min(count, len(population))
+    chosen = set()
+    while len(chosen) < count:
+        chosen.update(rng.choices(
+            population, cum_weights=cum_weights, k=count - len(chosen)
+        ))
+    return sorted(chosen)
+
+
+def bench_users():
+    return User.objects.filter(email__endswith=f'@{EMAIL_DOMAIN}')
+
+
+class Command(BaseCommand):
+    help = 'Генерация воспроизводимого набора данных для бенчмарков'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument('--tags', type=int, default=10)
+        parser.add_argument('--follows-per-user', type=int, default=10)
+        parser.add_argument('--favorites-per-user', type=int, default=30)
+        parser.add_argument('--cart-per-user', type=int, default=5)
+        parser.add_argument('--ingredients-per-recipe', type=int, default=8)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument(
+            '--clear',
+            action='store_true',
+            help='Удалить ранее сгенерированные данные',
+        )
+
+    def step(self, message, started):
+        self.stdout.write(f'{message} ({time.monotonic() - started:.1f} с)')
+
+    def ensure_tags(self, count):
+        missing = count - Tag.objects.count()
+        Tag.objects.bulk_create(
+            Tag(name=f'bench-{number}', slug=f'bench-{number}')
+            for number in range(missing)
+        )
+        return list(Tag.objects.order_by('id').values_list('id', flat=True))
+
+    def create_users(self, count):
+        password = make_password(PASSWORD)
+        User.objects.bulk_create(
+            (
+                User(
+                    username=f'bench_{number}',
+                    email=f'bench_{number}@{EMAIL_DOMAIN}',
+                    first_name='Bench',
+                    last_name=str(number),
+                    password=password,
+                )
+                for number in range(count)
+            ),
+            batch_size=BATCH_SIZE,
+        )
+        return list(
+            bench_users().order_by('id').values_list('id', flat=True)
+        )
+
+    def create_recipes(self, rng, count, users, tags, ingredients,
+                       per_recipe):
+        authors = zipf_weights(len(users), exponent=0.8)
+        tag_weights = zipf_weights(len(tags), exponent=0.7)
+        ingredient_weights = zipf_weights(len(ingredients))
+        plan = [
+            (
+                rng.choices(users, cum_weights=authors)[0],
+                sample(rng, tags, tag_weights, rng.randint(1, 3)),
+                sample(
+                    rng,
+                    ingredients,
+                    ingredient_weights,
+                    max(1, int(rng.gauss(per_recipe, per_recipe / 3))),
+                ),
+            )
+            for _ in range(count)
+        ]
+        Recipe.objects.bulk_create(
+            (
+                Recipe(
+                    author_id=author_id,
+                    name=f'Рецепт {number}',
+                    text=f'Описание рецепта {number}. ' * rng.randint(5, 40),
+                    cooking_time=max(1, int(rng.lognormvariate(3.3, 0.6))),
+                    image=IMAGE,
+                )
+                for number, (author_id, _, _) in enumerate(plan)
+            ),
+            batch_size=BATCH_SIZE,
+        )
+        recipes = list(
+            Recipe.objects.filter(author__in=bench_users())
+            .order_by('id').values_list('id', flat=True)
+        )
+        Recipe.tags.through.objects.bulk_create(
+            (
+                Recipe.tags.through(recipe_id=recipe_id, tag_id=tag_id)
+                for recipe_id, (_, recipe_tags, _) in zip(recipes, plan)
+                for tag_id in recipe_tags
+            ),
+            batch_size=BATCH_SIZE,
+        )
+        RecipeIngredient.objects.bulk_create(
+            (
+                RecipeIngredient(
+                    recipe_id=recipe_id,
+                    ingredient_id=ingredient_id,
+                    amount=rng.randint(1, 500),
+                )
+                for recipe_id, (_, _, recipe_ingredients) in zip(
+                    recipes, plan
+                )
+                for ingredient_id in recipe_ingredients
+            ),
+            batch_size=BATCH_SIZE,
+        )
+        return recipes
+
+    def create_links(self, rng, model, field, users, targets, per_user):
+        """Подписки, избранное или корзины: популярные цели чаще."""
+        weights = zipf_weights(len(targets))
+        model.objects.bulk_create(
+            (
+                model(user_id=user_id, **{f'{field}_id': target_id})
+                for user_id in users
+                for target_id in sample(
+                    rng, targets, weights, rng.randint(0, 2 * per_user)
+                )
+                if target_id != user_id or field != 'author'
+            ),
+            batch_size=BATCH_SIZE,
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        if options['clear']:
+            Recipe.objects.filter(author__in=bench_users()).delete()
+            bench_users().delete()
+            self.step('Удалены старые данные', started)
+        if bench_users().exists():
+            raise CommandError(
+                'Данные уже сгенерированы, используйте --clear'
+            )
+        ingredients = list(
+            Ingredients.objects.order_by('id').values_list('id', flat=True)
+        )
+        if not ingredients:
+            raise CommandError(
+                'Нет ингредиентов: сначала выполните import_ingredients'
+            )
+        rng = random.Random(options['seed'])
+        with transaction.atomic():
+            tags = self.ensure_tags(options['tags'])
+            users = self.create_users(options['users'])
+            self.step(f'Создано {len(users)} пользователей', started)
+            recipes = self.create_recipes(
+                rng,
+                options['recipes'],
+                users,
+                tags,
+                ingredients,
+                options['ingredients_per_recipe'],
+            )
+            self.step(f'Создано {len(recipes)} рецептов', started)
+            for model, field, targets, per_user in (
+                (Follow, 'author', users, options['follows_per_user']),
+                (Favorite, 'recipe', recipes, options['favorites_per_user']),
+                (ShoppingList, 'recipe', recipes, options['cart_per_user']),
+            ):
+                self.create_links(rng, model, field, users, targets, per_user)
+                self.step(
+                    f'Создано {model.objects.count()} '
+                    f'{model._meta.verbose_name_plural}',
+                    started,
+                )
+        self.stdout.write(self.style.SUCCESS('Набор данных готов'))
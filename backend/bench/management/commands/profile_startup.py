@@ -0,0 +1,123 @@
+import json
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from bench.startup import parse_importtime
+
+
+# Цель для медианы времени до первого ответа, мс: на машине разработки
+# после отказа от импорта coreapi медиана 470–660 мс, до него 600–870 мс.
+TARGET_MS = 700
+
+
+class Command(BaseCommand):
+    help = (
+        'Замер холодного старта: стоимость импорта модулей и время до '
+        'первого ответа в новом процессе'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5)
+        parser.add_argument(
+            '--path',
+            default='/api/tags/',
+            help='Адрес первого запроса',
+        )
+        parser.add_argument('--top', type=int, default=15)
+        parser.add_argument(
+            '--target-ms',
+            type=float,
+            default=TARGET_MS,
+            help='Завершиться с ошибкой, если медиана времени до первого '
+                 'ответа больше (0 — не проверять)',
+        )
+        parser.add_argument(
+            '--json',
+            action='store_true',
+            help='Вывести отчёт в JSON',
+        )
+
+    def measure(self, path):
+        spawned = time.time()
+        process = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-m', 'bench.startup', path],
+            capture_output=True,
+            text=True,
+            cwd=settings.BASE_DIR,
+        )
+        if process.returncode:
+            raise CommandError(process.stderr.strip().splitlines()[-1])
+        result = json.loads(process.stdout.strip().splitlines()[-1])
+        result['load_ms'] = (result['loaded'] - spawned) * 1000
+        result['first_response_ms'] = (result['responded'] - spawned) * 1000
+        result['imports'] = parse_importtime(process.stderr)
+        return result
+
+    def handle(self, *args, **options):
+        runs = [
+            self.measure(options['path'])
+            for _ in range(options['runs'])
+        ]
+        runs.sort(key=lambda run: run['first_response_ms'])
+        median = runs[len(runs) // 2]
+        packages = Counter()
+        for module in median['imports']:
+            packages[module['module'].partition('.')[0]] += module['self_us']
+        top_level = sorted(
+            (module for module in median['imports'] if module['depth'] == 0),
+            key=lambda module: module['cumulative_us'],
+            reverse=True,
+        )
+        report = {
+            'runs': len(runs),
+            'status': median['status'],
+            'modules': median['modules'],
+            'import_ms': round(statistics.median(
+                sum(module['self_us'] for module in run['imports'])
+                for run in runs
+            ) / 1000, 1),
+            'load_ms': round(statistics.median(
+                run['load_ms'] for run in runs
+            ), 1),
+            'first_response_ms': round(median['first_response_ms'], 1),
+            'packages_ms': {
+                name: round(us / 1000, 1)
+                for name, us in packages.most_common(options['top'])
+            },
+            'imports_ms': {
+                module['module']: round(module['cumulative_us'] / 1000, 1)
+                for module in top_level[:options['top']]
+            },
+        }
+        if options['json']:
+            self.stdout.write(json.dumps(report, ensure_ascii=False, indent=2))
+        else:
+            self.write_report(report)
+        target = options['target_ms']
+        if target and report['first_response_ms'] > target:
+            raise CommandError(
+                f'Время до первого ответа {report["first_response_ms"]} мс '
+                f'больше цели {target} мс'
+            )
+
+    def write_report(self, report):
+        self.stdout.write(
+            f'Запусков: {report["runs"]}\n'
+            f'Загрузка приложения: {report["load_ms"]} мс, '
+            f'первый ответ ({report["status"]}): '
+            f'{report["first_response_ms"]} мс, '
+            f'модулей загружено: {report["modules"]}, '
+            f'импорт: {report["import_ms"]} мс'
+        )
+        self.stdout.write('\nСобственное время импорта по пакетам, мс:')
+        for name, ms in report['packages_ms'].items():
+            self.stdout.write(f'  {name:<40} {ms:>8}')
+        self.stdout.write('\nСамые дорогие импорты верхнего уровня, мс:')
+        for name, ms in report['imports_ms'].items():
+            self.stdout.write(f'  {name:<40} {ms:>8}')
@@ -0,0 +1,165 @@
+"""Прогон сценариев API через тестовый клиент Django."""
+import gc
+import math
+import time
+import tracemalloc
+from contextlib import ExitStack, contextmanager
+
+from django.db import connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.throttling import SimpleRateThrottle
+
+from recipes.models import Favorite, Ingredients, Recipe, Tag, User
+
+
+# Имя сценария: (шаблон адреса, нужна ли авторизация[, заголовки]).
+SCENARIOS = {
+    'recipes_list': ('/api/recipes/', False),
+    'recipes_list_auth': ('/api/recipes/', True),
+    'recipes_page_10': ('/api/recipes/?page=10', True),
+    'recipes_cards': (
+        '/api/recipes/?fields=id,name,image,cooking_time', True
+    ),
+    'recipes_tags_1': ('/api/recipes/?{tags_1}', True),
+    'recipes_tags_3': ('/api/recipes/?{tags_3}', True),
+    'recipes_tags_10': ('/api/recipes/?{tags_10}', True),
+    'recipes_author': ('/api/recipes/?author={author}', True),
+    'recipes_favorited': ('/api/recipes/?is_favorited=1', True),
+    'recipes_in_cart': ('/api/recipes/?is_in_shopping_cart=1', True),
+    'recipe_detail': ('/api/recipes/{recipe}/', True),
+    'subscriptions': ('/api/users/subscriptions/?recipes_limit=3', True),
+    'subscriptions_lean': (
+        '/api/users/subscriptions/?fields=id,username,recipes_count', True
+    ),
+    'download_shopping_cart': (
+        '/api/recipes/download_shopping_cart/', True
+    ),
+    'ingredients_search': ('/api/ingredients/?name={prefix}', False),
+    'ingredients_list': ('/api/ingredients/', False),
+    'ingredients_list_gzip': (
+        '/api/ingredients/', False, {'HTTP_ACCEPT_ENCODING': 'gzip'}
+    ),
+    'ingredients_list_br': (
+        '/api/ingredients/', False, {'HTTP_ACCEPT_ENCODING': 'br, gzip'}
+    ),
+    'users_me': ('/api/users/me/', True),
+}
+
+
+def percentile(values, percent):
+    """Перцентиль по методу ближайшего ранга."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(percent / 100 * len(ordered)) - 1)]
+
+
+@contextmanager
+def throttling_disabled():
+    """Снимает ограничения частоты запросов на время замеров."""
+    rates = SimpleRateThrottle.THROTTLE_RATES
+    saved = dict(rates)
+    rates.update(dict.fromkeys(rates))
+    try:
+        yield
+    finally:
+        rates.update(saved)
+
+
+def build_context(user):
+    """Параметры адресов сценариев, вычисляемые по данным в базе."""
+    slugs = list(Tag.objects.order_by('id').values_list('slug', flat=True))
+    recipe = (
+        Favorite.objects.filter(user=user).values_list('recipe', flat=True)
+        .first()
+        or Recipe.objects.values_list('id', flat=True).first()
+    )
+    ingredient = Ingredients.objects.order_by('id').first()
+    context = {
+        'author': user.followers.values_list('author', flat=True).first(),
+        'recipe': recipe,
+        'prefix': ingredient.name[:2] if ingredient else '',
+    }
+    for count in (1, 3, 10):
+        context[f'tags_{count}'] = '&'.join(
+            f'tags={slug}' for slug in slugs[:count]
+        )
+    return context
+
+
+class Runner:
+    """Многократно выполняет сценарии и собирает метрики."""
+
+    def __init__(self, user, iterations, warmup=2, host='localhost'):
+        self.iterations = iterations
+        self.warmup = warmup
+        self.anonymous = Client(HTTP_HOST=host)
+        token, _ = Token.objects.get_or_create(user=user)
+        self.authenticated = Client(
+            HTTP_HOST=host, HTTP_AUTHORIZATION=f'Token {token.key}'
+        )
+        self.context = build_context(user)
+
+    def request(self, client, path, headers):
+        started = time.perf_counter()
+        cpu_started = time.process_time()
+        response = client.get(path, **headers)
+        content = b''.join(response) if response.streaming else (
+            response.content
+        )
+        return (
+            response,
+            len(content),
+            time.perf_counter() - started,
+            time.process_time() - cpu_started,
+        )
+
+    def run(self, name, headers=None):
+        template, authenticated, *scenario_headers = SCENARIOS[name]
+        path = template.format(**self.context)
+        client = self.authenticated if authenticated else self.anonymous
+        headers = {**dict(*scenario_headers), **(headers or {})}
+        for _ in range(self.warmup):
+            self.request(client, path, headers)
+        durations = []
+        cpu = []
+        queries = []
+        for _ in range(self.iterations):
+            with ExitStack() as stack:
+                captured = [
+                    stack.enter_context(CaptureQueriesContext(connection))
+                    for connection in connections.all()
+                ]
+                response, size, duration, cpu_time = self.request(
+                    client, path, headers
+                )
+            durations.append(duration)
+            cpu.append(cpu_time)
+            queries.append(sum(map(len, captured)))
+        gc.collect()
+        tracemalloc.start()
+        try:
+            self.request(client, path, headers)
+            retained, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        return {
+            'path': path,
+            'status': response.status_code,
+            'bytes': size,
+            'iterations': self.iterations,
+            'p50_ms': round(percentile(durations, 50) * 1000, 3),
+            'p95_ms': round(percentile(durations, 95) * 1000, 3),
+            'p99_ms': round(percentile(durations, 99) * 1000, 3),
+            'cpu_ms': round(sum(cpu) / len(cpu) * 1000, 3),
+            'queries': max(queries),
+            'peak_alloc_kb': round(peak / 1024, 1),
+            'retained_kb': round(retained / 1024, 1),
+        }
+
+
+def dataset_summary():
+    return {
+        model._meta.model_name: model.objects.count()
+        for model in (User, Recipe, Tag, Ingredients, Favorite)
+    }
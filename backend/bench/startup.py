@@ -0,0 +1,67 @@
+"""Замер холодного старта: python -X importtime -m bench.startup ПУТЬ.
+
+Процесс загружает WSGI-приложение так же, как воркер gunicorn, выполняет
+один GET-запрос к ПУТИ и печатает в stdout JSON с отметками времени.
+Отчёт -X importtime интерпретатор пишет в stderr; его разбирает
+parse_importtime.
+"""
+import io
+import json
+import os
+import sys
+import time
+
+
+def main(path):
+    started = time.time()
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram.settings')
+    from django.core.wsgi import get_wsgi_application
+
+    application = get_wsgi_application()
+    loaded = time.time()
+    statuses = []
+    body = b''.join(application(
+        {
+            'REQUEST_METHOD': 'GET',
+            'PATH_INFO': path,
+            'QUERY_STRING': '',
+            'SERVER_NAME': 'localhost',
+            'SERVER_PORT': '80',
+            'HTTP_HOST': 'localhost',
+            'wsgi.input': io.BytesIO(),
+            'wsgi.errors': sys.stderr,
+            'wsgi.url_scheme': 'http',
+        },
+        lambda status, headers, exc_info=None: statuses.append(status),
+    ))
+    print(json.dumps({
+        'started': started,
+        'loaded': loaded,
+        'responded': time.time(),
+        'status': statuses[0],
+        'bytes': len(body),
+        'modules': len(sys.modules),
+    }))
+
+
+def parse_importtime(output):
+    """Строки «import time: self | cumulative | модуль» в список словарей
+    (время в микросекундах, depth — уровень вложенности импорта)."""
+    modules = []
+    for line in output.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|')
+        if not own.strip().isdigit():
+            continue
+        modules.append({
+            'module': name.strip(),
+            'depth': (len(name) - len(name.lstrip()) - 1) // 2,
+            'self_us': int(own),
+            'cumulative_us': int(cumulative),
+        })
+    return modules
+
+
+if __name__ == '__main__':
+    main(sys.argv[1])
@@ -4,4 +4,16 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from foodgram import live  # noqa: E402
+
+live_application = live.endpoint()
+
+
+async def application(scope, receive, send):
+    """Поток живых счётчиков обслуживается в обход Django: соединение
+    живёт долго и не должно занимать поток."""
+    if scope['type'] == 'http' and scope['path'] == live.PATH:
+        return await live_application(scope, receive, send)
+    return await django_application(scope, receive, send)
@@ -0,0 +1,146 @@
+"""Кэш сжатых ответов API.
+
+Ответы на анонимные GET-запросы к разделам из CACHED_SECTIONS хранятся в
+общем кэше сразу в нескольких вариантах: без сжатия, gzip и br (пакет
+brotli; без него — только первые два). Сжатие выполняется один раз при записи в
+кэш, попадание в кэш отдаёт готовые байты по заголовку Accept-Encoding
+без вызова представления и без работы процессора на сжатие.
+
+У каждого раздела есть номер версии, входящий в ключ кэша; сигналы
+изменения моделей (recipes.signals) увеличивают его, и все ответы
+раздела становятся неактуальными сразу. Ответы содержат абсолютные
+адреса (изображения, короткие ссылки), поэтому в ключ входят схема и
+хост запроса.
+"""
+import gzip
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+CACHED_SECTIONS = {
+    'ingredients': '/api/ingredients/',
+    'tags': '/api/tags/',
+    'recipes': '/api/recipes/',
+}
+CONTENT_TYPE = 'application/json'
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 9
+IDENTITY = 'identity'
+
+
+def _version_key(section):
+    return f'response-cache:version:{section}'
+
+
+def bump_version(*sections):
+    """Делает неактуальными все закэшированные ответы разделов."""
+    for section in sections:
+        try:
+            cache.incr(_version_key(section))
+        except ValueError:
+            cache.set(_version_key(section), 1, None)
+
+
+def compress(body):
+    """Варианты тела ответа: {кодировка: байты}."""
+    variants = {
+        IDENTITY: body,
+        'gzip': gzip.compress(body, GZIP_LEVEL, mtime=0),
+    }
+    if brotli is not None:
+        variants['br'] = brotli.compress(body, quality=BROTLI_QUALITY)
+    return variants
+
+
+def accepted_encodings(header):
+    """Кодировки из Accept-Encoding с ненулевым q."""
+    accepted = set()
+    for item in header.split(','):
+        encoding, _, parameters = item.strip().partition(';')
+        quality = parameters.strip()
+        if quality.startswith('q='):
+            try:
+                if float(quality[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(encoding.strip().lower())
+    return accepted
+
+
+def negotiate(variants, header):
+    """Самый короткий вариант из принимаемых клиентом."""
+    accepted = accepted_encodings(header)
+    candidates = [
+        encoding for encoding in variants
+        if encoding == IDENTITY or encoding in accepted or '*' in accepted
+    ]
+    return min(candidates, key=lambda encoding: len(variants[encoding]))
+
+
+class CompressedCacheMiddleware:
+    """Отдаёт закэшированные сжатые ответы анонимным клиентам API."""
+
+    def __init__(self, get_response):
+        if not settings.RESPONSE_CACHE['ENABLED']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def section(self, request):
+        if (
+            request.method != 'GET'
+            or 'HTTP_AUTHORIZATION' in request.META
+            or 'text/html' in request.META.get('HTTP_ACCEPT', '')
+        ):
+            return None
+        return next(
+            (
+                name for name, prefix in CACHED_SECTIONS.items()
+                if request.path.startswith(prefix)
+            ),
+            None,
+        )
+
+    def cache_key(self, request, section):
+        version = cache.get(_version_key(section), 0)
+        url = hashlib.sha1(request.build_absolute_uri().encode()).hexdigest()
+        return f'response-cache:{section}:{version}:{url}'
+
+    def __call__(self, request):
+        section = self.section(request)
+        if section is None:
+            return self.get_response(request)
+        key = self.cache_key(request, section)
+        variants = cache.get(key)
+        if variants is None:
+            response = self.get_response(request)
+            if (
+                response.status_code != 200
+                or response.streaming
+                or response.has_header('Content-Encoding')
+                or not response.get('Content-Type', '').startswith(
+                    CONTENT_TYPE
+                )
+            ):
+                return response
+            variants = compress(response.content)
+            cache.set(key, variants, settings.RESPONSE_CACHE['TIMEOUT'])
+        encoding = negotiate(
+            variants, request.META.get('HTTP_ACCEPT_ENCODING', '')
+        )
+        response = HttpResponse(variants[encoding], content_type=CONTENT_TYPE)
+        if encoding != IDENTITY:
+            response['Content-Encoding'] = encoding
+        response['Content-Length'] = str(len(variants[encoding]))
+        patch_vary_headers(response, ('Accept', 'Accept-Encoding'))
+        return response
@@ -0,0 +1,87 @@
+"""Маршрутизация чтения на реплику базы данных.
+
+Если в DATABASES есть псевдоним replica, безопасные запросы к API
+читают из реплики. После успешного изменяющего запроса клиент на
+REPLICA_PIN_SECONDS закрепляется за основной базой, чтобы сразу видеть
+свои изменения: признак хранится в cookie и в общем кэше (для клиентов,
+не сохраняющих cookie).
+
+Токены и пользователи всегда читаются из основной базы: токен, выданный
+при входе, иначе мог бы ещё не дойти до реплики, а следующий запрос с
+ним закреплён по заголовку Authorization, а не по адресу, с которого
+выполнялся вход.
+"""
+import hashlib
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+
+
+REPLICA = 'replica'
+PRIMARY = 'default'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+PATH_PREFIX = '/api/'
+PIN_COOKIE = 'pin_primary'
+
+_use_replica = ContextVar('use_replica', default=False)
+
+
+class ReplicaRouter:
+    """Отправляет чтение на реплику, если это разрешено для запроса."""
+
+    def db_for_read(self, model, **hints):
+        if not _use_replica.get() or (
+            model._meta.app_label == 'authtoken'
+            or model._meta.label == settings.AUTH_USER_MODEL
+        ):
+            return None
+        return REPLICA
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+
+def _pin_key(request):
+    client = (
+        request.META.get('HTTP_AUTHORIZATION')
+        or request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+        or request.META.get('REMOTE_ADDR', '')
+    )
+    return 'pin-primary:' + hashlib.sha1(client.encode()).hexdigest()
+
+
+class ReplicaRoutingMiddleware:
+    """Включает чтение с реплики для безопасных запросов к API."""
+
+    def __init__(self, get_response):
+        if REPLICA not in settings.DATABASES:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        safe = request.method in SAFE_METHODS
+        token = _use_replica.set(
+            safe
+            and request.path.startswith(PATH_PREFIX)
+            and PIN_COOKIE not in request.COOKIES
+            and not cache.get(_pin_key(request))
+        )
+        try:
+            response = self.get_response(request)
+        finally:
+            _use_replica.reset(token)
+        if not safe and response.status_code < 400:
+            cache.set(_pin_key(request), True, settings.REPLICA_PIN_SECONDS)
+            response.set_cookie(
+                PIN_COOKIE,
+                '1',
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
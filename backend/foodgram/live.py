@@ -0,0 +1,280 @@
+"""Живые счётчики: поток Server-Sent Events.
+
+GET /api/live/?recipes=1,2&authors=3 держит соединение открытым и
+присылает текущее число добавлений рецептов в избранное и число
+подписчиков авторов, когда они меняются:
+
+    event: counts
+    data: {"recipes": {"1": 12}, "authors": {"3": 4}}
+
+Значения, пришедшие, пока клиент получал предыдущее сообщение, заменяют
+ещё не отправленные, поэтому память на медленного клиента не растёт. Открытое
+соединение — корутина и небольшой словарь, без отдельного потока и без
+обращений к базе, так что один процесс держит тысячи простаивающих
+клиентов.
+
+Изменения рассылает publish() (подписчики событий в recipes.live).
+Бэкенд 'local' доставляет их подпискам текущего процесса (EVENTS_EAGER
+под ASGI-сервером, разработка). Бэкенд 'cache' пишет их в журнал в общем
+кэше, а каждый ASGI-процесс с открытыми соединениями раз в POLL_INTERVAL
+читает новые записи одним обращением и раздаёт своим подпискам — замена
+брокера pub/sub для нескольких процессов и машин.
+
+События обрабатывает drain_events или (EVENTS_EAGER) процесс, в котором
+они возникли, поэтому 'local' работает, только когда и запросы API, и
+поток обслуживает один ASGI-процесс с EVENTS_EAGER; 'cache' требует
+общего для всех процессов кэша. check_backend() проверяет это; при
+неподходящих настройках endpoint() отвечает 503, а остальное приложение
+работает как обычно.
+"""
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ImproperlyConfigured
+
+
+logger = logging.getLogger(__name__)
+
+PATH = '/api/live/'
+KINDS = ('recipes', 'authors')
+LOG_KEY = 'live:last'
+LOG_TIMEOUT = 60
+MAX_BACKLOG = 1000
+
+
+def _entry_key(number):
+    return f'live:entry:{number}'
+
+
+class Subscription:
+    """Значения, ещё не отправленные одному соединению."""
+
+    def __init__(self, channels):
+        self.channels = channels
+        self.pending = {}
+        self.ready = asyncio.Event()
+
+    def push(self, channel, value):
+        self.pending[channel] = value
+        self.ready.set()
+
+    def take(self):
+        pending, self.pending = self.pending, {}
+        self.ready.clear()
+        return pending
+
+
+class Hub:
+    """Подписки процесса по каналам (вид, id)."""
+
+    def __init__(self):
+        self.channels = defaultdict(set)
+        self.loop = None
+        self.poller = None
+
+    def subscribe(self, channels):
+        self.loop = asyncio.get_running_loop()
+        subscription = Subscription(channels)
+        for channel in channels:
+            self.channels[channel].add(subscription)
+        if settings.LIVE_UPDATES['BACKEND'] == 'cache' and (
+            self.poller is None or self.poller.done()
+        ):
+            self.poller = self.loop.create_task(poll_log(self))
+        return subscription
+
+    def unsubscribe(self, subscription):
+        for channel in subscription.channels:
+            subscribers = self.channels[channel]
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self.channels[channel]
+
+    def deliver(self, changes):
+        """Раздаёт значения {(вид, id): n}; вызывается в цикле событий."""
+        for channel, value in changes.items():
+            for subscription in self.channels.get(channel, ()):
+                subscription.push(channel, value)
+
+    def deliver_threadsafe(self, changes):
+        if self.loop is not None and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self.deliver, changes)
+
+
+hub = Hub()
+
+
+def check_backend():
+    """ImproperlyConfigured, если изменения не дойдут до клиентов."""
+    if settings.LIVE_UPDATES['BACKEND'] != 'cache':
+        if not settings.EVENTS_EAGER:
+            raise ImproperlyConfigured(
+                "LIVE_BACKEND='local' доставляет изменения только при "
+                "EVENTS_EAGER=True; для drain_events и нескольких "
+                "процессов задайте LIVE_BACKEND=cache."
+            )
+    elif isinstance(caches[DEFAULT_CACHE_ALIAS], (LocMemCache, DummyCache)):
+        raise ImproperlyConfigured(
+            "LIVE_BACKEND='cache' требует общего кэша (CACHE_BACKEND): "
+            "журнал в памяти процесса не виден другим процессам."
+        )
+
+
+def publish(changes):
+    """Рассылает значения счётчиков {(вид, id): n} подписчикам."""
+    if not changes:
+        return
+    if settings.LIVE_UPDATES['BACKEND'] != 'cache':
+        hub.deliver_threadsafe(changes)
+        return
+    cache.add(LOG_KEY, 0, None)
+    cache.set(_entry_key(cache.incr(LOG_KEY)), changes, LOG_TIMEOUT)
+
+
+async def poll_log(hub):
+    """Читает журнал в общем кэше, пока в процессе есть подписки."""
+    get = sync_to_async(cache.get, thread_sensitive=False)
+    get_many = sync_to_async(cache.get_many, thread_sensitive=False)
+    last = await get(LOG_KEY, 0)
+    stalled = None
+    while hub.channels:
+        await asyncio.sleep(settings.LIVE_UPDATES['POLL_INTERVAL'])
+        top = await get(LOG_KEY, 0)
+        if top < last:
+            # Кэш очищен: журнал начался заново.
+            last = 0
+        last = max(last, top - MAX_BACKLOG)
+        if top == last:
+            continue
+        numbers = range(last + 1, top + 1)
+        entries = await get_many([_entry_key(number) for number in numbers])
+        for number in numbers:
+            changes = entries.get(_entry_key(number))
+            if changes is None and number != stalled:
+                # Номер уже выдан, но запись ещё не сохранена: ждём её
+                # один цикл, потом пропускаем.
+                stalled = number
+                break
+            if changes is not None:
+                hub.deliver(changes)
+            last = number
+
+
+def parse_channels(query_string):
+    """Каналы из ?recipes=1,2&authors=3."""
+    params = parse_qs(query_string.decode('latin-1'))
+    return {
+        (kind, int(item))
+        for kind in KINDS
+        for value in params.get(kind, ())
+        for item in value.split(',')
+        if item.strip().isdigit()
+    }
+
+
+def format_event(changes):
+    data = {}
+    for (kind, object_id), value in changes.items():
+        data.setdefault(kind, {})[str(object_id)] = value
+    if not data:
+        return None
+    return f'event: counts\ndata: {json.dumps(data)}\n\n'.encode()
+
+
+async def respond(send, status, data):
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'application/json; charset=utf-8')],
+    })
+    await send({
+        'type': 'http.response.body',
+        'body': json.dumps(data, ensure_ascii=False).encode(),
+    })
+
+
+async def wait_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+async def stream(scope, receive, send):
+    """ASGI-приложение потока живых счётчиков."""
+    if scope['method'] != 'GET':
+        return await respond(send, 405, {'detail': 'Метод не разрешён.'})
+    channels = parse_channels(scope['query_string'])
+    if not channels:
+        return await respond(
+            send, 400, {'error': 'Укажите recipes и/или authors.'}
+        )
+    if len(channels) > settings.LIVE_UPDATES['MAX_CHANNELS']:
+        return await respond(send, 400, {
+            'error': 'Не больше '
+                     f'{settings.LIVE_UPDATES["MAX_CHANNELS"]} объектов.'
+        })
+    subscription = hub.subscribe(channels)
+    disconnect = asyncio.ensure_future(wait_disconnect(receive))
+    ready = None
+    try:
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [
+                (b'content-type', b'text/event-stream; charset=utf-8'),
+                (b'cache-control', b'no-cache'),
+                (b'x-accel-buffering', b'no'),
+            ],
+        })
+        await send({
+            'type': 'http.response.body',
+            'body': b'retry: 5000\n\n',
+            'more_body': True,
+        })
+        while not disconnect.done():
+            if ready is None:
+                ready = asyncio.ensure_future(subscription.ready.wait())
+            await asyncio.wait(
+                {ready, disconnect},
+                timeout=settings.LIVE_UPDATES['HEARTBEAT'],
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            if disconnect.done():
+                break
+            body = b': ping\n\n'
+            if ready.done():
+                ready = None
+                body = format_event(subscription.take()) or body
+            await send({
+                'type': 'http.response.body',
+                'body': body,
+                'more_body': True,
+            })
+    finally:
+        hub.unsubscribe(subscription)
+        for task in (ready, disconnect):
+            if task is not None:
+                task.cancel()
+
+
+def endpoint():
+    """ASGI-приложение потока для текущих настроек: stream или, если
+    изменения не дойдут до клиентов, ответ 503."""
+    try:
+        check_backend()
+    except ImproperlyConfigured as error:
+        logger.warning('Поток живых счётчиков отключён: %s', error)
+        detail = str(error)
+
+        async def unavailable(scope, receive, send):
+            return await respond(send, 503, {'detail': detail})
+
+        return unavailable
+    return stream
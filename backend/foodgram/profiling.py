@@ -0,0 +1,175 @@
+"""Профилирование запросов к API.
+
+Включается настройкой API_PROFILING. Для каждого запроса к /api/
+считаются SQL-запросы и их суммарное время, повторяющиеся запросы,
+время сериализации и рендеринга. Результаты отдаются в заголовке
+Server-Timing и складываются в кольцевой буфер, сводку по которому
+показывает /api/_debug/profile/.
+"""
+import re
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from rest_framework.serializers import BaseSerializer
+
+
+PATH_PREFIX = '/api/'
+TOP_FINGERPRINTS = 3
+IN_LIST = re.compile(r'IN \((?:%s, )*%s\)')
+LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+\b")
+
+current_profile = ContextVar('current_profile', default=None)
+_profiles = deque(maxlen=settings.API_PROFILING_BUFFER_SIZE)
+_lock = threading.Lock()
+
+
+def fingerprint(sql):
+    """Приводит SQL к виду без конкретных значений."""
+    return LITERALS.sub('?', IN_LIST.sub('IN (...)', sql))
+
+
+class RequestProfile:
+    """Метрики одного запроса."""
+
+    def __init__(self):
+        self.queries = Counter()
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.render_time = 0.0
+        self.serializing = False
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.queries[fingerprint(sql)] += 1
+
+    def duplicates(self):
+        return [
+            (sql, count) for sql, count
+            in self.queries.most_common(TOP_FINGERPRINTS) if count > 1
+        ]
+
+
+def _timed_data(prop):
+    """Оборачивает BaseSerializer.data, измеряя время сериализации."""
+
+    def data(serializer):
+        profile = current_profile.get()
+        if profile is None or profile.serializing:
+            return prop.fget(serializer)
+        profile.serializing = True
+        started = time.perf_counter()
+        try:
+            return prop.fget(serializer)
+        finally:
+            profile.serializer_time += time.perf_counter() - started
+            profile.serializing = False
+
+    data.profiled = True
+    return property(data)
+
+
+class ProfilingMiddleware:
+    """Собирает метрики запросов к API.
+
+    При выключенном API_PROFILING исключается из цепочки middleware.
+    """
+
+    def __init__(self, get_response):
+        if not settings.API_PROFILING:
+            raise MiddlewareNotUsed
+        if not getattr(BaseSerializer.data.fget, 'profiled', False):
+            BaseSerializer.data = _timed_data(BaseSerializer.data)
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not request.path.startswith(PATH_PREFIX):
+            return self.get_response(request)
+        profile = RequestProfile()
+        token = current_profile.set(profile)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(profile))
+                response = self.get_response(request)
+        finally:
+            current_profile.reset(token)
+        total = time.perf_counter() - started
+        record(request, response, profile, total)
+        response['Server-Timing'] = ', '.join((
+            f'db;dur={profile.db_time * 1000:.1f};'
+            f'desc="{sum(profile.queries.values())} queries"',
+            f'serializer;dur={profile.serializer_time * 1000:.1f}',
+            f'render;dur={profile.render_time * 1000:.1f}',
+            f'total;dur={total * 1000:.1f}',
+        ))
+        return response
+
+    def process_template_response(self, request, response):
+        profile = current_profile.get()
+        if profile is not None:
+            started = time.perf_counter()
+
+            def rendered(response):
+                profile.render_time += time.perf_counter() - started
+
+            response.add_post_render_callback(rendered)
+        return response
+
+
+def record(request, response, profile, total):
+    match = request.resolver_match
+    with _lock:
+        _profiles.append({
+            'route': match.view_name if match else request.path,
+            'method': request.method,
+            'status': response.status_code,
+            'queries': sum(profile.queries.values()),
+            'duplicates': profile.duplicates(),
+            'db_ms': profile.db_time * 1000,
+            'serializer_ms': profile.serializer_time * 1000,
+            'render_ms': profile.render_time * 1000,
+            'total_ms': total * 1000,
+        })
+
+
+def top_offenders(order_by='queries', limit=20):
+    """Сводка по маршрутам, отсортированная по среднему значению метрики."""
+    with _lock:
+        profiles = list(_profiles)
+    routes = defaultdict(list)
+    for profile in profiles:
+        routes[(profile['method'], profile['route'])].append(profile)
+    summary = []
+    for (method, route), items in routes.items():
+        duplicates = Counter()
+        for item in items:
+            duplicates.update(dict(item['duplicates']))
+        summary.append({
+            'route': route,
+            'method': method,
+            'requests': len(items),
+            'queries': sum(item['queries'] for item in items) / len(items),
+            'max_queries': max(item['queries'] for item in items),
+            **{
+                metric: round(
+                    sum(item[metric] for item in items) / len(items), 2
+                )
+                for metric in (
+                    'db_ms', 'serializer_ms', 'render_ms', 'total_ms'
+                )
+            },
+            'duplicates': duplicates.most_common(TOP_FINGERPRINTS),
+        })
+    summary.sort(key=lambda item: item[order_by], reverse=True)
+    return summary[:limit]
@@ -17,17 +17,24 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
-    'drf_spectacular',
     'rest_framework',
     'rest_framework.authtoken',
     'djoser',
     'django_filters',
     'recipes.apps.RecipesConfig',
-    'api.apps.ApiConfig'
+    'api.apps.ApiConfig',
 ]
 
+# Команды замеров (bench_seed, bench_run, profile_startup) нужны только
+# при разработке и на стендах.
+if os.getenv('BENCH', 'False').lower() == 'true':
+    INSTALLED_APPS.append('bench.apps.BenchConfig')
+
 MIDDLEWARE = [
+    'foodgram.profiling.ProfilingMiddleware',
+    'foodgram.db_router.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'foodgram.compression.CompressedCacheMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -58,16 +65,22 @@ WSGI_APPLICATION = 'foodgram.wsgi.application'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',
     ],
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.LimitOffsetPagination',
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.LimitOffsetPagination',
     'PAGE_SIZE': 6,
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend',
     ],
+    'DEFAULT_THROTTLE_RATES': {
+        'shopping_cart': os.getenv('THROTTLE_SHOPPING_CART', '10/min'),
+        'shopping_cart_ip': os.getenv('THROTTLE_SHOPPING_CART_IP', '60/min'),
+        'ingredients': os.getenv('THROTTLE_INGREDIENTS', '120/min'),
+        'ingredients_ip': os.getenv('THROTTLE_INGREDIENTS_IP', '600/min'),
+    },
 }
 
 DATABASES = {
@@ -86,6 +99,36 @@ DATABASES = {
     }
 }
 
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
+if os.getenv('DB_REPLICA_ENGINE') == 'sqlite':
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.getenv(
+            'DB_REPLICA_NAME', os.path.join(BASE_DIR, 'db_replica.sqlite3')
+        ),
+        'TEST': {'MIRROR': 'default'},
+    }
+elif os.getenv('DB_REPLICA_HOST'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': os.getenv('DB_REPLICA_NAME', DATABASES['default']['NAME']),
+        'HOST': os.getenv('DB_REPLICA_HOST'),
+        'PORT': os.getenv('DB_REPLICA_PORT', DATABASES['default']['PORT']),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['foodgram.db_router.ReplicaRouter']
+
+REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', 5))
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -116,6 +159,9 @@ STATIC_ROOT = BASE_DIR / 'collected_static'
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+DEFAULT_FILE_STORAGE = os.getenv(
+    'DEFAULT_FILE_STORAGE', 'foodgram.storage.HashedFileSystemStorage'
+)
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -130,3 +176,46 @@ DJOSER = {
 }
 
 AUTH_USER_MODEL = 'recipes.User'
+
+# Пользователи токенов кэшируются в общем кэше (CACHE_BACKEND): с
+# несколькими процессами он должен быть общим, иначе выход и отзыв
+# токена в одном процессе не видны остальным.
+TOKEN_AUTH_CACHE = {
+    'TIMEOUT': int(os.getenv('TOKEN_AUTH_CACHE_TIMEOUT', 60)),
+}
+
+# Кэш сжатых ответов на анонимные GET-запросы. Версии разделов
+# сбрасываются сигналами, поэтому с несколькими процессами нужен общий
+# кэш (CACHE_BACKEND).
+RESPONSE_CACHE = {
+    'ENABLED': os.getenv('RESPONSE_CACHE', 'False').lower() == 'true',
+    'TIMEOUT': int(os.getenv('RESPONSE_CACHE_TIMEOUT', 300)),
+}
+
+# Обрабатывать события сразу после фиксации транзакции, не дожидаясь
+# drain_events (для разработки и тестов).
+EVENTS_EAGER = os.getenv('EVENTS_EAGER', 'False').lower() == 'true'
+
+# Поток живых счётчиков (foodgram.live): 'local' — изменения доходят
+# только до соединений того же процесса (один ASGI-процесс с
+# EVENTS_EAGER, разработка), 'cache' — через журнал в общем кэше
+# (CACHE_BACKEND) до всех ASGI-процессов; так работают docker-compose.
+LIVE_UPDATES = {
+    'BACKEND': os.getenv('LIVE_BACKEND', 'local'),
+    'POLL_INTERVAL': float(os.getenv('LIVE_POLL_INTERVAL', 0.5)),
+    'HEARTBEAT': float(os.getenv('LIVE_HEARTBEAT', 15)),
+    'MAX_CHANNELS': int(os.getenv('LIVE_MAX_CHANNELS', 100)),
+}
+
+# Время жизни профилей авторов в общем кэше; 0 — не кэшировать.
+PROFILE_CACHE_TIMEOUT = int(os.getenv('PROFILE_CACHE_TIMEOUT', 60))
+
+ESTIMATED_COUNT_THRESHOLD = int(
+    os.getenv('ESTIMATED_COUNT_THRESHOLD', 100_000)
+)
+ESTIMATED_COUNT_CACHE_TIMEOUT = int(
+    os.getenv('ESTIMATED_COUNT_CACHE_TIMEOUT', 30)
+)
+
+API_PROFILING = os.getenv('API_PROFILING', 'False').lower() == 'true'
+API_PROFILING_BUFFER_SIZE = int(os.getenv('API_PROFILING_BUFFER_SIZE', 1000))
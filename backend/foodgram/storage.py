@@ -0,0 +1,125 @@
+"""Хранилище медиафайлов с именами по содержимому.
+
+Файл сохраняется как <каталог upload_to>/<sha256 содержимого><расширение>,
+поэтому одинаковые загрузки разных пользователей хранятся один раз, а
+содержимое по имени никогда не меняется: nginx отдаёт такие имена с
+неограниченным сроком кэширования.
+
+Один файл может использоваться несколькими записями, а запись, которая
+повторно использует файл, может быть ещё не зафиксирована. Поэтому
+delete() файлы не удаляет: их удаляет cleanup_orphan_media, и только
+давно не использованные. Повторное использование обновляет время
+изменения файла (touch), а delete_unreferenced перед удалением ещё раз
+проверяет время и ссылки. HashedFileSystemStorage выполняет обе операции
+под блокировкой файла, так что удаление не может пересечься с повторным
+использованием. ContentHashStorageMixin подмешивается к любому бэкенду
+хранилища; touch() у него по умолчанию ничего не делает.
+"""
+import hashlib
+import os
+from contextlib import contextmanager
+
+from django.apps import apps
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.db import models
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+CHUNK_SIZE = 64 * 1024
+
+
+def content_hash(content):
+    digest = hashlib.sha256()
+    content.seek(0)
+    for chunk in content.chunks(CHUNK_SIZE):
+        digest.update(chunk)
+    content.seek(0)
+    return digest.hexdigest()
+
+
+def file_fields():
+    """Файловые поля моделей, хранящиеся в хранилище по умолчанию."""
+    return [
+        field
+        for model in apps.get_models()
+        for field in model._meta.concrete_fields
+        if isinstance(field, models.FileField)
+        and field.storage is default_storage
+    ]
+
+
+def is_referenced(name):
+    return any(
+        field.model._default_manager.filter(**{field.name: name}).exists()
+        for field in file_fields()
+    )
+
+
+class ContentHashStorageMixin:
+    """Имена по содержимому, дедупликация и удаление только очисткой."""
+
+    def hashed_name(self, name, content):
+        directory, filename = os.path.split(name)
+        extension = os.path.splitext(filename)[1].lower()
+        return os.path.join(directory, content_hash(content) + extension)
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        name = self.hashed_name(name, content)
+        if self.exists(name) and self.touch(name):
+            return name
+        return super().save(name, content, max_length)
+
+    def touch(self, name):
+        """Отмечает повторное использование файла; False — файла уже нет."""
+        return True
+
+    def delete(self, name):
+        """Ничего не делает: файл может понадобиться другой записи."""
+
+    def delete_unreferenced(self, name, before=None):
+        """Удаляет файл, если на него нет ссылок и (если задано before)
+        он не использовался с этого времени; возвращает, удалён ли он."""
+        if not name or is_referenced(name) or (
+            before is not None and self.get_modified_time(name) >= before
+        ):
+            return False
+        super().delete(name)
+        return True
+
+
+class HashedFileSystemStorage(ContentHashStorageMixin, FileSystemStorage):
+    @contextmanager
+    def _locked(self, name, exclusive):
+        """Блокировка flock на файл; без fcntl (Windows) — без неё."""
+        if fcntl is None:
+            yield None
+            return
+        with open(self.path(name), 'rb') as file:
+            fcntl.flock(file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            yield file
+
+    def touch(self, name):
+        try:
+            with self._locked(name, exclusive=False) as file:
+                # Файл мог быть удалён, пока ждали блокировку.
+                if file is not None and not os.fstat(file.fileno()).st_nlink:
+                    return False
+                os.utime(self.path(name))
+        except FileNotFoundError:
+            return False
+        return True
+
+    def delete_unreferenced(self, name, before=None):
+        if not name:
+            return False
+        try:
+            with self._locked(name, exclusive=True):
+                return super().delete_unreferenced(name, before)
+        except FileNotFoundError:
+            return False
@@ -1,14 +1,18 @@
 from django.contrib import admin
 from django.contrib.auth import get_user_model
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.db.models import Count, OuterRef, Prefetch, Subquery
+from django.db.models.functions import Coalesce
 from django.utils.safestring import mark_safe
 
+from .estimates import EstimatedCountPaginator
 from .models import (
     Follow,
     Favorite,
     Ingredients,
     Recipe,
     RecipeIngredient,
+    ShortLink,
     Tag,
 )
 
@@ -16,12 +20,85 @@ from .models import (
 User = get_user_model()
 
 
+def count_subquery(model, field):
+    """Коррелированный подзапрос количества связанных строк.
+
+    В отличие от Count() с JOIN и GROUP BY вычисляется только для строк
+    текущей страницы списка.
+    """
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{field: OuterRef('pk')})
+            .order_by()
+            .values(field)
+            .annotate(total=Count('*'))
+            .values('total')
+        ),
+        0,
+    )
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """Базовая настройка списков для таблиц с миллионами строк."""
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+class InputFilter(admin.SimpleListFilter):
+    """Фильтр с текстовым полем вместо списка всех значений."""
+
+    template = 'admin/input_filter.html'
+    lookup: str
+    placeholder = ''
+
+    def lookups(self, request, model_admin):
+        return ((None, None),)
+
+    def choices(self, changelist):
+        all_choice = next(super().choices(changelist))
+        all_choice['query_parts'] = (
+            (name, value)
+            for name, value in changelist.get_filters_params().items()
+            if name != self.parameter_name
+        )
+        yield all_choice
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(**{self.lookup: self.value().strip()})
+        return queryset
+
+
+class AuthorFilter(InputFilter):
+    title = 'автору'
+    parameter_name = 'author'
+    lookup = 'author__username'
+    placeholder = 'Логин'
+
+
+class UserFilter(InputFilter):
+    title = 'пользователю'
+    parameter_name = 'user'
+    lookup = 'user__username'
+    placeholder = 'Логин'
+
+
+class RecipeNameFilter(InputFilter):
+    title = 'рецепту'
+    parameter_name = 'recipe'
+    lookup = 'recipe__name'
+    placeholder = 'Название'
+
+
 @admin.register(RecipeIngredient)
-class RecipeIngredientAdmin(admin.ModelAdmin):
+class RecipeIngredientAdmin(LargeTableAdmin):
     """Настройка админки для модели RecipeIngredient."""
 
     list_display = ('id', 'recipe', 'ingredient', 'amount')
-    search_fields = ('recipe',)
+    search_fields = ('recipe__name',)
+    autocomplete_fields = ('recipe', 'ingredient')
+    list_select_related = ('recipe__author', 'ingredient')
 
 
 @admin.register(Tag)
@@ -32,10 +109,15 @@ class TagAdmin(admin.ModelAdmin):
     search_fields = ('name', 'slug',)
     prepopulated_fields = {'slug': ('name',)}
 
-    @admin.display(description='Рецептов')
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            recipes_total=count_subquery(Recipe.tags.through, 'tag')
+        )
+
+    @admin.display(description='Рецептов', ordering='recipes_total')
     def count_recipes(self, tag):
         """Возвращает количество рецептов для тега."""
-        return tag.recipes.count()
+        return tag.recipes_total
 
 
 class IngredientAmountInline(admin.TabularInline):
@@ -46,7 +128,7 @@ class IngredientAmountInline(admin.TabularInline):
 
 
 @admin.register(Ingredients)
-class IngredientAdmin(admin.ModelAdmin):
+class IngredientAdmin(LargeTableAdmin):
     """Настройка админки для модели Ingredients."""
 
     list_display = (
@@ -58,14 +140,19 @@ class IngredientAdmin(admin.ModelAdmin):
     search_fields = ('name', 'measurement_unit')
     list_filter = ('measurement_unit',)
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            recipes_total=count_subquery(RecipeIngredient, 'ingredient')
+        )
+
     @admin.display(description='Рецептов')
-    def count_recipes(self, recipe):
+    def count_recipes(self, ingredient):
         """Количество рецептов, использующих этот ингредиент."""
-        return recipe.recipe_ingredient.count()
+        return ingredient.recipes_total
 
 
 @admin.register(Recipe)
-class RecipeAdmin(admin.ModelAdmin):
+class RecipeAdmin(LargeTableAdmin):
     """Настройка админки для модели Recipe."""
 
     inlines = [IngredientAmountInline]
@@ -79,9 +166,10 @@ class RecipeAdmin(admin.ModelAdmin):
         'tags_list',
         'image_preview',
     )
-    list_filter = ('author__username', 'tags')
-    search_fields = ('name__icontains', 'tags', 'author__username')
+    list_filter = (AuthorFilter, 'tags')
+    search_fields = ('name', 'author__username')
     readonly_fields = ('image_preview',)
+    autocomplete_fields = ('author',)
 
     fieldsets = (
         (None, {
@@ -95,7 +183,20 @@ class RecipeAdmin(admin.ModelAdmin):
         }),
     )
 
-    @admin.display(description='Автор')
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related(
+            'author'
+        ).prefetch_related(
+            'tags',
+            Prefetch(
+                'recipe_ingredients',
+                queryset=RecipeIngredient.objects.select_related('ingredient')
+            ),
+        ).annotate(
+            favorites_total=count_subquery(Favorite, 'recipe')
+        )
+
+    @admin.display(description='Автор', ordering='author__username')
     def get_author_username(self, recipe):
         """Возвращает username автора вместо User object."""
         return recipe.author.username
@@ -103,7 +204,7 @@ class RecipeAdmin(admin.ModelAdmin):
     @admin.display(description='В избранном')
     def favorites_count(self, recipe):
         """Количество добавлений в избранное."""
-        return recipe.favorites.count()
+        return recipe.favorites_total
 
     @admin.display(description='Ингредиенты')
     @mark_safe
@@ -131,18 +232,9 @@ class RecipeAdmin(admin.ModelAdmin):
             )
         return 'Нет изображения'
 
-    @admin.display(description='Ингредиенты', ordering='ingredients__name')
-    def get_ingredients(self, recipe):
-        ingredients_list = [
-            f'- {ing.ingredient.name} '
-            f'({ing.amount} {ing.ingredient.measurement_unit})'
-            for ing in recipe.recipe_amounts.select_related('ingredient').all()
-        ]
-        return mark_safe('<br>'.join(ingredients_list))
-
 
 @admin.register(Favorite)
-class FavoriteAdmin(admin.ModelAdmin):
+class FavoriteAdmin(LargeTableAdmin):
     """Настройка админки для модели Favorite."""
 
     list_display = (
@@ -150,11 +242,13 @@ class FavoriteAdmin(admin.ModelAdmin):
         'user',
         'recipe',
     )
-    list_filter = ('user', 'recipe')
+    list_filter = (UserFilter, RecipeNameFilter)
+    list_select_related = ('user', 'recipe__author')
+    autocomplete_fields = ('user', 'recipe')
 
 
 @admin.register(User)
-class UserAdmin(BaseUserAdmin):
+class UserAdmin(BaseUserAdmin, LargeTableAdmin):
     """Настройка админки для модели User."""
     fieldsets = BaseUserAdmin.fieldsets + (
         ('Дополнительно', {
@@ -177,6 +271,13 @@ class UserAdmin(BaseUserAdmin):
     list_filter = ('is_active', 'is_staff', 'is_superuser')
     readonly_fields = ('avatar_preview',)
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            recipes_total=count_subquery(Recipe, 'author'),
+            following_total=count_subquery(Follow, 'user'),
+            followers_total=count_subquery(Follow, 'author'),
+        )
+
     def username(self, obj):
         return obj.username
 
@@ -203,17 +304,17 @@ class UserAdmin(BaseUserAdmin):
     @admin.display(description='Рецептов')
     def recipes_count(self, user):
         """Количество рецептов пользователя."""
-        return user.recipes.count()
+        return user.recipes_total
 
     @admin.display(description='Подписок')
     def following_count(self, user):
         """Подписок."""
-        return user.followers.count()
+        return user.following_total
 
     @admin.display(description='Подписчиков')
     def followers_count(self, user):
         """Подписчиков."""
-        return user.authors.count()
+        return user.followers_total
 
     @admin.display(description='ID')
     def pk(self, user):
@@ -221,7 +322,7 @@ class UserAdmin(BaseUserAdmin):
 
 
 @admin.register(Follow)
-class FollowAdmin(admin.ModelAdmin):
+class FollowAdmin(LargeTableAdmin):
     """Настройка админки для модели Follow."""
 
     list_display = (
@@ -229,4 +330,17 @@ class FollowAdmin(admin.ModelAdmin):
         'user',
         'author',
     )
-    list_filter = ('user', 'author')
+    list_filter = (UserFilter, AuthorFilter)
+    list_select_related = ('user', 'author')
+    autocomplete_fields = ('user', 'author')
+
+
+@admin.register(ShortLink)
+class ShortLinkAdmin(LargeTableAdmin):
+    """Настройка админки для модели ShortLink."""
+
+    list_display = ('id', 'code', 'recipe', 'hits')
+    search_fields = ('code', 'recipe__name')
+    list_select_related = ('recipe__author',)
+    autocomplete_fields = ('recipe',)
+    readonly_fields = ('hits',)
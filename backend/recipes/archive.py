@@ -0,0 +1,76 @@
+"""Перенос давних записей списков покупок в архив.
+
+Записи старше заданного срока переносятся в ShoppingListArchive
+небольшими пачками: каждая пачка — отдельная короткая транзакция, которая
+блокирует только свои строки (занятые параллельными запросами строки
+пропускаются до следующего запуска). Основная таблица остаётся
+маленькой, её индексы помещаются в память, а очистка после удаления
+идёт по частям, без одной огромной транзакции.
+
+Пара (пользователь, рецепт) хранится в архиве один раз: рецепт, снова
+добавленный в список после переноса и перенесённый повторно, просто
+удаляется из списка.
+
+Удаление идёт через QuerySet.delete, поэтому обработчики post_delete
+(кэш наборов пользователя в api.signals) видят каждую запись.
+"""
+import time
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from recipes.constants import ARCHIVE_BATCH_SIZE
+from recipes.models import ShoppingList, ShoppingListArchive
+
+
+def threshold(days):
+    """Граница: архивируются записи, добавленные раньше неё."""
+    return timezone.now() - timedelta(days=days)
+
+
+def archive_batch(before, batch_size=ARCHIVE_BATCH_SIZE):
+    """Переносит одну пачку записей, добавленных раньше before;
+    возвращает их число."""
+    with transaction.atomic():
+        rows = list(
+            ShoppingList.objects.select_for_update(skip_locked=True)
+            .filter(created__lt=before)
+            .order_by('id')
+            .values_list('id', 'user_id', 'recipe_id', 'created')
+            [:batch_size]
+        )
+        if not rows:
+            return 0
+        archived = set(ShoppingListArchive.objects.filter(
+            user_id__in={row[1] for row in rows},
+            recipe_id__in={row[2] for row in rows},
+        ).values_list('user_id', 'recipe_id'))
+        ShoppingListArchive.objects.bulk_create(
+            ShoppingListArchive(
+                user_id=user_id, recipe_id=recipe_id, added=created
+            )
+            for _, user_id, recipe_id, created in rows
+            if (user_id, recipe_id) not in archived
+        )
+        ShoppingList.objects.filter(
+            id__in=[row[0] for row in rows]
+        ).delete()
+    return len(rows)
+
+
+def archive_shopping_lists(days, batch_size=ARCHIVE_BATCH_SIZE, pause=0):
+    """Переносит в архив все записи старше days дней.
+
+    pause — пауза между пачками в секундах, чтобы не забивать диск и
+    реплики. Возвращает число перенесённых записей.
+    """
+    before = threshold(days)
+    archived = 0
+    while True:
+        count = archive_batch(before, batch_size)
+        archived += count
+        if count < batch_size:
+            return archived
+        if pause:
+            time.sleep(pause)
@@ -5,3 +5,14 @@ USERNAME_MAX_LENGTH = 150
 FIRST_NAME_MAX_LENGTH = 150
 LAST_NAME_MAX_LENGTH = 150
 EMAIL_MAX_LENGTH = 254
+SHORT_LINK_CODE_LENGTH = 6
+SHORT_LINK_CODE_MAX_LENGTH = 16
+TRENDING_HALF_LIFE_HOURS = 48
+SHOPPING_CART_SCORE_WEIGHT = 0.5
+SCORE_COMMIT_HORIZON_SECONDS = 60
+SIMILAR_RECIPES_COUNT = 20
+EVENT_NAME_MAX_LENGTH = 64
+EVENT_KEY_MAX_LENGTH = 128
+REVISION_SNAPSHOT_INTERVAL = 10
+SHOPPING_CART_ARCHIVE_DAYS = 90
+ARCHIVE_BATCH_SIZE = 1000
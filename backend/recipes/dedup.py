@@ -0,0 +1,85 @@
+from collections import defaultdict
+
+from django.apps import apps as global_apps
+from django.db.models import Case, F, OuterRef, Subquery, Value, When
+
+
+UPDATE_CHUNK_SIZE = 500
+
+
+def _chunks(items, size=UPDATE_CHUNK_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def find_duplicate_ingredients(apps=global_apps):
+    """Возвращает {id оставляемого ингредиента: [id дубликатов]}.
+
+    Оставляется ингредиент с наименьшим id среди совпадающих по
+    названию и единице измерения.
+    """
+    Ingredients = apps.get_model('recipes', 'Ingredients')
+    duplicates = Ingredients.objects.annotate(
+        keep_id=Subquery(
+            Ingredients.objects.filter(
+                name=OuterRef('name'),
+                measurement_unit=OuterRef('measurement_unit'),
+            ).order_by('id').values('id')[:1]
+        )
+    ).exclude(id=F('keep_id')).order_by('keep_id', 'id')
+    merges = defaultdict(list)
+    for duplicate_id, keep_id in duplicates.values_list('id', 'keep_id'):
+        merges[keep_id].append(duplicate_id)
+    return dict(merges)
+
+
+def _repoint(queryset, field, replacements):
+    """Переназначает ссылки одним UPDATE на пачку дубликатов."""
+    duplicate_ids = list(replacements)
+    for chunk in _chunks(duplicate_ids):
+        queryset.filter(**{f'{field}__in': chunk}).update(**{
+            field: Case(*(
+                When(
+                    **{field: duplicate_id},
+                    then=Value(replacements[duplicate_id]),
+                )
+                for duplicate_id in chunk
+            ))
+        })
+
+
+def merge_duplicate_ingredients(merges, apps=global_apps):
+    """Объединяет дубликаты ингредиентов, найденные
+    find_duplicate_ingredients, и удаляет лишние строки."""
+    Ingredients = apps.get_model('recipes', 'Ingredients')
+    Recipe = apps.get_model('recipes', 'Recipe')
+    RecipeIngredient = apps.get_model('recipes', 'RecipeIngredient')
+    replacements = {
+        duplicate_id: keep_id
+        for keep_id, duplicate_ids in merges.items()
+        for duplicate_id in duplicate_ids
+    }
+    if not replacements:
+        return 0
+    _repoint(
+        RecipeIngredient.objects.all(), 'ingredient_id', replacements
+    )
+    # В связи рецепт-ингредиент пара полей уникальна: строки, которые
+    # после замены совпали бы с уже существующими, удаляются.
+    Through = Recipe._meta.get_field('ingredients').remote_field.through
+    links = Through.objects.filter(
+        ingredients_id__in=set(replacements) | set(merges)
+    ).values_list('id', 'recipe_id', 'ingredients_id')
+    seen = set()
+    redundant = []
+    for link_id, recipe_id, ingredient_id in links.order_by('id'):
+        key = (recipe_id, replacements.get(ingredient_id, ingredient_id))
+        if key in seen:
+            redundant.append(link_id)
+        seen.add(key)
+    for chunk in _chunks(redundant):
+        Through.objects.filter(id__in=chunk).delete()
+    _repoint(Through.objects.all(), 'ingredients_id', replacements)
+    for chunk in _chunks(list(replacements)):
+        Ingredients.objects.filter(id__in=chunk).delete()
+    return len(replacements)
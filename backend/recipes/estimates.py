@@ -0,0 +1,126 @@
+"""Приблизительное число строк для пагинации больших списков.
+
+Точный COUNT(*) по отфильтрованному запросу (особенно с DISTINCT после
+JOIN по тегам) дороже выборки самой страницы. Если оценка планировщика
+PostgreSQL не меньше ESTIMATED_COUNT_THRESHOLD, отдаётся она, иначе
+выполняется точный подсчёт. Результат кэшируется по тексту запроса на
+ESTIMATED_COUNT_CACHE_TIMEOUT секунд.
+
+Оценка бывает и меньше, и больше настоящего числа, а точное число из кэша
+устаревает, поэтому EstimatedCountPaginator не сверяет с ним номер
+страницы: страница читается с лишней строкой, по которой видно, есть ли
+следующая, и count уточняется по прочитанному.
+"""
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
+from django.db import connections, router
+from django.utils.functional import cached_property
+
+
+def _connection(model):
+    return connections[router.db_for_read(model)]
+
+
+def table_rows_estimate(model):
+    """Оценка числа строк таблицы по статистике планировщика PostgreSQL.
+
+    Для других СУБД и для таблиц без собранной статистики возвращает None.
+    """
+    connection = _connection(model)
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT reltuples FROM pg_class WHERE oid = %s::regclass',
+            [model._meta.db_table],
+        )
+        row = cursor.fetchone()
+    if row is None or row[0] < 0:
+        return None
+    return int(row[0])
+
+
+def query_rows_estimate(queryset):
+    """Оценка числа строк результата запроса по EXPLAIN (PostgreSQL)."""
+    connection = _connection(queryset.model)
+    if connection.vendor != 'postgresql':
+        return None
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def _cache_key(queryset):
+    sql, params = queryset.query.sql_with_params()
+    signature = hashlib.sha1(repr((sql, params)).encode()).hexdigest()
+    return f'count:{queryset.model._meta.label_lower}:{signature}'
+
+
+def estimated_count(queryset):
+    """Число строк запроса: оценка для больших результатов, иначе точное."""
+    queryset = queryset.order_by()
+    try:
+        key = _cache_key(queryset)
+    except EmptyResultSet:
+        return 0
+    count = cache.get(key)
+    if count is None:
+        estimate = (
+            query_rows_estimate(queryset) if queryset.query.where
+            else table_rows_estimate(queryset.model)
+        )
+        if (
+            estimate is not None
+            and estimate >= settings.ESTIMATED_COUNT_THRESHOLD
+        ):
+            count = estimate
+        else:
+            count = queryset.values('pk').count()
+        cache.set(key, count, settings.ESTIMATED_COUNT_CACHE_TIMEOUT)
+    return count
+
+
+class EstimatedCountPaginator(Paginator):
+    """Пагинатор, берущий число строк из estimated_count."""
+
+    @cached_property
+    def count(self):
+        if not hasattr(self.object_list, 'query'):
+            return len(self.object_list)
+        return estimated_count(self.object_list)
+
+    def validate_number(self, number):
+        """Проверяет номер без сравнения с приблизительным num_pages;
+        пустую страницу обнаруживает page()."""
+        try:
+            if isinstance(number, float) and not number.is_integer():
+                raise ValueError
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger('Номер страницы не является целым числом')
+        if number < 1:
+            raise EmptyPage('Номер страницы меньше 1')
+        return number
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        size = self.per_page + self.orphans
+        rows = list(self.object_list[bottom:bottom + size + 1])
+        if not rows and (number > 1 or not self.allow_empty_first_page):
+            raise EmptyPage('Страница не содержит результатов')
+        if len(rows) > size:
+            rows = rows[:self.per_page]
+            self.count = max(self.count, bottom + size + 1)
+        else:
+            self.count = bottom + len(rows)
+        return self._get_page(rows, number, self)
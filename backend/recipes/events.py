@@ -0,0 +1,126 @@
+"""Внутренние события и их подписчики.
+
+publish() записывает событие в таблицу OutboxEvent в той же транзакции,
+что и изменение данных: событие появляется только вместе с изменением и
+не теряется при падении процесса. Подписчики выполняются не в запросе, а
+командой drain_events (или сразу после фиксации при EVENTS_EAGER).
+
+Доставка «как минимум один раз»: подписчик, упавший с ошибкой, будет
+вызван повторно с экспоненциальной задержкой, уже отработавшие
+подписчики события повторно не вызываются. Повторная публикация с тем же
+ключом игнорируется.
+"""
+import logging
+import traceback
+import uuid
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from recipes.models import OutboxEvent
+
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 100
+MAX_ATTEMPTS = 10
+RETRY_DELAY = timedelta(seconds=5)
+MAX_RETRY_DELAY = timedelta(hours=1)
+
+_subscribers = defaultdict(list)
+
+
+def subscriber(*names):
+    """Декоратор: регистрирует функцию func(event) для событий names."""
+    def register(func):
+        for name in names:
+            _subscribers[name].append(func)
+        return func
+    return register
+
+
+def subscriber_name(func):
+    return f'{func.__module__}.{func.__qualname__}'
+
+
+def publish(name, payload, key=None):
+    """Добавляет событие в outbox текущей транзакции."""
+    OutboxEvent.objects.bulk_create(
+        [
+            OutboxEvent(
+                name=name,
+                key=key or f'{name}:{uuid.uuid4().hex}',
+                payload=payload,
+            )
+        ],
+        ignore_conflicts=True,
+    )
+    if settings.EVENTS_EAGER:
+        transaction.on_commit(drain)
+
+
+def retry_delay(attempts):
+    return min(RETRY_DELAY * 2 ** (attempts - 1), MAX_RETRY_DELAY)
+
+
+def dispatch(event, now):
+    """Вызывает ещё не отработавших подписчиков события."""
+    errors = []
+    for func in _subscribers[event.name]:
+        name = subscriber_name(func)
+        if name in event.handled:
+            continue
+        try:
+            with transaction.atomic():
+                func(event)
+        except Exception:
+            logger.exception('Ошибка обработки события %s', event.key)
+            errors.append(traceback.format_exc())
+        else:
+            event.handled.append(name)
+    if errors:
+        event.attempts += 1
+        event.available_at = now + retry_delay(event.attempts)
+        event.last_error = '\n'.join(errors)
+    else:
+        event.processed_at = now
+        event.last_error = ''
+
+
+def drain(batch_size=BATCH_SIZE):
+    """Обрабатывает доступные события пачками; возвращает их число.
+
+    Строки пачки блокируются с SKIP LOCKED, поэтому несколько
+    обработчиков могут работать параллельно.
+    """
+    processed = 0
+    while True:
+        now = timezone.now()
+        with transaction.atomic():
+            events = list(
+                OutboxEvent.objects.select_for_update(skip_locked=True)
+                .filter(
+                    processed_at__isnull=True,
+                    available_at__lte=now,
+                    attempts__lt=MAX_ATTEMPTS,
+                )
+                .order_by('available_at')[:batch_size]
+            )
+            if not events:
+                return processed
+            for event in events:
+                dispatch(event, now)
+            OutboxEvent.objects.bulk_update(
+                events,
+                [
+                    'attempts',
+                    'available_at',
+                    'handled',
+                    'last_error',
+                    'processed_at',
+                ],
+            )
+        processed += len(events)
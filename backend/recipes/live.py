@@ -0,0 +1,33 @@
+"""Счётчики избранного и подписчиков для живого потока (foodgram.live).
+
+Рассылается не изменение, а текущее значение, прочитанное после фиксации
+транзакции обработки события: клиенту не нужна исходная величина, а
+повторная обработка события ничего не искажает.
+"""
+from django.db import transaction
+
+from foodgram import live
+from recipes.events import subscriber
+from recipes.models import Favorite, Follow
+
+
+def publish_count(kind, object_id, queryset):
+    transaction.on_commit(
+        lambda: live.publish({(kind, object_id): queryset.count()})
+    )
+
+
+@subscriber('favorite.added', 'favorite.removed')
+def favorite_count(event):
+    recipe_id = event.payload['recipe']
+    publish_count(
+        'recipes', recipe_id, Favorite.objects.filter(recipe_id=recipe_id)
+    )
+
+
+@subscriber('follow.added', 'follow.removed')
+def follower_count(event):
+    author_id = event.payload['author']
+    publish_count(
+        'authors', author_id, Follow.objects.filter(author_id=author_id)
+    )
@@ -1,33 +1,184 @@
+import csv
 import json
+import time
+from itertools import islice
+from pathlib import Path
 
 from django.core.management.base import BaseCommand
-from django.db import models
+from django.db import models, transaction
+
+from recipes.signals import forget_cached_responses
+
+
+DEFAULT_BATCH_SIZE = 1000
+READ_CHUNK_SIZE = 64 * 1024
+FORMATS = ('csv', 'json', 'jsonl')
+
+
+def read_csv(file, fieldnames):
+    """Построчно читает CSV без заголовка."""
+    for row in csv.reader(file):
+        if row:
+            yield dict(zip(fieldnames, (value.strip() for value in row)))
+
+
+def read_jsonl(file):
+    """Построчно читает JSON Lines."""
+    for line in file:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+
+def read_json_array(file, chunk_size=READ_CHUNK_SIZE):
+    """Поэлементно читает JSON-массив, не загружая файл целиком."""
+    decoder = json.JSONDecoder()
+    buffer = file.read(chunk_size).lstrip()
+    if not buffer.startswith('['):
+        raise ValueError('Ожидается JSON-массив')
+    buffer = buffer[1:]
+    eof = False
+    while True:
+        buffer = buffer.lstrip()
+        if buffer.startswith(','):
+            buffer = buffer[1:].lstrip()
+        if buffer.startswith(']'):
+            return
+        try:
+            item, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            item, end = None, None
+        if end is None or (end == len(buffer) and not eof):
+            chunk = file.read(chunk_size)
+            eof = not chunk
+            buffer += chunk
+            continue
+        yield item
+        buffer = buffer[end:]
+
+
+def detect_format(path):
+    suffix = Path(path).suffix.lstrip('.').lower()
+    if suffix not in FORMATS:
+        raise ValueError(f'Неизвестный формат файла {path}')
+    return suffix
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
 
 
 class BaseImportCommand(BaseCommand):
-    """Базовый класс для импорта данных из JSON"""
+    """Базовый класс для потокового импорта данных из CSV, JSON и JSONL.
+
+    Записи читаются из файла по одной и сохраняются пачками: по
+    естественному ключу ``natural_key`` существующие строки обновляются
+    (поля ``update_fields``), новые создаются.
+    """
     model: models.Model
     filename: str
+    natural_key: tuple
+    update_fields: tuple = ()
+    csv_fields: tuple
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            nargs='?',
+            default=self.filename,
+            help=f'Путь к файлу (по умолчанию {self.filename})',
+        )
+        parser.add_argument(
+            '--format',
+            choices=FORMATS,
+            help='Формат файла; по умолчанию определяется по расширению',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help='Количество записей в одной транзакции',
+        )
+
+    def read_rows(self, file, file_format):
+        if file_format == 'csv':
+            return read_csv(file, self.csv_fields)
+        if file_format == 'jsonl':
+            return read_jsonl(file)
+        return read_json_array(file)
+
+    def get_key(self, item):
+        return tuple(item[field] for field in self.natural_key)
+
+    @transaction.atomic
+    def upsert(self, rows):
+        """Сохраняет пачку записей, возвращает (создано, обновлено)."""
+        fields = self.natural_key + self.update_fields
+        items = {
+            self.get_key(row): {field: row[field] for field in fields}
+            for row in rows
+        }
+        first_field = self.natural_key[0]
+        existing = {
+            tuple(getattr(obj, field) for field in self.natural_key): obj
+            for obj in self.model.objects.filter(**{
+                f'{first_field}__in': {key[0] for key in items}
+            })
+        }
+        to_create = []
+        to_update = []
+        for key, item in items.items():
+            obj = existing.get(key)
+            if obj is None:
+                to_create.append(self.model(**item))
+                continue
+            changed = [
+                field for field in self.update_fields
+                if getattr(obj, field) != item[field]
+            ]
+            if changed:
+                for field in changed:
+                    setattr(obj, field, item[field])
+                to_update.append(obj)
+        self.model.objects.bulk_create(to_create)
+        if to_update:
+            self.model.objects.bulk_update(to_update, self.update_fields)
+        if to_create or to_update:
+            forget_cached_responses(self.model)
+        return len(to_create), len(to_update)
 
     def handle(self, *args, **options):
+        path = options['path']
+        verbose_name = self.model._meta.verbose_name_plural
+        total = created = updated = 0
+        started = time.monotonic()
         try:
-            with open(self.filename, encoding='utf-8') as f:
-                created_count = len(self.model.objects.bulk_create(
-                    [
-                        self.model(**item)
-                        for item in json.load(f)
-                    ],
-                    ignore_conflicts=True
-                ))
-                self.stdout.write(
-                    self.style.SUCCESS(
-                        f'Успешно загружено {created_count} '
-                        f'{self.model._meta.verbose_name_plural} из '
-                        f'{self.filename}'
-                    )
-                )
-
+            file_format = options['format'] or detect_format(path)
+            with open(path, encoding='utf-8', newline='') as f:
+                for batch in batched(
+                    self.read_rows(f, file_format), options['batch_size']
+                ):
+                    batch_created, batch_updated = self.upsert(batch)
+                    total += len(batch)
+                    created += batch_created
+                    updated += batch_updated
+                    if options['verbosity'] > 1:
+                        self.stdout.write(f'Обработано {total} записей')
         except Exception as e:
             self.stdout.write(self.style.ERROR(
-                f'Ошибка при загрузке {self.filename}: {e}'
+                f'Ошибка при загрузке {path}: {e}'
             ))
+            return
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Успешно обработано {total} {verbose_name} из {path}: '
+                f'создано {created}, обновлено {updated} '
+                f'за {elapsed:.2f} с ({total / max(elapsed, 1e-6):.0f} '
+                f'записей/с)'
+            )
+        )
@@ -0,0 +1,51 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from recipes.archive import archive_shopping_lists, threshold
+from recipes.constants import ARCHIVE_BATCH_SIZE, SHOPPING_CART_ARCHIVE_DAYS
+from recipes.models import ShoppingList
+
+
+class Command(BaseCommand):
+    help = 'Перенос давних записей списков покупок в архив'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=SHOPPING_CART_ARCHIVE_DAYS,
+            help='Переносить записи, добавленные раньше указанного срока',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=ARCHIVE_BATCH_SIZE,
+        )
+        parser.add_argument(
+            '--pause',
+            type=float,
+            default=0,
+            help='Пауза между пачками, с',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только посчитать записи, подлежащие переносу',
+        )
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            count = ShoppingList.objects.filter(
+                created__lt=threshold(options['days'])
+            ).count()
+            self.stdout.write(f'Подлежит переносу записей: {count}')
+            return
+        started = time.monotonic()
+        archived = archive_shopping_lists(
+            options['days'], options['batch_size'], options['pause']
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Перенесено в архив записей: {archived} '
+            f'за {time.monotonic() - started:.2f} с'
+        ))
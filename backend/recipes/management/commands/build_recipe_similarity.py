@@ -0,0 +1,51 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from recipes import similarity
+
+
+class Command(BaseCommand):
+    help = ('Пересчёт похожих рецептов по совместному добавлению в '
+            'избранное и общим ингредиентам')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--top-k',
+            type=int,
+            default=similarity.SIMILAR_RECIPES_COUNT,
+            help='Сколько соседей хранить для каждого рецепта',
+        )
+        parser.add_argument(
+            '--favorites-weight',
+            type=float,
+            default=similarity.FAVORITES_WEIGHT,
+            help='Доля избранного в итоговом сходстве (остальное — '
+                 'ингредиенты)',
+        )
+        parser.add_argument(
+            '--max-user-favorites',
+            type=int,
+            default=similarity.MAX_USER_FAVORITES,
+            help='Пользователи с большим избранным не учитываются',
+        )
+        parser.add_argument(
+            '--max-ingredient-share',
+            type=float,
+            default=similarity.MAX_INGREDIENT_SHARE,
+            help='Ингредиенты, встречающиеся в большей доле рецептов, '
+                 'не учитываются',
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        rebuilt = similarity.rebuild(
+            options['top_k'],
+            options['favorites_weight'],
+            options['max_user_favorites'],
+            options['max_ingredient_share'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересчитано рецептов: {rebuilt} '
+            f'за {time.monotonic() - started:.2f} с'
+        ))
@@ -0,0 +1,70 @@
+import time
+from datetime import timedelta
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from foodgram.storage import file_fields
+
+
+class Command(BaseCommand):
+    help = 'Удаление медиафайлов, на которые не ссылается ни одна запись'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--min-age-hours',
+            type=float,
+            default=24,
+            help='Не трогать более новые файлы: они могут принадлежать '
+                 'ещё не зафиксированным транзакциям',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только показать, что будет удалено',
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        fields = file_fields()
+        referenced = set()
+        for field in fields:
+            referenced.update(
+                field.model._default_manager.exclude(**{field.name: ''})
+                .exclude(**{f'{field.name}__isnull': True})
+                .values_list(field.name, flat=True).iterator()
+            )
+        directories = {
+            field.upload_to.rstrip('/') for field in fields
+            if isinstance(field.upload_to, str)
+        }
+        threshold = timezone.now() - timedelta(
+            hours=options['min_age_hours']
+        )
+        # ContentHashStorageMixin перед удалением ещё раз проверяет ссылки
+        # и время: файл мог быть повторно использован после чтения ссылок.
+        # Другие хранилища удаляют файл сразу.
+        delete = getattr(
+            default_storage, 'delete_unreferenced',
+            lambda name, before: default_storage.delete(name) or True,
+        )
+        removed = 0
+        for directory in sorted(directories):
+            if not default_storage.exists(directory):
+                continue
+            for filename in default_storage.listdir(directory)[1]:
+                name = f'{directory}/{filename}'
+                if (
+                    name in referenced
+                    or default_storage.get_modified_time(name) > threshold
+                ):
+                    continue
+                if not options['dry_run'] and not delete(name, threshold):
+                    continue
+                self.stdout.write(name)
+                removed += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'{"Найдено" if options["dry_run"] else "Удалено"} файлов: '
+            f'{removed} за {time.monotonic() - started:.2f} с'
+        ))
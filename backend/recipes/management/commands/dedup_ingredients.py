@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.dedup import (
+    find_duplicate_ingredients,
+    merge_duplicate_ingredients,
+)
+from recipes.models import Ingredients
+
+
+class Command(BaseCommand):
+    help = ('Объединение ингредиентов с одинаковыми названием и единицей '
+            'измерения')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только показать планируемые объединения',
+        )
+
+    def handle(self, *args, **options):
+        merges = find_duplicate_ingredients()
+        if not merges:
+            self.stdout.write(self.style.SUCCESS('Дубликатов не найдено'))
+            return
+        kept = Ingredients.objects.in_bulk(list(merges))
+        for keep_id, duplicate_ids in merges.items():
+            self.stdout.write(
+                f'{kept[keep_id]} (id={keep_id}) <- {duplicate_ids}'
+            )
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING(
+                f'Будет объединено {sum(map(len, merges.values()))} '
+                f'дубликатов в {len(merges)} ингредиентов'
+            ))
+            return
+        with transaction.atomic():
+            merged = merge_duplicate_ingredients(merges)
+        self.stdout.write(self.style.SUCCESS(
+            f'Объединено {merged} дубликатов в {len(merges)} ингредиентов'
+        ))
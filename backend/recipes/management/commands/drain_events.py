@@ -0,0 +1,72 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+
+from recipes import events
+from recipes.models import OutboxEvent
+
+
+class Command(BaseCommand):
+    help = 'Обработка накопившихся событий подписчиками'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=events.BATCH_SIZE,
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Не завершаться, а проверять очередь каждые --interval с',
+        )
+        parser.add_argument('--interval', type=float, default=1)
+        parser.add_argument(
+            '--keep-days',
+            type=int,
+            default=7,
+            help='Удалять обработанные и исчерпавшие попытки события '
+                 'старше указанного срока',
+        )
+        parser.add_argument(
+            '--purge-interval',
+            type=float,
+            default=3600,
+            help='С --loop: удалять старые события каждые --purge-interval с',
+        )
+
+    def purge(self, keep_days):
+        before = timezone.now() - timedelta(days=keep_days)
+        deleted, _ = OutboxEvent.objects.filter(
+            Q(processed_at__lt=before)
+            | Q(
+                processed_at__isnull=True,
+                attempts__gte=events.MAX_ATTEMPTS,
+                created__lt=before,
+            )
+        ).delete()
+        if deleted:
+            self.stdout.write(f'Удалено обработанных событий: {deleted}')
+
+    def handle(self, *args, **options):
+        purged = None
+        while True:
+            started = time.monotonic()
+            if (
+                purged is None
+                or started - purged >= options['purge_interval']
+            ):
+                self.purge(options['keep_days'])
+                purged = started
+            processed = events.drain(options['batch_size'])
+            if processed or not options['loop']:
+                self.stdout.write(self.style.SUCCESS(
+                    f'Обработано событий: {processed} '
+                    f'за {time.monotonic() - started:.2f} с'
+                ))
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,105 @@
+import base64
+import json
+import sys
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Prefetch
+
+from recipes.models import Recipe, RecipeIngredient
+from ._base_import import DEFAULT_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = 'Выгрузка рецептов в формате JSON Lines'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            nargs='?',
+            default='-',
+            help='Файл для выгрузки (по умолчанию stdout)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+        )
+        parser.add_argument(
+            '--embed-images',
+            action='store_true',
+            help='Встраивать изображения в base64 вместо путей',
+        )
+
+    def iter_recipes(self, batch_size):
+        """Постранично обходит рецепты по первичному ключу."""
+        recipes = Recipe.objects.select_related('author').prefetch_related(
+            'tags',
+            Prefetch(
+                'recipe_ingredients',
+                queryset=RecipeIngredient.objects.select_related('ingredient')
+            ),
+        ).order_by('pk')
+        last_pk = 0
+        while True:
+            batch = list(recipes.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                return
+            yield from batch
+            last_pk = batch[-1].pk
+
+    @staticmethod
+    def serialize_image(image, embed):
+        if not image:
+            return None
+        if not embed:
+            return image.name
+        with image.open('rb') as f:
+            return 'data:image/{};base64,{}'.format(
+                image.name.rsplit('.', 1)[-1].lower(),
+                base64.b64encode(f.read()).decode(),
+            )
+
+    def to_record(self, recipe, embed_images):
+        return {
+            'name': recipe.name,
+            'text': recipe.text,
+            'cooking_time': recipe.cooking_time,
+            'author': recipe.author.email,
+            'image': self.serialize_image(recipe.image, embed_images),
+            'tags': [tag.slug for tag in recipe.tags.all()],
+            'ingredients': [
+                {
+                    'name': item.ingredient.name,
+                    'measurement_unit': item.ingredient.measurement_unit,
+                    'amount': item.amount,
+                }
+                for item in recipe.recipe_ingredients.all()
+            ],
+        }
+
+    def handle(self, *args, **options):
+        path = options['path']
+        out = (
+            sys.stdout if path == '-'
+            else open(path, 'w', encoding='utf-8')
+        )
+        started = time.monotonic()
+        count = 0
+        try:
+            for recipe in self.iter_recipes(options['batch_size']):
+                out.write(json.dumps(
+                    self.to_record(recipe, options['embed_images']),
+                    ensure_ascii=False,
+                ))
+                out.write('\n')
+                count += 1
+        finally:
+            if out is not sys.stdout:
+                out.close()
+        elapsed = time.monotonic() - started
+        log = self.stderr if path == '-' else self.stdout
+        log.write(self.style.SUCCESS(
+            f'Выгружено {count} рецептов за {elapsed:.2f} с '
+            f'({count / max(elapsed, 1e-6):.0f} рецептов/с)'
+        ))
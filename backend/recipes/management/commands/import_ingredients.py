@@ -3,5 +3,8 @@ from ._base_import import BaseImportCommand
 
 
 class Command(BaseImportCommand):
+    help = 'Загрузка ингредиентов из data/ingredients.json или CSV/JSONL'
     model = Ingredients
     filename = 'data/ingredients.json'
+    natural_key = ('name', 'measurement_unit')
+    csv_fields = ('name', 'measurement_unit')
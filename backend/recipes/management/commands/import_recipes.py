@@ -0,0 +1,269 @@
+import base64
+import hashlib
+import io
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from PIL import Image
+
+from foodgram.storage import HashedFileSystemStorage
+from recipes.models import Ingredients, Recipe, RecipeIngredient, Tag
+from recipes.signals import forget_cached_responses
+from ._base_import import DEFAULT_BATCH_SIZE, batched, read_jsonl
+
+
+User = get_user_model()
+
+
+def store_image(reference, source_dir, media_root, upload_to):
+    """Декодирует или копирует изображение в MEDIA_ROOT.
+
+    Выполняется в отдельном процессе, поэтому не обращается к базе и
+    настройкам Django.
+    Возвращает тройку (путь относительно MEDIA_ROOT, создан ли файл этим
+    вызовом, ошибка).
+    """
+    if not reference:
+        return None, False, 'не указано изображение'
+    try:
+        if reference.startswith('data:'):
+            content = base64.b64decode(reference.split(',', 1)[1])
+        else:
+            content = (Path(source_dir) / reference).read_bytes()
+        with Image.open(io.BytesIO(content)) as image:
+            extension = image.format.lower()
+            image.verify()
+    except Exception as e:
+        return None, False, f'изображение {reference[:64]}: {e}'
+    name = f'{upload_to}{hashlib.sha256(content).hexdigest()}.{extension}'
+    target = Path(media_root) / name
+    # Отметка повторного использования защищает файл от
+    # cleanup_orphan_media до фиксации пачки.
+    if HashedFileSystemStorage(location=media_root).touch(name):
+        return name, False, None
+    target.parent.mkdir(parents=True, exist_ok=True)
+    temporary = target.with_name(f'{target.name}.{os.getpid()}.tmp')
+    temporary.write_bytes(content)
+    os.replace(temporary, target)
+    return name, True, None
+
+
+def discard_images(names):
+    """Удаляет созданные импортом файлы, которые не достались ни одному
+    сохранённому рецепту."""
+    delete = getattr(
+        default_storage, 'delete_unreferenced', default_storage.delete
+    )
+    for name in names:
+        delete(name)
+
+
+def duplicates(items):
+    seen = set()
+    return [item for item in items if item in seen or seen.add(item)]
+
+
+def clean_fields(instance, exclude):
+    """Проверки полей модели (валидаторы, длина, тип) без запросов к
+    базе; ошибка — ValueError с перечислением полей."""
+    try:
+        instance.clean_fields(exclude=exclude)
+    except ValidationError as e:
+        raise ValueError('; '.join(
+            f'{field}: {" ".join(messages)}'
+            for field, messages in e.message_dict.items()
+        ))
+
+
+class Command(BaseCommand):
+    help = 'Пакетная загрузка рецептов из файла JSON Lines'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл, созданный export_recipes')
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help='Количество рецептов в одной транзакции',
+        )
+        parser.add_argument(
+            '--media-dir',
+            default=None,
+            help='Каталог, относительно которого указаны изображения '
+                 '(по умолчанию каталог файла)',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count(),
+            help='Количество процессов для обработки изображений; '
+                 '0 — обрабатывать в текущем процессе',
+        )
+
+    def resolve(self, records):
+        """Загружает авторов, теги и ингредиенты пачки тремя запросами."""
+        authors = User.objects.in_bulk(
+            {record.get('author') for record in records},
+            field_name='email',
+        )
+        tags = Tag.objects.in_bulk(
+            {slug for record in records for slug in record.get('tags', ())},
+            field_name='slug',
+        )
+        names = {
+            item['name']
+            for record in records
+            for item in record.get('ingredients', ())
+        }
+        ingredients = {}
+        for ingredient in Ingredients.objects.filter(name__in=names):
+            ingredients.setdefault(
+                (ingredient.name, ingredient.measurement_unit), ingredient
+            )
+        return authors, tags, ingredients
+
+    def build(self, record, image, authors, tags, ingredients):
+        """Создаёт несохранённый рецепт и id его тегов и ингредиентов.
+
+        Проверки те же, что у RecipeWriteSerializer: хотя бы один тег и
+        ингредиент без повторов, ограничения полей моделей.
+        """
+        author = authors.get(record.get('author'))
+        if author is None:
+            raise ValueError(f'автор {record.get("author")} не найден')
+        slugs = record.get('tags') or ()
+        if not slugs:
+            raise ValueError('не указаны теги')
+        missing_tags = [slug for slug in slugs if slug not in tags]
+        if missing_tags:
+            raise ValueError(f'теги не найдены: {missing_tags}')
+        if duplicates(slugs):
+            raise ValueError(f'повторяются теги: {duplicates(slugs)}')
+        items = record.get('ingredients') or ()
+        if not items:
+            raise ValueError('не указаны ингредиенты')
+        recipe_ingredients = []
+        for item in items:
+            key = (item['name'], item['measurement_unit'])
+            if key not in ingredients:
+                raise ValueError(f'ингредиент не найден: {key}')
+            link = RecipeIngredient(amount=item['amount'])
+            clean_fields(link, exclude=('recipe', 'ingredient'))
+            recipe_ingredients.append((ingredients[key].id, link.amount))
+        repeated = duplicates([
+            ingredient_id for ingredient_id, _ in recipe_ingredients
+        ])
+        if repeated:
+            raise ValueError(f'повторяются ингредиенты: {repeated}')
+        recipe = Recipe(
+            author=author,
+            name=record['name'],
+            text=record['text'],
+            cooking_time=record['cooking_time'],
+            image=image,
+        )
+        clean_fields(recipe, exclude=('author', 'image'))
+        tag_ids = [tags[slug].id for slug in slugs]
+        return recipe, tag_ids, recipe_ingredients
+
+    @transaction.atomic
+    def save_batch(self, rows):
+        """Сохраняет пачку рецептов, возвращает число вставленных строк."""
+        recipes = [recipe for recipe, _, _ in rows]
+        if connection.features.can_return_rows_from_bulk_insert:
+            Recipe.objects.bulk_create(recipes)
+        else:
+            for recipe in recipes:
+                recipe.save()
+        tag_links = Recipe.tags.through.objects.bulk_create(
+            Recipe.tags.through(recipe_id=recipe.pk, tag_id=tag_id)
+            for recipe, tag_ids, _ in rows
+            for tag_id in tag_ids
+        )
+        recipe_ingredients = RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(
+                recipe_id=recipe.pk,
+                ingredient_id=ingredient_id,
+                amount=amount,
+            )
+            for recipe, _, items in rows
+            for ingredient_id, amount in items
+        )
+        forget_cached_responses(Recipe)
+        return len(recipes) + len(tag_links) + len(recipe_ingredients)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        store = partial(
+            store_image,
+            source_dir=options['media_dir'] or Path(path).parent,
+            media_root=settings.MEDIA_ROOT,
+            upload_to=Recipe._meta.get_field('image').upload_to,
+        )
+        pool = (
+            ProcessPoolExecutor(options['workers'])
+            if options['workers'] else None
+        )
+        imported = skipped = inserted_rows = 0
+        started = time.monotonic()
+        try:
+            with open(path, encoding='utf-8') as f:
+                records = enumerate(read_jsonl(f), 1)
+                for batch in batched(records, options['batch_size']):
+                    records_only = [record for _, record in batch]
+                    references = [
+                        record.get('image') for record in records_only
+                    ]
+                    images = list(
+                        pool.map(store, references, chunksize=16)
+                        if pool else map(store, references)
+                    )
+                    created = {
+                        image for image, new, _ in images if new
+                    }
+                    resolved = self.resolve(records_only)
+                    rows = []
+                    for (number, record), (image, _, error) in zip(
+                        batch, images
+                    ):
+                        try:
+                            if error:
+                                raise ValueError(error)
+                            rows.append(
+                                self.build(record, image, *resolved)
+                            )
+                        except (KeyError, ValueError) as e:
+                            skipped += 1
+                            self.stderr.write(f'Запись {number}: {e}')
+                    try:
+                        inserted_rows += self.save_batch(rows)
+                    except Exception:
+                        discard_images(created)
+                        raise
+                    discard_images(created - {
+                        recipe.image.name for recipe, _, _ in rows
+                    })
+                    imported += len(rows)
+                    elapsed = time.monotonic() - started
+                    self.stdout.write(
+                        f'Импортировано {imported} рецептов, '
+                        f'пропущено {skipped}; '
+                        f'{inserted_rows / max(elapsed, 1e-6):.0f} строк/с'
+                    )
+        finally:
+            if pool:
+                pool.shutdown()
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Загружено {imported} рецептов ({inserted_rows} строк) '
+            f'за {elapsed:.2f} с, пропущено {skipped}'
+        ))
@@ -3,5 +3,9 @@ from ._base_import import BaseImportCommand
 
 
 class Command(BaseImportCommand):
+    help = 'Загрузка тегов из data/tags.json или CSV/JSONL'
     model = Tag
     filename = 'data/tags.json'
+    natural_key = ('slug',)
+    update_fields = ('name',)
+    csv_fields = ('name', 'slug')
@@ -0,0 +1,112 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from recipes.models import Favorite
+
+
+class Command(BaseCommand):
+    help = (
+        'Разбиение таблицы избранного на хэш-секции по user_id '
+        '(только PostgreSQL 11+)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--partitions',
+            type=int,
+            default=16,
+            help='Число секций',
+        )
+        parser.add_argument(
+            '--sql',
+            action='store_true',
+            help='Только вывести SQL, ничего не выполняя',
+        )
+
+    def statements(self, partitions, sequence):
+        """Новая секционированная таблица заменяет старую целиком в одной
+        транзакции. Первичный ключ секционированной таблицы обязан
+        включать ключ секционирования, поэтому он составной (id, user_id);
+        id по-прежнему выдаёт прежняя последовательность."""
+        quote = connection.ops.quote_name
+        table = Favorite._meta.db_table
+        new = f'{table}_partitioned'
+        foreign_keys = [
+            (field.column, field.related_model._meta.db_table)
+            for field in (
+                Favorite._meta.get_field('user'),
+                Favorite._meta.get_field('recipe'),
+            )
+        ]
+        yield f'LOCK TABLE {quote(table)} IN ACCESS EXCLUSIVE MODE'
+        yield (
+            f'CREATE TABLE {quote(new)} '
+            f'(LIKE {quote(table)} INCLUDING DEFAULTS) '
+            f'PARTITION BY HASH ("user_id")'
+        )
+        for remainder in range(partitions):
+            yield (
+                f'CREATE TABLE {quote(f"{table}_p{remainder}")} '
+                f'PARTITION OF {quote(new)} FOR VALUES WITH '
+                f'(MODULUS {partitions}, REMAINDER {remainder})'
+            )
+        yield f'INSERT INTO {quote(new)} SELECT * FROM {quote(table)}'
+        # Иначе последовательность удалится вместе со старой таблицей.
+        yield f'ALTER SEQUENCE {sequence} OWNED BY {quote(new)}."id"'
+        yield f'DROP TABLE {quote(table)}'
+        yield f'ALTER TABLE {quote(new)} RENAME TO {quote(table)}'
+        yield (
+            f'ALTER TABLE {quote(table)} ADD CONSTRAINT '
+            f'{quote(f"{table}_pkey")} PRIMARY KEY ("id", "user_id")'
+        )
+        yield (
+            f'ALTER TABLE {quote(table)} ADD CONSTRAINT "unique_favorite" '
+            f'UNIQUE ("user_id", "recipe_id")'
+        )
+        for column, target in foreign_keys:
+            yield (
+                f'ALTER TABLE {quote(table)} ADD CONSTRAINT '
+                f'{quote(f"{table}_{column}_fk")} FOREIGN KEY '
+                f'({quote(column)}) REFERENCES {quote(target)} ("id") '
+                f'DEFERRABLE INITIALLY DEFERRED'
+            )
+        # Индекс по user_id не нужен: его заменяет уникальное ограничение.
+        yield (
+            f'CREATE INDEX {quote(f"{table}_recipe_id")} '
+            f'ON {quote(table)} ("recipe_id")'
+        )
+        yield f'ANALYZE {quote(table)}'
+
+    def handle(self, *args, **options):
+        if options['partitions'] < 2:
+            raise CommandError('Нужно не меньше двух секций.')
+        table = Favorite._meta.db_table
+        if options['sql']:
+            for statement in self.statements(
+                options['partitions'], f'"{table}_id_seq"'
+            ):
+                self.stdout.write(f'{statement};')
+            return
+        if connection.vendor != 'postgresql':
+            raise CommandError(
+                'Секционирование поддерживается только в PostgreSQL.'
+            )
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT EXISTS (SELECT 1 FROM pg_partitioned_table '
+                'WHERE partrelid = %s::regclass)',
+                [table],
+            )
+            if cursor.fetchone()[0]:
+                raise CommandError(f'Таблица {table} уже секционирована.')
+            cursor.execute(
+                "SELECT pg_get_serial_sequence(%s, 'id')", [table]
+            )
+            sequence = cursor.fetchone()[0]
+            for statement in self.statements(
+                options['partitions'], sequence
+            ):
+                cursor.execute(statement)
+        self.stdout.write(self.style.SUCCESS(
+            f'Таблица {table} разбита на {options["partitions"]} секций.'
+        ))
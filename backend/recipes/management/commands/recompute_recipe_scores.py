@@ -0,0 +1,50 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from recipes import scores
+
+
+class Command(BaseCommand):
+    help = ('Пересчёт популярности рецептов по новым добавлениям в '
+            'избранное и списки покупок')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Точно пересчитать счётчики всех рецептов (учитывает '
+                 'удаления из избранного и списков покупок)',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=scores.DEFAULT_CHUNK_SIZE,
+        )
+        parser.add_argument(
+            '--half-life-hours',
+            type=float,
+            default=scores.TRENDING_HALF_LIFE_HOURS,
+        )
+        parser.add_argument(
+            '--horizon',
+            type=float,
+            default=scores.SCORE_COMMIT_HORIZON_SECONDS,
+            help='Учитывать строки, замеченные не меньше указанного '
+                 'числа секунд назад',
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        scores.decay_trending(timezone.now(), options['half_life_hours'])
+        if options['full']:
+            rebuilt = scores.rebuild_counts(options['chunk_size'])
+            self.stdout.write(f'Пересчитано рецептов: {rebuilt}')
+        processed = scores.process_new_rows(
+            options['chunk_size'], options['horizon']
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Учтено новых строк: {processed} '
+            f'за {time.monotonic() - started:.2f} с'
+        ))
@@ -0,0 +1,92 @@
+from collections import defaultdict
+
+import django.core.validators
+from django.db import migrations, models
+
+
+UPDATE_CHUNK_SIZE = 500
+
+
+def _chunks(items, size=UPDATE_CHUNK_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def merge_duplicates(apps, schema_editor):
+    """Объединяет ингредиенты с одинаковыми названием и единицей
+    измерения в ингредиент с наименьшим id.
+
+    Логика повторяет recipes.dedup на момент миграции и работает только с
+    историческими моделями: последующие изменения кода на миграцию не
+    влияют.
+    """
+    Ingredients = apps.get_model('recipes', 'Ingredients')
+    RecipeIngredient = apps.get_model('recipes', 'RecipeIngredient')
+    Through = apps.get_model('recipes', 'Recipe')._meta.get_field(
+        'ingredients'
+    ).remote_field.through
+    keep = {}
+    merges = defaultdict(list)
+    for ingredient_id, name, unit in Ingredients.objects.order_by(
+        'id'
+    ).values_list('id', 'name', 'measurement_unit').iterator():
+        keep_id = keep.setdefault((name, unit), ingredient_id)
+        if keep_id != ingredient_id:
+            merges[keep_id].append(ingredient_id)
+    if not merges:
+        return
+    replacements = {
+        duplicate_id: keep_id
+        for keep_id, duplicate_ids in merges.items()
+        for duplicate_id in duplicate_ids
+    }
+    for keep_id, duplicate_ids in merges.items():
+        RecipeIngredient.objects.filter(
+            ingredient_id__in=duplicate_ids
+        ).update(ingredient_id=keep_id)
+    # В связи рецепт-ингредиент пара полей уникальна: строки, которые
+    # после замены совпали бы с уже существующими, удаляются.
+    seen = set()
+    redundant = []
+    for link_id, recipe_id, ingredient_id in Through.objects.filter(
+        ingredients_id__in=set(replacements) | set(merges)
+    ).order_by('id').values_list('id', 'recipe_id', 'ingredients_id'):
+        key = (recipe_id, replacements.get(ingredient_id, ingredient_id))
+        if key in seen:
+            redundant.append(link_id)
+        seen.add(key)
+    for chunk in _chunks(redundant):
+        Through.objects.filter(id__in=chunk).delete()
+    for keep_id, duplicate_ids in merges.items():
+        Through.objects.filter(
+            ingredients_id__in=duplicate_ids
+        ).update(ingredients_id=keep_id)
+    for chunk in _chunks(list(replacements)):
+        Ingredients.objects.filter(id__in=chunk).delete()
+
+
+class Migration(migrations.Migration):
+    # Объединение выполняется в собственной транзакции: на PostgreSQL
+    # ALTER TABLE в одной транзакции с изменением строк, на которые
+    # ссылаются отложенные внешние ключи, падает с «pending trigger
+    # events».
+    atomic = False
+
+    dependencies = [
+        ('recipes', '0006_auto_20250823_1523'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recipe',
+            name='cooking_time',
+            field=models.PositiveIntegerField(help_text='Укажите время готовки', validators=[django.core.validators.MinValueValidator(1)], verbose_name='Время (мин)'),
+        ),
+        migrations.RunPython(
+            merge_duplicates, migrations.RunPython.noop, atomic=True
+        ),
+        migrations.AddConstraint(
+            model_name='ingredients',
+            constraint=models.UniqueConstraint(fields=('name', 'measurement_unit'), name='unique_ingredient'),
+        ),
+    ]
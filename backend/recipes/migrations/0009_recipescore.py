@@ -0,0 +1,41 @@
+# Generated by Django 3.2.3 on 2026-10-19 07:51
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_shortlink'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeScore',
+            fields=[
+                ('recipe', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='score', serialize=False, to='recipes.recipe', verbose_name='Рецепт')),
+                ('favorites_count', models.PositiveIntegerField(default=0, verbose_name='В избранном')),
+                ('shopping_carts_count', models.PositiveIntegerField(default=0, verbose_name='В списках покупок')),
+                ('popularity', models.FloatField(db_index=True, default=0, verbose_name='Популярность')),
+                ('trending', models.FloatField(db_index=True, default=0, verbose_name='Набирает популярность')),
+            ],
+            options={
+                'verbose_name': 'Популярность рецепта',
+                'verbose_name_plural': 'Популярность рецептов',
+            },
+        ),
+        migrations.CreateModel(
+            name='ScoreWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=64, unique=True, verbose_name='Источник')),
+                ('last_id', models.PositiveBigIntegerField(default=0, verbose_name='Последний id')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Обновлено')),
+            ],
+            options={
+                'verbose_name': 'Отметка пересчёта',
+                'verbose_name_plural': 'Отметки пересчёта',
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 3.2.3 on 2026-10-19 07:56
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0010_recipesimilarity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=64, verbose_name='Событие')),
+                ('key', models.CharField(max_length=128, unique=True, verbose_name='Ключ идемпотентности')),
+                ('payload', models.JSONField(default=dict, verbose_name='Данные')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Создано')),
+                ('available_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Доступно для обработки с')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Попытки')),
+                ('handled', models.JSONField(default=list, verbose_name='Отработавшие подписчики')),
+                ('last_error', models.TextField(blank=True, verbose_name='Ошибка')),
+                ('processed_at', models.DateTimeField(blank=True, null=True, verbose_name='Обработано')),
+            ],
+            options={
+                'verbose_name': 'Событие',
+                'verbose_name_plural': 'События',
+                'ordering': ('id',),
+            },
+        ),
+        migrations.AddIndex(
+            model_name='outboxevent',
+            index=models.Index(condition=models.Q(('processed_at__isnull', True)), fields=['available_at'], name='outbox_pending'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 3.2.3 on 2026-10-19 08:04
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0011_outboxevent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeRevision',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.PositiveIntegerField(verbose_name='Номер')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Создана')),
+                ('snapshot', models.BooleanField(default=False, verbose_name='Полный снимок')),
+                ('data', models.JSONField(verbose_name='Данные')),
+                ('editor', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Автор изменений')),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='revisions', to='recipes.recipe', verbose_name='Рецепт')),
+            ],
+            options={
+                'verbose_name': 'Версия рецепта',
+                'verbose_name_plural': 'Версии рецептов',
+                'ordering': ('recipe', 'number'),
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='reciperevision',
+            constraint=models.UniqueConstraint(fields=('recipe', 'number'), name='unique_recipe_revision'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 3.2.3 on 2026-10-19 08:08
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0012_reciperevision'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shoppinglist',
+            name='created',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name='Добавлено'),
+        ),
+        migrations.CreateModel(
+            name='ShoppingListArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('added', models.DateTimeField(verbose_name='Добавлено в список')),
+                ('archived', models.DateTimeField(auto_now_add=True, verbose_name='Перенесено в архив')),
+                ('recipe', models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='recipes.recipe', verbose_name='Рецепт')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Покупатель')),
+            ],
+            options={
+                'verbose_name': 'Архивная запись списка покупок',
+                'verbose_name_plural': 'Архив списков покупок',
+                'ordering': ('id',),
+            },
+        ),
+    ]
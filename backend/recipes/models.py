@@ -2,6 +2,7 @@ from django.core.validators import MinValueValidator
 from django.contrib.auth.models import AbstractUser
 from django.contrib.auth.validators import UnicodeUsernameValidator
 from django.db import models
+from django.utils import timezone
 
 import recipes.constants as constants
 
@@ -128,6 +129,12 @@ class Ingredients(models.Model):
         ordering = ('name',)
         verbose_name = 'Ингридиент'
         verbose_name_plural = 'Ингридиенты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['name', 'measurement_unit'],
+                name='unique_ingredient'
+            )
+        ]
 
     def __str__(self):
         return f'{self.name} - {self.measurement_unit}'
@@ -266,6 +273,11 @@ class ShoppingList(models.Model):
         related_name='shopping_carts',
         help_text='Выберите рецепты для покупки ингридиентов',
     )
+    created = models.DateTimeField(
+        default=timezone.now,
+        db_index=True,
+        verbose_name='Добавлено',
+    )
 
     class Meta:
         ordering = ('user',)
@@ -281,3 +293,254 @@ class ShoppingList(models.Model):
     def __str__(self):
         """Возвращает строковое представление списка покупок."""
         return self.user.username
+
+
+class ShoppingListArchive(models.Model):
+    """Рецепт, давно лежавший в списке покупок и перенесённый в архив.
+
+    Строки не мешают индексам и очистке основной таблицы; ссылка на
+    рецепт без ограничения внешнего ключа, чтобы удаление рецепта не
+    затрагивало архив.
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Покупатель',
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        db_index=False,
+        related_name='+',
+        verbose_name='Рецепт',
+    )
+    added = models.DateTimeField(verbose_name='Добавлено в список')
+    archived = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Перенесено в архив',
+    )
+
+    class Meta:
+        ordering = ('id',)
+        verbose_name = 'Архивная запись списка покупок'
+        verbose_name_plural = 'Архив списков покупок'
+
+    def __str__(self):
+        return f'{self.user_id} - {self.recipe_id}'
+
+
+class ShortLink(models.Model):
+    """Модель короткой ссылки на рецепт."""
+
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='short_link',
+        verbose_name='Рецепт',
+    )
+    code = models.CharField(
+        max_length=constants.SHORT_LINK_CODE_MAX_LENGTH,
+        unique=True,
+        verbose_name='Код',
+    )
+    hits = models.PositiveBigIntegerField(
+        default=0,
+        verbose_name='Переходы',
+    )
+
+    class Meta:
+        verbose_name = 'Короткая ссылка'
+        verbose_name_plural = 'Короткие ссылки'
+
+    def __str__(self):
+        return self.code
+
+
+class RecipeScore(models.Model):
+    """Предрассчитанные показатели популярности рецепта."""
+
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='score',
+        verbose_name='Рецепт',
+    )
+    favorites_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='В избранном',
+    )
+    shopping_carts_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='В списках покупок',
+    )
+    popularity = models.FloatField(
+        default=0,
+        db_index=True,
+        verbose_name='Популярность',
+    )
+    trending = models.FloatField(
+        default=0,
+        db_index=True,
+        verbose_name='Набирает популярность',
+    )
+
+    class Meta:
+        verbose_name = 'Популярность рецепта'
+        verbose_name_plural = 'Популярность рецептов'
+
+    def __str__(self):
+        return f'{self.recipe_id}: {self.popularity}'
+
+
+class ScoreWatermark(models.Model):
+    """Последняя учтённая при расчёте популярности строка таблицы."""
+
+    name = models.CharField(
+        max_length=64,
+        unique=True,
+        verbose_name='Источник',
+    )
+    last_id = models.PositiveBigIntegerField(
+        default=0,
+        verbose_name='Последний id',
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Обновлено',
+    )
+
+    class Meta:
+        verbose_name = 'Отметка пересчёта'
+        verbose_name_plural = 'Отметки пересчёта'
+
+    def __str__(self):
+        return f'{self.name}: {self.last_id}'
+
+
+class RecipeSimilarity(models.Model):
+    """Похожий рецепт из предрассчитанного списка соседей."""
+
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='similarities',
+        verbose_name='Рецепт',
+    )
+    similar = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='similar_to',
+        verbose_name='Похожий рецепт',
+    )
+    rank = models.PositiveSmallIntegerField(verbose_name='Место')
+    score = models.FloatField(verbose_name='Сходство')
+
+    class Meta:
+        ordering = ('recipe', 'rank')
+        verbose_name = 'Похожий рецепт'
+        verbose_name_plural = 'Похожие рецепты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['recipe', 'rank'],
+                name='unique_similarity_rank'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.recipe_id} ~ {self.similar_id}: {self.score:.3f}'
+
+
+class OutboxEvent(models.Model):
+    """Событие, ожидающее обработки подписчиками."""
+
+    name = models.CharField(
+        max_length=constants.EVENT_NAME_MAX_LENGTH,
+        verbose_name='Событие',
+    )
+    key = models.CharField(
+        max_length=constants.EVENT_KEY_MAX_LENGTH,
+        unique=True,
+        verbose_name='Ключ идемпотентности',
+    )
+    payload = models.JSONField(default=dict, verbose_name='Данные')
+    created = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Создано',
+    )
+    available_at = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Доступно для обработки с',
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name='Попытки',
+    )
+    handled = models.JSONField(
+        default=list,
+        verbose_name='Отработавшие подписчики',
+    )
+    last_error = models.TextField(blank=True, verbose_name='Ошибка')
+    processed_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Обработано',
+    )
+
+    class Meta:
+        ordering = ('id',)
+        verbose_name = 'Событие'
+        verbose_name_plural = 'События'
+        indexes = [
+            models.Index(
+                fields=['available_at'],
+                condition=models.Q(processed_at__isnull=True),
+                name='outbox_pending',
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.name}: {self.key}'
+
+
+class RecipeRevision(models.Model):
+    """Версия рецепта: полный снимок или изменения относительно
+    предыдущей версии."""
+
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='revisions',
+        verbose_name='Рецепт',
+    )
+    number = models.PositiveIntegerField(verbose_name='Номер')
+    editor = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='+',
+        verbose_name='Автор изменений',
+    )
+    created = models.DateTimeField(auto_now_add=True, verbose_name='Создана')
+    snapshot = models.BooleanField(
+        default=False,
+        verbose_name='Полный снимок',
+    )
+    data = models.JSONField(verbose_name='Данные')
+
+    class Meta:
+        ordering = ('recipe', 'number')
+        verbose_name = 'Версия рецепта'
+        verbose_name_plural = 'Версии рецептов'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['recipe', 'number'],
+                name='unique_recipe_revision'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.recipe_id} v{self.number}'
@@ -0,0 +1,193 @@
+"""История изменений рецептов.
+
+Состояние рецепта — название, описание, время готовки, id тегов и
+количества ингредиентов. Каждая REVISION_SNAPSHOT_INTERVAL-я версия
+(1, 11, 21, ...) хранится полным снимком, остальные — только изменениями
+относительно предыдущей: новые значения полей, добавленные и удалённые
+теги и ингредиенты, а для описания — заменённые диапазоны строк. Размер
+дельты зависит от объёма правки, а не от размера рецепта, и любая версия
+восстанавливается одним запросом не более чем по
+REVISION_SNAPSHOT_INTERVAL строкам.
+
+Версии пишутся в транзакции сохранения рецепта; чтение самого рецепта
+история не затрагивает.
+"""
+import difflib
+
+from recipes.constants import REVISION_SNAPSHOT_INTERVAL
+from recipes.models import Recipe, RecipeIngredient, RecipeRevision
+
+
+FIELDS = ('name', 'text', 'cooking_time')
+
+
+def build_state(name, text, cooking_time, tags, ingredients):
+    """ingredients — пары (id ингредиента, количество)."""
+    return {
+        'name': name,
+        'text': text,
+        'cooking_time': cooking_time,
+        'tags': sorted(tags),
+        'ingredients': {
+            str(ingredient): amount for ingredient, amount in ingredients
+        },
+    }
+
+
+def current_state(recipe_id, lock=False):
+    """Состояние рецепта в базе; lock блокирует строку до конца
+    транзакции, чтобы параллельные правки не получили один номер."""
+    recipes = Recipe.objects.select_for_update() if lock else Recipe.objects
+    fields = recipes.values(*FIELDS).get(pk=recipe_id)
+    return build_state(
+        tags=Recipe.tags.through.objects.filter(
+            recipe_id=recipe_id
+        ).values_list('tag_id', flat=True),
+        ingredients=RecipeIngredient.objects.filter(
+            recipe_id=recipe_id
+        ).values_list('ingredient_id', 'amount'),
+        **fields,
+    )
+
+
+def _lines(text):
+    return text.splitlines(keepends=True)
+
+
+def diff(old, new):
+    """Дельта, превращающая состояние old в new; пустая, если они
+    совпадают."""
+    delta = {
+        field: new[field] for field in ('name', 'cooking_time')
+        if old[field] != new[field]
+    }
+    if old['text'] != new['text']:
+        new_lines = _lines(new['text'])
+        delta['text'] = [
+            [start, end, new_lines[new_start:new_end]]
+            for tag, start, end, new_start, new_end
+            in difflib.SequenceMatcher(
+                None, _lines(old['text']), new_lines, autojunk=False
+            ).get_opcodes()
+            if tag != 'equal'
+        ]
+    added = sorted(set(new['tags']) - set(old['tags']))
+    removed = sorted(set(old['tags']) - set(new['tags']))
+    if added or removed:
+        delta['tags'] = {'add': added, 'remove': removed}
+    changed = {
+        ingredient: amount
+        for ingredient, amount in new['ingredients'].items()
+        if old['ingredients'].get(ingredient) != amount
+    }
+    dropped = sorted(set(old['ingredients']) - set(new['ingredients']))
+    if changed or dropped:
+        delta['ingredients'] = {'set': changed, 'remove': dropped}
+    return delta
+
+
+def apply(state, delta):
+    """Состояние после применения дельты."""
+    state = {
+        **state,
+        **{field: delta[field] for field in ('name', 'cooking_time')
+           if field in delta},
+    }
+    if 'text' in delta:
+        lines = _lines(state['text'])
+        for start, end, replacement in reversed(delta['text']):
+            lines[start:end] = replacement
+        state['text'] = ''.join(lines)
+    if 'tags' in delta:
+        state['tags'] = sorted(
+            set(state['tags']) - set(delta['tags']['remove'])
+            | set(delta['tags']['add'])
+        )
+    if 'ingredients' in delta:
+        ingredients = {
+            **state['ingredients'], **delta['ingredients']['set']
+        }
+        for ingredient in delta['ingredients']['remove']:
+            ingredients.pop(ingredient, None)
+        state['ingredients'] = ingredients
+    return state
+
+
+def is_snapshot(number):
+    return (number - 1) % REVISION_SNAPSHOT_INTERVAL == 0
+
+
+def record(recipe_id, previous, current, editor=None):
+    """Сохраняет версию current. previous — состояние до правки или None
+    для нового рецепта. Возвращает номер версии или None, если ничего не
+    изменилось."""
+    if previous == current:
+        return None
+    number = RecipeRevision.objects.filter(
+        recipe_id=recipe_id
+    ).order_by('-number').values_list('number', flat=True).first() or 0
+    revisions = []
+    if number == 0 and previous is not None:
+        # Рецепт создан до появления истории: первой версией становится
+        # его состояние до правки.
+        number = 1
+        revisions.append(RecipeRevision(
+            recipe_id=recipe_id, number=1, snapshot=True, data=previous
+        ))
+    number += 1
+    snapshot = previous is None or is_snapshot(number)
+    revisions.append(RecipeRevision(
+        recipe_id=recipe_id,
+        number=number,
+        editor=editor,
+        snapshot=snapshot,
+        data=current if snapshot else diff(previous, current),
+    ))
+    RecipeRevision.objects.bulk_create(revisions)
+    return number
+
+
+def reconstruct(recipe_id, number):
+    """Состояние рецепта в версии number или None, если её нет."""
+    base = number - (number - 1) % REVISION_SNAPSHOT_INTERVAL
+    revisions = list(RecipeRevision.objects.filter(
+        recipe_id=recipe_id, number__gte=base, number__lte=number
+    ).order_by('number').values_list('number', 'data'))
+    if not revisions or revisions[-1][0] != number:
+        return None
+    state = revisions[0][1]
+    for _, delta in revisions[1:]:
+        state = apply(state, delta)
+    return state
+
+
+def compare(old, new):
+    """Читаемое описание различий двух состояний."""
+    changes = {
+        field: {'old': old[field], 'new': new[field]}
+        for field in ('name', 'cooking_time') if old[field] != new[field]
+    }
+    if old['text'] != new['text']:
+        changes['text'] = list(difflib.unified_diff(
+            old['text'].splitlines(), new['text'].splitlines(), lineterm=''
+        ))
+    delta = diff(old, new)
+    if 'tags' in delta:
+        changes['tags'] = {
+            'added': delta['tags']['add'],
+            'removed': delta['tags']['remove'],
+        }
+    if 'ingredients' in delta:
+        changes['ingredients'] = [
+            {
+                'id': int(ingredient),
+                'old': old['ingredients'].get(ingredient),
+                'new': new['ingredients'].get(ingredient),
+            }
+            for ingredient in sorted(
+                [*delta['ingredients']['set'],
+                 *delta['ingredients']['remove']],
+                key=int,
+            )
+        ]
+    return changes
@@ -0,0 +1,226 @@
+"""Пересчёт популярности рецептов.
+
+popularity — число добавлений в избранное и (с меньшим весом) в списки
+покупок. trending — та же величина с экспоненциальным затуханием: при
+каждом запуске накопленное значение уменьшается по периоду полураспада
+TRENDING_HALF_LIFE_HOURS, а новые добавления прибавляются.
+
+Новые строки Favorite и ShoppingList обрабатываются по возрастанию id
+начиная с сохранённой отметки, поэтому каждый запуск читает только
+добавленное с прошлого раза. id выдаются до фиксации транзакции, и строка
+с меньшим id может стать видимой позже строки с большим, поэтому отметка
+продвигается не до Max(id), а до максимума, замеченного в прошлый запуск
+не меньше COMMIT_HORIZON секунд назад: к этому времени транзакции с
+меньшими id уже завершены.
+
+Удаления так не учитываются: их исправляет полный пересчёт счётчиков
+(rebuild_counts). Он считает строки до текущей отметки, читая её под
+блокировкой в той же транзакции, что и пачку счётчиков, а более новые
+строки оставляет process_new_rows. Записи, перенесённые в архив
+(recipes.archive), пересчёт продолжает учитывать; запись списка покупок,
+чья пара (пользователь, рецепт) уже есть в архиве, второй раз не
+считается.
+"""
+from collections import Counter
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, Exists, F, Max, OuterRef
+from django.utils import timezone
+
+from recipes.constants import (
+    SCORE_COMMIT_HORIZON_SECONDS,
+    SHOPPING_CART_SCORE_WEIGHT,
+    TRENDING_HALF_LIFE_HOURS,
+)
+from recipes.models import (
+    Favorite,
+    Recipe,
+    RecipeScore,
+    ScoreWatermark,
+    ShoppingList,
+    ShoppingListArchive,
+)
+
+
+SOURCES = {
+    'favorite': (Favorite, 'favorites_count'),
+    'shopping_cart': (ShoppingList, 'shopping_carts_count'),
+}
+ARCHIVES = {
+    'shopping_carts_count': ShoppingListArchive,
+}
+WEIGHTS = {
+    'favorites_count': 1,
+    'shopping_carts_count': SHOPPING_CART_SCORE_WEIGHT,
+}
+DECAY = 'decay'
+SEEN_SUFFIX = ':seen'
+DEFAULT_CHUNK_SIZE = 50_000
+UPDATE_BATCH_SIZE = 1000
+
+
+def popularity(score):
+    return sum(
+        weight * getattr(score, field) for field, weight in WEIGHTS.items()
+    )
+
+
+def _save(scores, fields):
+    """Создаёт отсутствующие и обновляет существующие строки."""
+    new = [score for score in scores if score._state.adding]
+    RecipeScore.objects.bulk_create(new, batch_size=UPDATE_BATCH_SIZE)
+    RecipeScore.objects.bulk_update(
+        [score for score in scores if not score._state.adding],
+        fields,
+        batch_size=UPDATE_BATCH_SIZE,
+    )
+
+
+def decay_trending(now, half_life_hours=TRENDING_HALF_LIFE_HOURS):
+    """Уменьшает trending пропорционально времени с прошлого запуска."""
+    watermark, created = ScoreWatermark.objects.get_or_create(name=DECAY)
+    if created:
+        return
+    hours = (now - watermark.updated_at).total_seconds() / 3600
+    RecipeScore.objects.filter(trending__gt=0).update(
+        trending=F('trending') * 0.5 ** (hours / half_life_hours)
+    )
+    watermark.save(update_fields=['updated_at'])
+
+
+def apply_deltas(deltas):
+    """Добавляет приросты {recipe_id: {поле: n}} к счётчикам."""
+    scores = RecipeScore.objects.in_bulk(list(deltas))
+    for recipe_id, changes in deltas.items():
+        score = scores.setdefault(recipe_id, RecipeScore(recipe_id=recipe_id))
+        for field, count in changes.items():
+            setattr(score, field, getattr(score, field) + count)
+            score.trending += WEIGHTS[field] * count
+        score.popularity = popularity(score)
+    _save(
+        list(scores.values()),
+        [*WEIGHTS, 'popularity', 'trending'],
+    )
+
+
+def _committed_top(name, model, now, horizon):
+    """id, до которого все строки модели уже видны, или None.
+
+    Отметка name:seen хранит Max(id) прошлого замера; если замер старше
+    horizon секунд, его значение возвращается, а замер обновляется.
+    """
+    seen, created = ScoreWatermark.objects.get_or_create(
+        name=name + SEEN_SUFFIX
+    )
+    if not created and seen.updated_at > now - timedelta(seconds=horizon):
+        return None
+    top = seen.last_id
+    seen.last_id = model.objects.aggregate(top=Max('id'))['top'] or 0
+    seen.save(update_fields=['last_id', 'updated_at'])
+    return None if created else top
+
+
+def _not_archived(queryset, field):
+    """Строки, чьей пары (пользователь, рецепт) нет в архиве поля."""
+    archive = ARCHIVES.get(field)
+    if archive is None:
+        return queryset
+    return queryset.exclude(Exists(archive.objects.filter(
+        user_id=OuterRef('user_id'), recipe_id=OuterRef('recipe_id'),
+    )))
+
+
+def _locked_watermarks():
+    """Отметки источников под блокировкой до конца транзакции."""
+    return {
+        watermark.name: watermark
+        for watermark in ScoreWatermark.objects.select_for_update()
+        .filter(name__in=SOURCES)
+    }
+
+
+def process_new_rows(
+    chunk_size=DEFAULT_CHUNK_SIZE, horizon=SCORE_COMMIT_HORIZON_SECONDS,
+):
+    """Учитывает строки, добавленные после отметки; возвращает их число."""
+    processed = 0
+    now = timezone.now()
+    for name, (model, field) in SOURCES.items():
+        ScoreWatermark.objects.get_or_create(name=name)
+        top = _committed_top(name, model, now, horizon)
+        while top is not None:
+            with transaction.atomic():
+                watermark = _locked_watermarks()[name]
+                if watermark.last_id >= top:
+                    break
+                upper = min(watermark.last_id + chunk_size, top)
+                rows = list(_not_archived(model.objects.filter(
+                    id__gt=watermark.last_id, id__lte=upper
+                ), field).values('recipe_id').annotate(
+                    count=Count('id')
+                ).order_by())
+                apply_deltas({
+                    row['recipe_id']: {field: row['count']} for row in rows
+                })
+                watermark.last_id = upper
+                watermark.save(update_fields=['last_id', 'updated_at'])
+            processed += sum(row['count'] for row in rows)
+    return processed
+
+
+def _counts(queryset, recipe_ids, count=Count('id')):
+    return Counter(dict(
+        queryset.filter(
+            recipe_id__gte=recipe_ids[0], recipe_id__lte=recipe_ids[-1],
+        )
+        .values('recipe_id').annotate(count=count)
+        .order_by().values_list('recipe_id', 'count')
+    ))
+
+
+def rebuild_counts(chunk_size=DEFAULT_CHUNK_SIZE):
+    """Точный пересчёт счётчиков по всем рецептам пачками по id.
+
+    trending не меняется. Учитываются строки до отметок; строки после них
+    добавит process_new_rows.
+    """
+    for name in SOURCES:
+        ScoreWatermark.objects.get_or_create(name=name)
+    last_id = 0
+    rebuilt = 0
+    while True:
+        recipe_ids = list(
+            Recipe.objects.filter(id__gt=last_id).order_by('id')
+            .values_list('id', flat=True)[:chunk_size]
+        )
+        if not recipe_ids:
+            break
+        with transaction.atomic():
+            watermarks = _locked_watermarks()
+            scores = RecipeScore.objects.in_bulk(recipe_ids)
+            counts = {
+                field: _counts(_not_archived(
+                    model.objects.filter(id__lte=watermarks[name].last_id),
+                    field,
+                ), recipe_ids)
+                for name, (model, field) in SOURCES.items()
+            }
+            for field, model in ARCHIVES.items():
+                # В архиве могут быть повторы пар, перенесённые до того,
+                # как перенос стал их пропускать.
+                counts[field].update(_counts(
+                    model.objects.all(), recipe_ids,
+                    Count('user_id', distinct=True),
+                ))
+            for recipe_id in recipe_ids:
+                score = scores.setdefault(
+                    recipe_id, RecipeScore(recipe_id=recipe_id)
+                )
+                for field, values in counts.items():
+                    setattr(score, field, values.get(recipe_id, 0))
+                score.popularity = popularity(score)
+            _save(list(scores.values()), [*WEIGHTS, 'popularity'])
+        rebuilt += len(recipe_ids)
+        last_id = recipe_ids[-1]
+    return rebuilt
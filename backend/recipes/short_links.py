@@ -0,0 +1,183 @@
+"""Короткие ссылки на рецепты.
+
+Соответствие кода рецепту кэшируется в памяти процесса и в общем кэше,
+отсутствующие коды кэшируются отдельно на меньшее время. Переходы
+накапливаются в памяти и записываются в базу пачкой не чаще раза в
+FLUSH_INTERVAL секунд: при очередном переходе или, если переходов больше
+нет, фоновым таймером, так что счётчики редких ссылок отстают не больше
+чем на FLUSH_INTERVAL.
+"""
+import atexit
+import threading
+import time
+from collections import Counter, defaultdict
+
+import shortuuid
+from django.core.cache import cache
+from django.db import (
+    DEFAULT_DB_ALIAS,
+    IntegrityError,
+    connections,
+    transaction,
+)
+from django.db.models import F
+
+from foodgram.cache import LocalCache
+from recipes.constants import SHORT_LINK_CODE_LENGTH
+from recipes.models import Recipe, ShortLink
+
+
+CACHE_TIMEOUT = 60 * 60
+NEGATIVE_CACHE_TIMEOUT = 60
+LOCAL_CACHE_TIMEOUT = 60
+LOCAL_CACHE_SIZE = 10_000
+FLUSH_INTERVAL = 10
+CREATE_ATTEMPTS = 5
+MISSING = 0
+
+_generator = shortuuid.ShortUUID()
+_local = LocalCache(LOCAL_CACHE_SIZE, LOCAL_CACHE_TIMEOUT)
+
+
+def _lookup(key, loader):
+    """Ищет значение в кэше процесса, общем кэше и, наконец, в базе."""
+    value = _local.get(key)
+    if value is None:
+        value = cache.get(key)
+        if value is None:
+            value = loader() or MISSING
+            cache.set(
+                key,
+                value,
+                CACHE_TIMEOUT if value != MISSING else NEGATIVE_CACHE_TIMEOUT,
+            )
+        _local.set(
+            key,
+            value,
+            None if value != MISSING else NEGATIVE_CACHE_TIMEOUT,
+        )
+    return None if value == MISSING else value
+
+
+def _code_key(code):
+    return f'short-link:code:{code}'
+
+
+def _recipe_key(recipe_id):
+    return f'short-link:recipe:{recipe_id}'
+
+
+def resolve(code):
+    """Возвращает id рецепта по коду или None."""
+    return _lookup(
+        _code_key(code),
+        lambda: ShortLink.objects.filter(code=code)
+        .values_list('recipe_id', flat=True).first(),
+    )
+
+
+def recipe_exists(recipe_id):
+    """Проверка id для старых ссылок вида /s/<id>/."""
+    return _lookup(
+        _recipe_key(recipe_id),
+        lambda: Recipe.objects.filter(id=recipe_id).exists() and recipe_id,
+    ) is not None
+
+
+def generate_code():
+    while True:
+        code = _generator.random(length=SHORT_LINK_CODE_LENGTH)
+        # Коды из одних цифр заняты старыми ссылками /s/<id>/.
+        if not code.isdigit():
+            return code
+
+
+def get_or_create_code(recipe_id):
+    """Возвращает код короткой ссылки рецепта, создавая его при
+    необходимости.
+
+    Существующая ссылка читается из основной базы: на реплике ссылка,
+    только что созданная параллельным запросом, может ещё не появиться.
+    """
+    for _ in range(CREATE_ATTEMPTS):
+        code = ShortLink.objects.using(DEFAULT_DB_ALIAS).filter(
+            recipe_id=recipe_id
+        ).values_list('code', flat=True).first()
+        if code:
+            return code
+        try:
+            with transaction.atomic():
+                code = ShortLink.objects.create(
+                    recipe_id=recipe_id, code=generate_code()
+                ).code
+        except IntegrityError:
+            # Ссылку создал параллельный запрос или код уже занят.
+            continue
+        forget(code)
+        return code
+    raise IntegrityError(
+        f'Не удалось создать короткую ссылку рецепта {recipe_id} '
+        f'за {CREATE_ATTEMPTS} попыток'
+    )
+
+
+def forget(code):
+    """Сбрасывает закэшированное соответствие кода рецепту."""
+    _local.delete(_code_key(code))
+    cache.delete(_code_key(code))
+
+
+def forget_recipe(recipe_id):
+    _local.delete(_recipe_key(recipe_id))
+    cache.delete(_recipe_key(recipe_id))
+
+
+_hits = Counter()
+_hits_lock = threading.Lock()
+_last_flush = time.monotonic()
+_timer = None
+
+
+def record_hit(code):
+    """Учитывает переход; запись в базу откладывается."""
+    global _timer
+    with _hits_lock:
+        _hits[code] += 1
+        due = time.monotonic() - _last_flush >= FLUSH_INTERVAL
+        if not due and _timer is None:
+            _timer = threading.Timer(FLUSH_INTERVAL, _flush_later)
+            _timer.daemon = True
+            _timer.start()
+    if due:
+        flush_hits()
+
+
+def _flush_later():
+    """Запись переходов по таймеру в отдельном потоке."""
+    global _timer
+    with _hits_lock:
+        _timer = None
+    try:
+        flush_hits()
+    finally:
+        # У потока таймера собственные соединения с базой.
+        connections.close_all()
+
+
+def flush_hits():
+    """Записывает накопленные переходы: один UPDATE на каждое
+    встречающееся значение прироста."""
+    global _hits, _last_flush
+    with _hits_lock:
+        hits, _hits = _hits, Counter()
+        _last_flush = time.monotonic()
+    codes_by_increment = defaultdict(list)
+    for code, increment in hits.items():
+        codes_by_increment[increment].append(code)
+    for increment, codes in codes_by_increment.items():
+        ShortLink.objects.filter(code__in=codes).update(
+            hits=F('hits') + increment
+        )
+
+
+atexit.register(flush_hits)
@@ -0,0 +1,101 @@
+from django.db import transaction
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_save,
+)
+from django.dispatch import receiver
+
+from foodgram import compression
+from recipes import short_links, tags
+from recipes.models import (
+    Ingredients,
+    Recipe,
+    RecipeIngredient,
+    ShortLink,
+    Tag,
+    User,
+)
+
+
+@receiver(post_delete, sender=ShortLink)
+def forget_short_link(sender, instance, **kwargs):
+    short_links.forget(instance.code)
+
+
+@receiver(post_delete, sender=Recipe)
+def forget_recipe_link(sender, instance, **kwargs):
+    short_links.forget_recipe(instance.pk)
+
+
+# Разделы кэша ответов API, зависящие от моделей. Связи рецепта
+# отслеживаются отдельно: админка, shell и сторонний код меняют их без
+# сохранения рецепта. Массовые записи (bulk_create, bulk_update) сигналов
+# не отправляют и сбрасывают кэш сами через forget_cached_responses.
+CACHED_RESPONSES = {
+    Ingredients: ('ingredients', 'recipes'),
+    Tag: ('tags', 'recipes'),
+    Recipe: ('recipes',),
+    RecipeIngredient: ('recipes',),
+    Recipe.tags.through: ('recipes',),
+}
+# Поля пользователя, которые страницы рецептов показывают об авторе.
+AUTHOR_FIELDS = ('username', 'email', 'first_name', 'last_name', 'avatar')
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def forget_tag_ids(sender, **kwargs):
+    tags.forget()
+
+
+def forget_cached_responses(model):
+    """Сбрасывает кэш ответов, зависящих от модели, после фиксации."""
+    sections = CACHED_RESPONSES.get(model)
+    if sections:
+        transaction.on_commit(
+            lambda: compression.bump_version(*sections)
+        )
+
+
+def bump_cached_responses(sender, action='post_', **kwargs):
+    if not action.startswith('pre_'):
+        forget_cached_responses(sender)
+
+
+@receiver(pre_save, sender=User)
+def remember_author_fields(sender, instance, update_fields=None, **kwargs):
+    """Запоминает показанные в рецептах поля до сохранения; вход
+    (last_login), смена пароля и новые пользователи кэш не сбрасывают."""
+    instance._author_fields = None
+    if instance.pk is None or (
+        update_fields is not None
+        and not set(AUTHOR_FIELDS) & set(update_fields)
+    ):
+        return
+    instance._author_fields = User.objects.filter(
+        pk=instance.pk
+    ).values(*AUTHOR_FIELDS).first()
+
+
+@receiver(post_save, sender=User)
+def forget_author(sender, instance, **kwargs):
+    previous = instance.__dict__.pop('_author_fields', None)
+    if previous is None:
+        return
+    fields = [sender._meta.get_field(name) for name in AUTHOR_FIELDS]
+    if any(
+        previous[field.name]
+        != field.get_prep_value(field.value_from_object(instance))
+        for field in fields
+    ):
+        forget_cached_responses(Recipe)
+
+
+# Обработчики подключаются к конкретным моделям: обработчик post_delete
+# без sender не даёт Django удалять связанные строки одним запросом.
+for model in CACHED_RESPONSES:
+    post_save.connect(bump_cached_responses, sender=model)
+    post_delete.connect(bump_cached_responses, sender=model)
+m2m_changed.connect(bump_cached_responses, sender=Recipe.tags.through)
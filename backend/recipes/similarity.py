@@ -0,0 +1,174 @@
+"""Похожие рецепты.
+
+Сходство двух рецептов — взвешенная сумма косинусных мер по двум
+разреженным матрицам: «рецепт × пользователь» (избранное) и «рецепт ×
+ингредиент» с весом idf, чтобы распространённые ингредиенты почти не
+влияли на результат. Матрицы хранятся в формате CSR в массивах array;
+строка произведения на транспонированную матрицу накапливается в словаре
+только по ненулевым элементам. Слишком плотные столбцы (пользователи с
+огромным избранным, ингредиенты почти всех рецептов) отбрасываются: они
+дают квадратичную работу и почти не несут сигнала.
+
+Для каждого рецепта сохраняется top_k лучших соседей; таблица
+обновляется пачками по диапазону id, поэтому во время пересчёта
+эндпоинт продолжает отдавать прежние результаты.
+"""
+import heapq
+import math
+from array import array
+from collections import defaultdict
+from operator import itemgetter
+
+from django.db import transaction
+
+from recipes.constants import SIMILAR_RECIPES_COUNT
+from recipes.models import Favorite, Recipe, RecipeIngredient, RecipeSimilarity
+
+
+FAVORITES_WEIGHT = 0.7
+MAX_USER_FAVORITES = 1000
+MAX_INGREDIENT_SHARE = 0.2
+WRITE_BATCH_SIZE = 1000
+READ_CHUNK_SIZE = 10_000
+
+
+class SparseMatrix:
+    """Бинарная разреженная матрица в формате CSR.
+
+    Строки и столбцы адресуются id из базы; пары читаются из запроса,
+    упорядоченного по строке.
+    """
+
+    def __init__(self, pairs, skip_columns=frozenset()):
+        self.offsets = {}
+        self.columns = array('q')
+        row = start = None
+        for row_id, column_id in pairs:
+            if column_id in skip_columns:
+                continue
+            if row_id != row:
+                if row is not None:
+                    self.offsets[row] = (start, len(self.columns))
+                row, start = row_id, len(self.columns)
+            self.columns.append(column_id)
+        if row is not None:
+            self.offsets[row] = (start, len(self.columns))
+
+    def row(self, row_id):
+        start, end = self.offsets.get(row_id, (0, 0))
+        return self.columns[start:end]
+
+    def row_size(self, row_id):
+        start, end = self.offsets.get(row_id, (0, 0))
+        return end - start
+
+
+def _pairs(queryset, row, column):
+    return queryset.order_by(row, column).values_list(row, column).iterator(
+        chunk_size=READ_CHUNK_SIZE
+    )
+
+
+class SimilarityModel:
+    """Обе матрицы и их транспонированные копии в памяти процесса."""
+
+    def __init__(self, max_user_favorites=MAX_USER_FAVORITES,
+                 max_ingredient_share=MAX_INGREDIENT_SHARE):
+        self.users = SparseMatrix(_pairs(Favorite.objects, 'user', 'recipe'))
+        heavy_users = frozenset(
+            user for user in self.users.offsets
+            if self.users.row_size(user) > max_user_favorites
+        )
+        self.favorites = SparseMatrix(
+            _pairs(Favorite.objects, 'recipe', 'user'), heavy_users
+        )
+        self.ingredients = SparseMatrix(
+            _pairs(RecipeIngredient.objects, 'ingredient', 'recipe')
+        )
+        total = max(1, Recipe.objects.count())
+        self.idf = {}
+        for ingredient in self.ingredients.offsets:
+            frequency = self.ingredients.row_size(ingredient)
+            if frequency <= max_ingredient_share * total:
+                self.idf[ingredient] = math.log(total / frequency) ** 2
+        self.composition = SparseMatrix(
+            _pairs(RecipeIngredient.objects, 'recipe', 'ingredient'),
+            frozenset(self.ingredients.offsets) - frozenset(self.idf),
+        )
+        self.favorites_norm = {
+            recipe: math.sqrt(self.favorites.row_size(recipe))
+            for recipe in self.favorites.offsets
+        }
+        self.composition_norm = {
+            recipe: math.sqrt(sum(
+                self.idf[ingredient]
+                for ingredient in self.composition.row(recipe)
+            ))
+            for recipe in self.composition.offsets
+        }
+
+    def _cosine(self, recipe, matrix, transposed, norms, weight):
+        dots = defaultdict(float)
+        for column in matrix.row(recipe):
+            column_weight = weight(column)
+            for other in transposed.row(column):
+                dots[other] += column_weight
+        dots.pop(recipe, None)
+        norm = norms.get(recipe)
+        return {
+            other: dot / (norm * norms[other]) for other, dot in dots.items()
+        } if norm else {}
+
+    def neighbors(self, recipe, top_k=SIMILAR_RECIPES_COUNT,
+                  favorites_weight=FAVORITES_WEIGHT):
+        """Список (id, сходство) лучших соседей рецепта."""
+        scores = defaultdict(float)
+        for weight, similarities in (
+            (
+                favorites_weight,
+                self._cosine(
+                    recipe, self.favorites, self.users,
+                    self.favorites_norm, lambda user: 1,
+                ),
+            ),
+            (
+                1 - favorites_weight,
+                self._cosine(
+                    recipe, self.composition, self.ingredients,
+                    self.composition_norm, self.idf.__getitem__,
+                ),
+            ),
+        ):
+            for other, similarity in similarities.items():
+                scores[other] += weight * similarity
+        return heapq.nlargest(top_k, scores.items(), key=itemgetter(1))
+
+
+def rebuild(top_k=SIMILAR_RECIPES_COUNT, favorites_weight=FAVORITES_WEIGHT,
+            max_user_favorites=MAX_USER_FAVORITES,
+            max_ingredient_share=MAX_INGREDIENT_SHARE):
+    """Пересчитывает таблицу соседей; возвращает число рецептов."""
+    model = SimilarityModel(max_user_favorites, max_ingredient_share)
+    recipes = list(Recipe.objects.order_by('id').values_list('id', flat=True))
+    for start in range(0, len(recipes), WRITE_BATCH_SIZE):
+        batch = recipes[start:start + WRITE_BATCH_SIZE]
+        rows = [
+            RecipeSimilarity(
+                recipe_id=recipe,
+                similar_id=similar,
+                rank=rank,
+                score=score,
+            )
+            for recipe in batch
+            for rank, (similar, score) in enumerate(
+                model.neighbors(recipe, top_k, favorites_weight)
+            )
+        ]
+        with transaction.atomic():
+            RecipeSimilarity.objects.filter(
+                recipe_id__gte=batch[0], recipe_id__lte=batch[-1]
+            ).delete()
+            RecipeSimilarity.objects.bulk_create(
+                rows, batch_size=WRITE_BATCH_SIZE
+            )
+    return len(recipes)
@@ -0,0 +1,32 @@
+"""Соответствие слагов тегов их id в памяти процесса.
+
+Теги меняются только через админку, поэтому фильтр рецептов не
+обращается за ними к базе. Изменения в этом процессе сбрасывают карту
+сигналами, в остальных процессах она обновится не позже чем через
+CACHE_TIMEOUT секунд.
+"""
+from foodgram.cache import LocalCache
+from recipes.models import Tag
+
+
+CACHE_TIMEOUT = 60
+KEY = 'slugs'
+
+_cache = LocalCache(1, CACHE_TIMEOUT)
+
+
+def tag_ids():
+    """Словарь {слаг: id} всех тегов."""
+    ids = _cache.get(KEY)
+    if ids is None:
+        ids = dict(Tag.objects.values_list('slug', 'id'))
+        _cache.set(KEY, ids)
+    return ids
+
+
+def tag_choices():
+    return [(slug, slug) for slug in tag_ids()]
+
+
+def forget():
+    _cache.delete(KEY)
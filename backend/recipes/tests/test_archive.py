@@ -0,0 +1,63 @@
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+
+from recipes import scores
+from recipes.archive import archive_shopping_lists
+from recipes.models import RecipeScore, ShoppingList, ShoppingListArchive
+from recipes.tests.utils import create_recipe, create_user
+
+
+class ArchiveShoppingListsTest(TestCase):
+    def setUp(self):
+        self.user = create_user()
+        self.recipes = [
+            create_recipe(self.user, f'Рецепт {number}')
+            for number in range(5)
+        ]
+        self.old = timezone.now() - timedelta(days=10)
+
+    def add(self, recipe, created=None):
+        return ShoppingList.objects.create(
+            user=self.user, recipe=recipe, created=created or self.old
+        )
+
+    def test_moves_old_rows_in_batches(self):
+        for recipe in self.recipes[:4]:
+            self.add(recipe)
+        fresh = self.add(self.recipes[4], timezone.now())
+        self.assertEqual(archive_shopping_lists(days=1, batch_size=3), 4)
+        self.assertQuerysetEqual(
+            ShoppingList.objects.all(), [fresh], transform=lambda row: row
+        )
+        self.assertEqual(
+            sorted(ShoppingListArchive.objects.values_list(
+                'recipe_id', 'added'
+            )),
+            [(recipe.id, self.old) for recipe in self.recipes[:4]],
+        )
+
+    def test_row_added_again_is_archived_once(self):
+        recipe = self.recipes[0]
+        self.add(recipe)
+        archive_shopping_lists(days=1)
+        self.add(recipe)
+        self.assertEqual(archive_shopping_lists(days=1), 1)
+        self.assertFalse(ShoppingList.objects.exists())
+        self.assertEqual(ShoppingListArchive.objects.count(), 1)
+
+    def test_row_added_again_is_counted_once(self):
+        recipe = self.recipes[0]
+        self.add(recipe)
+        scores.process_new_rows(horizon=0)
+        scores.process_new_rows(horizon=0)
+        archive_shopping_lists(days=1)
+        self.add(recipe)
+        scores.process_new_rows(horizon=0)
+        scores.process_new_rows(horizon=0)
+        score = RecipeScore.objects.get(recipe=recipe)
+        self.assertEqual(score.shopping_carts_count, 1)
+        scores.rebuild_counts()
+        score.refresh_from_db()
+        self.assertEqual(score.shopping_carts_count, 1)
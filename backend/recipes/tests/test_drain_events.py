@@ -0,0 +1,56 @@
+from datetime import timedelta
+from io import StringIO
+from itertools import count
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from recipes import events
+from recipes.models import OutboxEvent
+
+
+class Stop(Exception):
+    pass
+
+
+class DrainEventsTest(TestCase):
+    def old_event(self, key, **fields):
+        event = OutboxEvent.objects.create(
+            name='test.event', key=key, **fields
+        )
+        OutboxEvent.objects.filter(pk=event.pk).update(
+            created=timezone.now() - timedelta(days=30)
+        )
+        return event
+
+    def test_loop_purges_periodically(self):
+        clock = count(step=1000)
+
+        def sleep(seconds):
+            # Между итерациями появляются события, которые пора удалить.
+            if not OutboxEvent.objects.exists():
+                self.old_event(
+                    'delivered',
+                    processed_at=timezone.now() - timedelta(days=30),
+                )
+                self.old_event('dead', attempts=events.MAX_ATTEMPTS)
+                self.old_event('pending')
+            elif OutboxEvent.objects.count() == 1:
+                raise Stop
+
+        with mock.patch(
+            'recipes.management.commands.drain_events.time'
+        ) as time:
+            time.monotonic.side_effect = lambda: next(clock)
+            time.sleep.side_effect = sleep
+            with self.assertRaises(Stop):
+                call_command(
+                    'drain_events', '--loop', '--purge-interval', '3600',
+                    stdout=StringIO(),
+                )
+        self.assertQuerysetEqual(
+            OutboxEvent.objects.values_list('key', flat=True), ['pending'],
+            transform=str,
+        )
@@ -0,0 +1,118 @@
+import base64
+import io
+import json
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from recipes.models import Ingredients, Recipe, Tag, User
+
+
+def png(color):
+    buffer = io.BytesIO()
+    Image.new('RGB', (2, 2), color).save(buffer, 'PNG')
+    return 'data:image/png;base64,' + base64.b64encode(
+        buffer.getvalue()
+    ).decode()
+
+
+class ImportRecipesImagesTest(TestCase):
+    def setUp(self):
+        self.media = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=self.media.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.author = User.objects.create_user(
+            username='author', email='author@example.com', password='x',
+            first_name='А', last_name='Б',
+        )
+        Tag.objects.create(name='Завтрак', slug='breakfast')
+        Ingredients.objects.create(name='соль', measurement_unit='г')
+
+    def record(self, author, color):
+        return {
+            'author': author,
+            'name': f'Рецепт {color}',
+            'text': 'Текст',
+            'cooking_time': 5,
+            'tags': ['breakfast'],
+            'ingredients': [
+                {'name': 'соль', 'measurement_unit': 'г', 'amount': 1}
+            ],
+            'image': png(color),
+        }
+
+    def run_import(self, records):
+        path = Path(self.media.name) / 'recipes.jsonl'
+        path.write_text(
+            '\n'.join(json.dumps(record) for record in records),
+            encoding='utf-8',
+        )
+        stderr = io.StringIO()
+        call_command(
+            'import_recipes', str(path), workers=0,
+            stdout=io.StringIO(), stderr=stderr,
+        )
+        return stderr.getvalue()
+
+    def stored_images(self):
+        directory = Path(self.media.name) / 'recipe/images'
+        return sorted(
+            f'recipe/images/{file.name}' for file in directory.iterdir()
+        ) if directory.exists() else []
+
+    def test_skipped_record_leaves_no_image(self):
+        self.run_import([
+            self.record('author@example.com', 'red'),
+            self.record('missing@example.com', 'blue'),
+        ])
+        recipe = Recipe.objects.get()
+        self.assertEqual(self.stored_images(), [recipe.image.name])
+
+    def test_shared_image_of_skipped_record_is_kept(self):
+        self.run_import([
+            self.record('missing@example.com', 'red'),
+            self.record('author@example.com', 'red'),
+        ])
+        recipe = Recipe.objects.get()
+        self.assertEqual(self.stored_images(), [recipe.image.name])
+
+    def test_failed_batch_removes_its_images(self):
+        with mock.patch(
+            'recipes.management.commands.import_recipes.Command.save_batch',
+            side_effect=RuntimeError,
+        ), self.assertRaises(RuntimeError):
+            self.run_import([self.record('author@example.com', 'red')])
+        self.assertFalse(Recipe.objects.exists())
+        self.assertEqual(self.stored_images(), [])
+
+    def test_import_resets_cached_recipes(self):
+        with mock.patch(
+            'foodgram.compression.bump_version'
+        ) as bump_version, self.captureOnCommitCallbacks(execute=True):
+            self.run_import([self.record('author@example.com', 'red')])
+        bump_version.assert_called_with('recipes')
+
+    def test_records_the_api_would_reject_are_skipped(self):
+        record = self.record('author@example.com', 'red')
+        salt = record['ingredients'][0]
+        errors = self.run_import([
+            {**record, 'cooking_time': 0},
+            {**record, 'cooking_time': None},
+            {**record, 'ingredients': [{**salt, 'amount': 0}]},
+            {**record, 'ingredients': [salt, {**salt, 'amount': 2}]},
+            {**record, 'ingredients': []},
+            {**record, 'tags': ['breakfast', 'breakfast']},
+            {**record, 'tags': []},
+            record,
+        ]).splitlines()
+        self.assertEqual(Recipe.objects.count(), 1)
+        self.assertEqual(
+            [line.split(':')[0] for line in errors],
+            [f'Запись {number}' for number in range(1, 8)],
+        )
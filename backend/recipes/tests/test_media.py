@@ -0,0 +1,86 @@
+import io
+import os
+import tempfile
+import time
+from datetime import timedelta
+from pathlib import Path
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from foodgram.storage import HashedFileSystemStorage
+from recipes.tests.utils import create_recipe, create_user
+
+
+DAY = 24 * 60 * 60
+
+
+class HashedStorageTest(TestCase):
+    def setUp(self):
+        self.media = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=self.media.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.assertIsInstance(default_storage, HashedFileSystemStorage)
+        self.author = create_user()
+
+    def store(self, content=b'image'):
+        return default_storage.save(
+            'recipe/images/photo.PNG', ContentFile(content)
+        )
+
+    def age(self, name, seconds=2 * DAY):
+        past = time.time() - seconds
+        os.utime(default_storage.path(name), (past, past))
+
+    def cleanup(self):
+        call_command('cleanup_orphan_media', stdout=io.StringIO())
+
+    def test_same_content_reuses_name_and_refreshes_age(self):
+        name = self.store()
+        self.assertRegex(name, r'^recipe/images/[0-9a-f]{64}\.png$')
+        self.age(name)
+        self.assertEqual(self.store(), name)
+        self.assertGreater(
+            default_storage.get_modified_time(name),
+            timezone.now() - timedelta(hours=1),
+        )
+
+    def test_deleted_file_is_written_again(self):
+        name = self.store()
+        os.remove(default_storage.path(name))
+        self.assertEqual(self.store(), name)
+        self.assertTrue(default_storage.exists(name))
+
+    def test_deleting_record_keeps_file(self):
+        recipe = create_recipe(self.author, image=self.store())
+        recipe.delete()
+        self.assertTrue(default_storage.exists(recipe.image.name))
+
+    def test_cleanup_removes_only_old_unreferenced_files(self):
+        referenced = self.store(b'referenced')
+        create_recipe(self.author, image=referenced)
+        orphan = self.store(b'orphan')
+        recent = self.store(b'recent')
+        self.age(referenced)
+        self.age(orphan)
+        self.cleanup()
+        self.assertEqual(
+            sorted(Path(self.media.name, 'recipe/images').iterdir()),
+            sorted(
+                Path(default_storage.path(name))
+                for name in (referenced, recent)
+            ),
+        )
+
+    def test_file_reused_after_listing_is_kept(self):
+        name = self.store()
+        self.age(name)
+        before = timezone.now() - timedelta(days=1)
+        self.store()
+        self.assertFalse(default_storage.delete_unreferenced(name, before))
+        self.assertTrue(default_storage.exists(name))
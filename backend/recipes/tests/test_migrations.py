@@ -0,0 +1,62 @@
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TransactionTestCase
+
+
+class MergeDuplicateIngredientsMigrationTest(TransactionTestCase):
+    migrate_from = [('recipes', '0006_auto_20250823_1523')]
+    migrate_to = [('recipes', '0007_ingredients_unique_name_unit')]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_duplicates_are_merged_before_constraint(self):
+        apps = self.migrate(self.migrate_from)
+        Ingredients = apps.get_model('recipes', 'Ingredients')
+        Recipe = apps.get_model('recipes', 'Recipe')
+        RecipeIngredient = apps.get_model('recipes', 'RecipeIngredient')
+        author = apps.get_model('recipes', 'User').objects.create(
+            username='author', email='author@example.com',
+            first_name='А', last_name='Б',
+        )
+        kept = Ingredients.objects.create(name='соль', measurement_unit='г')
+        duplicate = Ingredients.objects.create(
+            name='соль', measurement_unit='г'
+        )
+        other = Ingredients.objects.create(name='соль', measurement_unit='кг')
+        recipe = Recipe.objects.create(
+            author=author, name='Суп', text='Текст', cooking_time=5,
+            image='recipe/images/soup.png',
+        )
+        recipe.ingredients.add(kept, duplicate, other)
+        RecipeIngredient.objects.create(
+            recipe=recipe, ingredient=duplicate, amount=3
+        )
+
+        apps = self.migrate(self.migrate_to)
+
+        Ingredients = apps.get_model('recipes', 'Ingredients')
+        Recipe = apps.get_model('recipes', 'Recipe')
+        RecipeIngredient = apps.get_model('recipes', 'RecipeIngredient')
+        self.assertEqual(
+            set(Ingredients.objects.values_list('id', flat=True)),
+            {kept.id, other.id},
+        )
+        self.assertEqual(
+            list(RecipeIngredient.objects.values_list(
+                'ingredient_id', 'amount'
+            )),
+            [(kept.id, 3)],
+        )
+        self.assertEqual(
+            sorted(Recipe.objects.get().ingredients.values_list(
+                'id', flat=True
+            )),
+            sorted([kept.id, other.id]),
+        )
@@ -0,0 +1,78 @@
+from django.test import TestCase
+
+from recipes import revisions
+from recipes.constants import REVISION_SNAPSHOT_INTERVAL
+from recipes.models import RecipeRevision
+from recipes.tests.utils import create_recipe, create_user
+
+
+def state(number):
+    """Состояние, у которого от версии к версии меняются разные части."""
+    lines = [f'Шаг {step}\n' for step in range(5)]
+    lines[number % 5] = f'Шаг {number % 5}, правка {number}\n'
+    if number % 3 == 0:
+        lines.append('Подавать горячим\n')
+    return revisions.build_state(
+        name=f'Рецепт {number // 4}',
+        text=''.join(lines),
+        cooking_time=5 + number % 2,
+        tags=range(number % 3),
+        ingredients=[
+            (ingredient, 10 * number if ingredient == 1 else 100)
+            for ingredient in range(1, 2 + number % 4)
+        ],
+    )
+
+
+class RevisionsTest(TestCase):
+    def setUp(self):
+        self.recipe = create_recipe(create_user())
+
+    def record_all(self, states, previous=None):
+        for current in states:
+            revisions.record(self.recipe.id, previous, current)
+            previous = current
+
+    def test_diff_and_apply_round_trip(self):
+        for number in range(12):
+            old, new = state(number), state(number + 1)
+            self.assertEqual(
+                revisions.apply(old, revisions.diff(old, new)), new
+            )
+        self.assertEqual(revisions.diff(state(1), state(1)), {})
+
+    def test_text_with_several_changed_ranges(self):
+        old = {**state(0), 'text': 'А\nБ\nВ\nГ\nД\n'}
+        new = {**old, 'text': 'А1\nА2\nБ\nВ\nД\nЕ\n'}
+        delta = revisions.diff(old, new)
+        self.assertEqual(len(delta['text']), 3)
+        self.assertEqual(revisions.apply(old, delta), new)
+
+    def test_reconstructs_every_revision(self):
+        states = [state(number) for number in range(25)]
+        self.record_all(states)
+        self.assertEqual(
+            list(RecipeRevision.objects.filter(
+                recipe=self.recipe, snapshot=True
+            ).values_list('number', flat=True).order_by('number')),
+            list(range(1, len(states) + 1, REVISION_SNAPSHOT_INTERVAL)),
+        )
+        for number, expected in enumerate(states, start=1):
+            self.assertEqual(
+                revisions.reconstruct(self.recipe.id, number), expected
+            )
+        self.assertIsNone(
+            revisions.reconstruct(self.recipe.id, len(states) + 1)
+        )
+
+    def test_unchanged_state_is_not_recorded(self):
+        self.record_all([state(0)])
+        self.assertIsNone(revisions.record(self.recipe.id, state(0), state(0)))
+        self.assertEqual(RecipeRevision.objects.count(), 1)
+
+    def test_recipe_created_before_history(self):
+        self.assertEqual(
+            revisions.record(self.recipe.id, state(0), state(1)), 2
+        )
+        self.assertEqual(revisions.reconstruct(self.recipe.id, 1), state(0))
+        self.assertEqual(revisions.reconstruct(self.recipe.id, 2), state(1))
@@ -0,0 +1,53 @@
+from django.test import TestCase
+
+from recipes import scores
+from recipes.models import Favorite, RecipeScore
+from recipes.tests.utils import create_recipe, create_user
+
+
+class ScoresTest(TestCase):
+    def setUp(self):
+        author = create_user()
+        self.recipe = create_recipe(author)
+        self.users = [create_user(f'user{number}') for number in range(4)]
+
+    def favorite(self, number, id=None):
+        return Favorite.objects.create(
+            id=id, user=self.users[number], recipe=self.recipe
+        )
+
+    def favorites_count(self):
+        return RecipeScore.objects.get(recipe=self.recipe).favorites_count
+
+    def test_first_run_only_measures_top(self):
+        self.favorite(0)
+        self.assertEqual(scores.process_new_rows(horizon=0), 0)
+        self.assertEqual(scores.process_new_rows(horizon=0), 1)
+        self.assertEqual(self.favorites_count(), 1)
+
+    def test_waits_for_commit_horizon(self):
+        self.favorite(0)
+        scores.process_new_rows(horizon=0)
+        self.assertEqual(scores.process_new_rows(horizon=3600), 0)
+        self.assertFalse(RecipeScore.objects.exists())
+
+    def test_counts_row_with_lower_id_committed_late(self):
+        self.favorite(0, id=1)
+        self.favorite(1, id=2)
+        self.favorite(2, id=4)
+        scores.process_new_rows(horizon=0)
+        self.favorite(3, id=3)
+        self.assertEqual(scores.process_new_rows(horizon=0), 4)
+        self.assertEqual(self.favorites_count(), 4)
+
+    def test_rebuild_leaves_rows_after_watermark(self):
+        self.favorite(0)
+        scores.process_new_rows(horizon=0)
+        scores.process_new_rows(horizon=0)
+        self.favorite(1)
+        self.favorite(2).delete()
+        scores.rebuild_counts()
+        self.assertEqual(self.favorites_count(), 1)
+        scores.process_new_rows(horizon=0)
+        scores.process_new_rows(horizon=0)
+        self.assertEqual(self.favorites_count(), 2)
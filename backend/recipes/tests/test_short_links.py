@@ -0,0 +1,66 @@
+from unittest import mock
+
+from django.db import IntegrityError
+from django.test import TestCase
+
+from recipes import short_links
+from recipes.models import ShortLink
+from recipes.tests.utils import create_recipe, create_user
+
+
+class GetOrCreateCodeTest(TestCase):
+    def setUp(self):
+        author = create_user()
+        self.recipe = create_recipe(author)
+        self.other = create_recipe(author, 'Другой')
+
+    def test_returns_existing_code(self):
+        ShortLink.objects.create(recipe=self.recipe, code='abcdef')
+        self.assertEqual(
+            short_links.get_or_create_code(self.recipe.id), 'abcdef'
+        )
+
+    def test_retries_taken_code(self):
+        ShortLink.objects.create(recipe=self.other, code='taken1')
+        with mock.patch.object(
+            short_links, 'generate_code', side_effect=['taken1', 'fresh1']
+        ):
+            code = short_links.get_or_create_code(self.recipe.id)
+        self.assertEqual(code, 'fresh1')
+        self.assertEqual(
+            ShortLink.objects.get(recipe=self.recipe).code, 'fresh1'
+        )
+
+    def test_gives_up_after_bounded_attempts(self):
+        ShortLink.objects.create(recipe=self.other, code='taken1')
+        with mock.patch.object(
+            short_links, 'generate_code', return_value='taken1'
+        ) as generate:
+            with self.assertRaises(IntegrityError):
+                short_links.get_or_create_code(self.recipe.id)
+        self.assertEqual(generate.call_count, short_links.CREATE_ATTEMPTS)
+
+
+class RecordHitTest(TestCase):
+    def setUp(self):
+        self.link = ShortLink.objects.create(
+            recipe=create_recipe(create_user()), code='abcdef'
+        )
+        short_links.flush_hits()
+
+    def test_idle_hits_are_flushed_by_timer(self):
+        with mock.patch.object(
+            short_links.threading, 'Timer'
+        ) as timer, mock.patch.object(short_links, '_timer', None):
+            short_links.record_hit('abcdef')
+            short_links.record_hit('abcdef')
+            self.link.refresh_from_db()
+            self.assertEqual(self.link.hits, 0)
+            timer.assert_called_once()
+            interval, callback = timer.call_args.args
+            self.assertEqual(interval, short_links.FLUSH_INTERVAL)
+            # Без новых переходов таймер срабатывает сам.
+            with mock.patch.object(short_links, 'connections'):
+                callback()
+        self.link.refresh_from_db()
+        self.assertEqual(self.link.hits, 2)
@@ -0,0 +1,51 @@
+from unittest import mock
+
+from django.test import TestCase
+
+from recipes.models import Ingredients, RecipeIngredient, Tag
+from recipes.tests.utils import create_recipe, create_user
+
+
+class CachedResponsesTest(TestCase):
+    def setUp(self):
+        self.recipe = create_recipe(create_user())
+        self.tag = Tag.objects.create(name='Завтрак', slug='breakfast')
+        self.ingredient = Ingredients.objects.create(
+            name='Соль', measurement_unit='г'
+        )
+
+    def assertBumpsRecipes(self, change):
+        with mock.patch(
+            'foodgram.compression.bump_version'
+        ) as bump_version, self.captureOnCommitCallbacks(execute=True):
+            change()
+        bump_version.assert_called_with('recipes')
+
+    def test_recipe_ingredient_changes(self):
+        link = RecipeIngredient(
+            recipe=self.recipe, ingredient=self.ingredient, amount=1
+        )
+        self.assertBumpsRecipes(link.save)
+        self.assertBumpsRecipes(link.delete)
+
+    def test_recipe_tag_changes(self):
+        self.assertBumpsRecipes(lambda: self.recipe.tags.add(self.tag))
+        self.assertBumpsRecipes(lambda: self.recipe.tags.remove(self.tag))
+
+    def assertDoesNotBump(self, change):
+        with mock.patch(
+            'foodgram.compression.bump_version'
+        ) as bump_version, self.captureOnCommitCallbacks(execute=True):
+            change()
+        bump_version.assert_not_called()
+
+    def test_author_changes(self):
+        user = self.recipe.author
+        self.assertDoesNotBump(
+            lambda: user.save(update_fields=['last_login'])
+        )
+        user.set_password('new-password')
+        self.assertDoesNotBump(user.save)
+        self.assertDoesNotBump(lambda: create_user('reader'))
+        user.first_name = 'Другое'
+        self.assertBumpsRecipes(user.save)
@@ -0,0 +1,23 @@
+from recipes.models import Recipe, User
+
+
+def create_user(name='author', **fields):
+    return User.objects.create_user(
+        username=name,
+        email=f'{name}@example.com',
+        password='password',
+        first_name='Имя',
+        last_name='Фамилия',
+        **fields,
+    )
+
+
+def create_recipe(author, name='Рецепт', **fields):
+    return Recipe.objects.create(
+        author=author,
+        name=name,
+        text=fields.pop('text', 'Текст'),
+        cooking_time=fields.pop('cooking_time', 5),
+        image=fields.pop('image', 'recipe/images/test.png'),
+        **fields,
+    )
@@ -1,11 +1,15 @@
 from django.urls import path
 
-from .views import RecipeShortLinkRedirectView
+from .views import RecipeIdRedirectView, RecipeShortLinkRedirectView
 
 app_name = 'recipes'
 urlpatterns = [
     path(
         's/<int:recipe_id>/',
+        RecipeIdRedirectView.as_view(),
+        name='recipe-id-link'),
+    path(
+        's/<str:code>/',
         RecipeShortLinkRedirectView.as_view(),
         name='recipe-short-link'),
 ]
@@ -2,12 +2,22 @@ from django.shortcuts import redirect
 from django.http import Http404
 from django.views import View
 
-from recipes.models import Recipe
+from recipes import short_links
 
 
 class RecipeShortLinkRedirectView(View):
-    def get(self, request, recipe_id):
+    def get(self, request, code):
         """Перенаправление с короткой ссылки на полный рецепт."""
-        if not Recipe.objects.filter(id=recipe_id).exists():
+        recipe_id = short_links.resolve(code)
+        if recipe_id is None:
+            raise Http404(f'Короткая ссылка {code} не существует')
+        short_links.record_hit(code)
+        return redirect(f'/recipes/{recipe_id}/')
+
+
+class RecipeIdRedirectView(View):
+    def get(self, request, recipe_id):
+        """Перенаправление со старой ссылки вида /s/<id>/."""
+        if not short_links.recipe_exists(recipe_id):
             raise Http404(f'Рецепт с ID {recipe_id} не существует')
         return redirect(f'/recipes/{recipe_id}/')